@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+from . import constants
+
+logger = logging.getLogger('__name__')
+
+# Amount of requests one account may send within BUDGET_WINDOW seconds
+ACCOUNT_BUDGET = 200
+BUDGET_WINDOW = 3600
+
+# Seconds an account is left alone after Instagram throttled it
+ACCOUNT_COOLDOWN = 900
+
+
+class Account:
+    """ Credentials and saved session cookies of one dummy account """
+
+    def __init__(self, username, password=None, cookies=None):
+        self.__username = username
+        self.__password = password
+        self.__cookies = cookies or []
+        self.__requests = deque()
+        self.__cooling_until = 0
+        self.__acquired_at = 0
+
+    def to_dict(self):
+        return {'username': self.__username, 'password': self.__password, 'cookies': self.__cookies}
+
+    def cookie_dict(self):
+        """ The session cookies as name: value, for requests """
+
+        return {cookie['name']: cookie['value'] for cookie in self.__cookies}
+
+    @property
+    def username(self):
+        return self.__username
+
+    @property
+    def password(self):
+        return self.__password
+
+    @property
+    def cookies(self):
+        return self.__cookies
+
+    @cookies.setter
+    def cookies(self, cookies):
+        self.__cookies = cookies
+
+    @property
+    def requests(self):
+        return self.__requests
+
+    @property
+    def cooling_until(self):
+        return self.__cooling_until
+
+    @cooling_until.setter
+    def cooling_until(self, cooling_until):
+        self.__cooling_until = cooling_until
+
+    @property
+    def acquired_at(self):
+        return self.__acquired_at
+
+    @acquired_at.setter
+    def acquired_at(self, acquired_at):
+        self.__acquired_at = acquired_at
+
+
+class AccountPool:
+
+    def __init__(self, accounts, budget=ACCOUNT_BUDGET, cooldown=ACCOUNT_COOLDOWN, path=None, session_store=None):
+        """
+        Hands out the least used account that is not cooling down and has budget left
+        Every account may send budget requests per BUDGET_WINDOW seconds
+        With a session store the cookies are saved encrypted in the store, the file only keeps the credentials
+        """
+
+        self.__accounts = list(accounts)
+        self.__budget = budget
+        self.__cooldown = cooldown
+        self.__path = path
+        self.__session_store = session_store
+        self.__condition = threading.Condition()
+
+    def acquire(self):
+        """ Return the least used healthy account, block until one is available """
+
+        with self.__condition:
+            while True:
+                now = time.monotonic()
+                healthy = [account for account in self.__accounts if self.__available_in(account, now) == 0]
+                if len(healthy) > 0:
+                    # Of equally used accounts the one that was handed out longest ago comes first
+                    account = min(healthy, key=lambda account: (len(account.requests), account.acquired_at))
+                    account.acquired_at = now
+                    return account
+
+                wait = min(self.__available_in(account, now) for account in self.__accounts)
+                logger.warning('every account is throttled or out of budget, waiting %ds' % wait)
+                self.__condition.wait(wait)
+
+    def record(self, account):
+        """ Count a request of the account against its budget """
+
+        with self.__condition:
+            account.requests.append(time.monotonic())
+
+    def is_available(self, account):
+        """ Return True if the account is not cooling down and has budget left """
+
+        with self.__condition:
+            return self.__available_in(account, time.monotonic()) == 0
+
+    def throttled(self, account):
+        """ Instagram throttled the account, leave it alone for the cooldown """
+
+        with self.__condition:
+            account.cooling_until = time.monotonic() + self.__cooldown
+        logger.warning('account %s throttled, cooling down for %ds' % (account.username, self.__cooldown))
+
+    def save(self):
+        """ Write the accounts back to their file, with the cookies of the sessions that were made """
+
+        if self.__path is None:
+            return
+
+        with self.__condition:
+            entries = []
+            for account in self.__accounts:
+                entry = account.to_dict()
+                if self.__session_store is not None:
+                    if account.cookies:
+                        self.__session_store.save(account.username, account.cookies)
+                    del entry['cookies']
+                entries.append(entry)
+
+            try:
+                self.__write_private(self.__path, entries)
+            except OSError as err:
+                logger.error('could not save accounts: %s' % err)
+
+    def __available_in(self, account, now):
+        """ Seconds until the account may send a request again, 0 if it may now """
+
+        while len(account.requests) > 0 and account.requests[0] <= now - BUDGET_WINDOW:
+            account.requests.popleft()
+
+        wait = max(0.0, account.cooling_until - now)
+        if len(account.requests) >= self.__budget:
+            wait = max(wait, account.requests[0] + BUDGET_WINDOW - now)
+        return wait
+
+    @staticmethod
+    def __write_private(path, data):
+        """ Replace the file in one step with a file that only the owner can read, a crash leaves the old file """
+
+        temp_path = path + '.tmp'
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+            json.dump(data, file, indent=2)
+        os.replace(temp_path, path)
+
+    @property
+    def accounts(self):
+        return self.__accounts
+
+
+def load(path, session_store=None):
+    """
+    Load an account pool from a JSON file with a list of {"username", "password", "cookies"}
+    The cookies are the session cookies of a browser that is logged in, an account without cookies needs a password
+    An account without cookies in the file gets the cookies that the session store saved for its username
+    """
+
+    with open(path, 'r') as file:
+        data = json.load(file)
+
+    if not isinstance(data, list):
+        raise ValueError('the accounts file must hold a list of accounts')
+
+    accounts = []
+    for entry in data:
+        if not isinstance(entry, dict) or not entry.get('username'):
+            raise ValueError('every account needs a username')
+        cookies = entry.get('cookies')
+        if not cookies and session_store is not None:
+            cookies = session_store.load(entry['username'])
+        if not entry.get('password') and not cookies:
+            raise ValueError('account ' + entry['username'] + ' needs a password or cookies')
+        accounts.append(Account(entry['username'], entry.get('password'), cookies))
+
+    if len(accounts) == 0:
+        raise ValueError('the accounts file has no accounts')
+    return AccountPool(accounts, path=path, session_store=session_store)
+
+
+def use_account(web_driver, account):
+    """ Replace the session of the browser with the saved session of the account """
+
+    load_cookies(web_driver, account.cookies)
+
+
+def load_cookies(web_driver, cookies):
+    """ Replace the cookies of the browser, cookies can only be set on a page of their domain """
+
+    web_driver.get(constants.INSTAGRAM_URL)
+    web_driver.delete_all_cookies()
+    for cookie in cookies:
+        web_driver.add_cookie(cookie)
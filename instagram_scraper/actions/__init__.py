@@ -5,8 +5,7 @@ from .accept_cookies import AcceptCookies
 from .scrape_single_content import ScrapeSingleContent
 from .scrape_multiple_content import ScrapeMultipleContent
 from .scrape_display import ScrapeDisplay
-from .scrape_top_tags import ScrapeTopTags
-from .scrape_recent_tags import ScrapeRecentTags
+from .grab_top_tag_links import GrabTopTagLinks
 from .post_has_multiple_content import PostHasMultipleContent
 from .init_scrape import InitScrape
 from .scrape_stories import ScrapeStories
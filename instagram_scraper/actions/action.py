@@ -1,9 +1,18 @@
 from abc import ABCMeta, abstractmethod
 
+from .. import instrumentation
+
 
 class Action:
     __metaclass__ = ABCMeta
 
+    def __init_subclass__(cls, **kwargs):
+        """ Every action is measured under its class name """
+
+        super().__init_subclass__(**kwargs)
+        if 'do' in cls.__dict__:
+            cls.do = instrumentation.timed('action.' + cls.__name__)(cls.__dict__['do'])
+
     def __init__(self, scraper):
         self._scraper = scraper
         self._web_driver = scraper.web_driver
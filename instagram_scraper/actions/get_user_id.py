@@ -1,12 +1,13 @@
 import logging
 import json
-import time
 
 from bs4 import BeautifulSoup
 from json.decoder import JSONDecodeError
 
 from .. import constants
 from .. import actions
+from .. import wait
+from .. import governor
 
 logger = logging.getLogger('__name__')
 
@@ -19,14 +20,16 @@ class GetUserId(actions.Action):
     def do(self):
         """ Get the id of a username """
 
-        # Open new tab and load the link
+        # Open new tab and load the link, it waits for its turn with the other JSON requests
+        governor.acquire(governor.JSON)
         link = constants.INSTAGRAM_USER_INFO_URL_DEFAULT.format(self.__username)
         self._web_driver.execute_script("window.open('" + link + "','_blank');")
         first_tab_handle = self._web_driver.current_window_handle
 
         # Switch to the new tab
+        wait.number_of_windows(self._web_driver, 2)
         self._web_driver.switch_to.window(self._web_driver.window_handles[1])
-        time.sleep(2)
+        wait.page_loaded(self._web_driver)
 
         # Get data
         result = self._scraper.web_driver.page_source
@@ -35,12 +38,19 @@ class GetUserId(actions.Action):
         # Close the the new tab
         self._web_driver.close()
         self._web_driver.switch_to.window(first_tab_handle)
-        time.sleep(2)
 
         try:
             data = json.loads(soup.text)
+        except JSONDecodeError as err:
+            # Instagram answers a throttled JSON request with an html page
+            governor.throttled(governor.JSON)
+            logger.error('could not retrieve user id: %s' % str(err))
+            return
+        governor.succeeded(governor.JSON)
+
+        try:
             return data['graphql']['user']['id']
-        except (JSONDecodeError, KeyError) as err:
+        except KeyError as err:
             logger.error('could not retrieve user id: %s' % str(err))
 
     def on_fail(self):
@@ -1,12 +1,13 @@
 import logging
 import json
-import time
 
 from bs4 import BeautifulSoup
 from json.decoder import JSONDecodeError
 
 from .. import constants
 from .. import actions
+from .. import wait
+from .. import governor
 
 logger = logging.getLogger('__name__')
 
@@ -21,14 +22,16 @@ class GetVidSrcUrl(actions.Action):
     def do(self):
         """ Get the video source url """
 
-        # Open new tab and load the link
+        # Open new tab and load the link, the ?__a=1 page is a JSON request like the ones of the http session
+        governor.acquire(governor.JSON)
         link = constants.INSTAGRAM_POST_INFO.format(self.__post_id)
         self._web_driver.execute_script("window.open('" + link + "','_blank');")
         first_tab_handle = self._web_driver.current_window_handle
 
         # Switch to the new tab
+        wait.number_of_windows(self._web_driver, 2)
         self._web_driver.switch_to.window(self._web_driver.window_handles[1])
-        time.sleep(2)
+        wait.page_loaded(self._web_driver)
 
         # Get data
         result = self._scraper.web_driver.page_source
@@ -37,10 +40,17 @@ class GetVidSrcUrl(actions.Action):
         # Close the the new tab
         self._web_driver.close()
         self._web_driver.switch_to.window(first_tab_handle)
-        time.sleep(2)
 
         try:
             post_info = json.loads(soup.text)
+        except JSONDecodeError as err:
+            # A page that is not JSON is the login or rate limit page of Instagram
+            governor.throttled(governor.JSON)
+            logger.error('Unable to get video source url: %s' % str(err))
+            return
+        governor.succeeded(governor.JSON)
+
+        try:
             if self.__is_multiple:
                 vid_url = post_info['graphql']['shortcode_media']['edge_sidecar_to_children']['edges'][
                     self.__post_index]['node']['video_url']
@@ -48,7 +58,7 @@ class GetVidSrcUrl(actions.Action):
             else:
                 vid_url = post_info['graphql']['shortcode_media']['video_url']
                 return vid_url
-        except (JSONDecodeError, KeyError) as err:
+        except KeyError as err:
             logger.error('Unable to get video source url: %s' % str(err))
 
     def on_fail(self):
@@ -1,17 +1,20 @@
 import logging
-import time
 
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import StaleElementReferenceException
-from selenium.webdriver.support.wait import WebDriverWait
 from selenium.common.exceptions import TimeoutException
 from selenium.common.exceptions import WebDriverException
 
 from .. import constants
 from .. import actions
+from .. import wait
+from .. import governor
+from .. import instrumentation
 
 logger = logging.getLogger('__name__')
 
+PAGE_LOAD_SPAN = 'page_load'
+
 
 class GoToLink(actions.Action):
     def __init__(self, scraper, link, force=False):
@@ -36,11 +39,18 @@ class GoToLink(actions.Action):
                 return
 
         try:
-            self._web_driver.get(link)
+            governor.acquire(governor.PAGE)
+            if self._scraper.account is not None:
+                # An account that used up its budget hands the browser over to the least used account
+                if not self._scraper.account_pool.is_available(self._scraper.account):
+                    self._scraper.switch_account(throttled=False)
+                self._scraper.account_pool.record(self._scraper.account)
+            with instrumentation.span(PAGE_LOAD_SPAN):
+                self._web_driver.get(link)
 
-            WebDriverWait(
-                self._web_driver, 10).until(lambda d: d.execute_script('return document.readyState') == 'complete')
-            time.sleep(3)
+                # Wait for the document and then for the page content or an error page
+                wait.page_loaded(self._web_driver)
+                wait.css(self._web_driver, constants.PAGE_LOADED_CSS)
 
             # Check for page load failure
             try:
@@ -54,9 +64,20 @@ class GoToLink(actions.Action):
                 self._web_driver.find_element_by_id(constants.SORRY_ID)
                 self.__page_reload_tries += 1
                 logger.warning('facebook error')
+
+                # Instagram is limiting requests, the next load waits until the governor allows it
+                governor.throttled(governor.PAGE)
+                self._scraper.switch_account()
                 self.do()
+                return
             except (NoSuchElementException, StaleElementReferenceException):
-                pass
+                governor.succeeded(governor.PAGE)
+
+            if self._scraper.session_unverified and not self._scraper.verify_session():
+                # The page was loaded without a session, load it again now that the login is done
+                self.__force = True
+                self.do()
+                return
 
         except (TimeoutException, WebDriverException) as err:
             logger.error(err)
@@ -1,82 +1,101 @@
-import time
 import logging
 
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.common.exceptions import ElementClickInterceptedException
+from selenium.common.exceptions import WebDriverException
 
 from .. import constants
 from .. import actions
+from .. import wait
 
 logger = logging.getLogger('__name__')
 
+# Returns the hrefs matching the css selector that were not returned before on this page, when an xpath is given
+# only the hrefs inside the xpath element, the hrefs already returned are remembered in the page itself
+GRAB_NEW_LINKS_SCRIPT = """
+var root = document;
+if (arguments[0]) {
+    root = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null)
+        .singleNodeValue;
+    if (!root) { return []; }
+}
+if (arguments[2] || !window.grabbedPostLinks) { window.grabbedPostLinks = new Set(); }
+var links = [];
+root.querySelectorAll(arguments[1]).forEach(function (element) {
+    if (element.href && !window.grabbedPostLinks.has(element.href)) {
+        window.grabbedPostLinks.add(element.href);
+        links.push(element.href);
+    }
+});
+return links;
+"""
+
 
 class GrabPostLinks(actions.Action):
-    def __init__(self, scraper, link, xpath=None):
+    def __init__(self, scraper, link, xpath=None, known_links=None):
         super().__init__(scraper)
         self.__link = link
         self.__max_download = scraper.max_download
         self.__xpath = xpath
+        self.__known_links = known_links
 
     def do(self):
         """
         Scroll all the way down to the bottom of the page
         When xpath is given, only links inside the xpath will be retrieved
+        When known links are given, scrolling stops at a run of known links
         """
 
         actions.GoToLink(self._scraper, self.__link).do()
 
+        # Ordered set of links, the set makes membership checks O(1)
         post_links = []
+        seen_links = set()
 
         increment_browser_height = True
+        reset = True
 
         while True:
 
             def grab_links():
-                """ Search for links on the page and retrieve them """
-
-                links = []
+                """ Return the post links on the page that were not returned before, in one round trip """
 
-                # Grab post links inside the xpath only
-                if self.__xpath:
-                    try:
-                        element_box = self._web_driver.find_element_by_xpath(self.__xpath)
-                        posts_element = element_box.find_elements_by_css_selector(constants.POSTS_CSS + ' [href]')
-                        links += [post_element.get_attribute('href') for post_element in posts_element]
-                    except (NoSuchElementException, StaleElementReferenceException) as err1:
-                        logger.error(err1)
-                        return []
-
-                # Grab all post links
-                else:
-                    try:
-                        elements = self._web_driver.find_elements_by_css_selector(constants.POSTS_CSS + ' [href]')
-                    except (NoSuchElementException, StaleElementReferenceException) as err2:
-                        logger.error(err2)
-                        return []
-
-                    try:
-                        links += [post_element.get_attribute('href') for post_element in elements]
-                    except StaleElementReferenceException as err3:
-                        logger.error(err3)
-                        return []
-
-                # Remove all duplicate links in the list and keep the list order
-                links = sorted(set(links), key=lambda index: links.index(index))
+                try:
+                    return self._web_driver.execute_script(GRAB_NEW_LINKS_SCRIPT, self.__xpath,
+                                                           constants.POSTS_CSS + ' [href]', reset)
+                except WebDriverException as err:
+                    logger.error(err)
+                    return []
 
-                return links
+            def add_links(links):
+                for link in links:
+                    if link not in seen_links:
+                        seen_links.add(link)
+                        post_links.append(link)
 
-            post_links += grab_links()
+            add_links(grab_links())
+            reset = False
 
-            # Remove any duplicates and return the list if maximum was reached
-            post_links = sorted(set(post_links), key=lambda index: post_links.index(index))
+            # Return the list if maximum was reached
             if len(post_links) >= self.__max_download:
                 self._web_driver.maximize_window()
                 return post_links[:self.__max_download]
 
-            # Scroll down to bottom
+            # The posts below a run of known posts or below the watermark were grabbed before
+            if self.__known_links is not None and self.__known_links.stop_grabbing(post_links):
+                self._web_driver.maximize_window()
+                return post_links
+
+            # Scroll down to bottom and wait for the next posts to load or for the show more posts button
+            scroll_height = self._web_driver.execute_script('return document.body.scrollHeight;')
             self._web_driver.execute_script('window.scrollTo(0, document.body.scrollHeight);')
-            time.sleep(0.5)
+
+            def more_posts_loaded(d):
+                return (d.execute_script('return document.body.scrollHeight;') > scroll_height
+                        or len(d.find_elements_by_css_selector(constants.SHOW_MORE_POSTS_CSS)) > 0)
+
+            wait.until(self._web_driver, more_posts_loaded, 'more posts loaded')
 
             # If instagram asks to show more posts, click it
             try:
@@ -93,10 +112,10 @@ class GrabPostLinks(actions.Action):
             try:
                 self._web_driver.find_element_by_css_selector(constants.SCROLL_LOAD_CSS)
             except (NoSuchElementException, StaleElementReferenceException):
-                # Reached the end, grab links for the last time, remove any duplicates and return the list
-                post_links += grab_links()
+                # Reached the end, grab links for the last time and return the list
+                add_links(grab_links())
                 self._web_driver.maximize_window()
-                return sorted(set(post_links), key=lambda index: post_links.index(index))[:self.__max_download]
+                return post_links[:self.__max_download]
             else:
                 # Change the browser height to prevent randomly being stuck while scrolling down
                 height = self._web_driver.get_window_size()['height']
@@ -0,0 +1,46 @@
+import logging
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import StaleElementReferenceException
+
+from .. import constants
+from .. import actions
+
+logger = logging.getLogger('__name__')
+
+
+class GrabTopTagLinks(actions.Action):
+    def __init__(self, scraper, link):
+        super().__init__(scraper)
+        self.__link = link
+        self.__max_download = scraper.max_download
+
+    def do(self):
+        """ Find the post links from the top tags """
+
+        actions.GoToLink(self._scraper, self.__link).do()
+
+        try:
+            top_tags_box_element = self._web_driver.find_element_by_xpath(constants.TOP_TAGS_XPATH)
+        except (NoSuchElementException, StaleElementReferenceException):
+            return []
+
+        try:
+            post_elements = top_tags_box_element.find_elements_by_css_selector(constants.POSTS_CSS + ' [href]')
+        except (NoSuchElementException, StaleElementReferenceException) as err:
+            logger.error(err)
+            self.on_fail()
+            return []
+
+        try:
+            post_links = [post_element.get_attribute('href') for post_element in post_elements]
+        except StaleElementReferenceException as err:
+            logger.error(err)
+            self.on_fail()
+            return []
+        else:
+            return post_links[:self.__max_download]
+
+    def on_fail(self):
+        print('error while retrieving post links')
+        self._scraper.stop()
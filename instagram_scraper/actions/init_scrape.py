@@ -1,10 +1,11 @@
 import logging
 
-from selenium.common.exceptions import NoSuchElementException
-from selenium.common.exceptions import StaleElementReferenceException
-
 from .. import constants
 from .. import actions
+from .. import wait
+from .. import helper
+from .. import retriever
+from .. import network_capture
 
 logger = logging.getLogger('__name__')
 
@@ -12,7 +13,7 @@ logger = logging.getLogger('__name__')
 class InitScrape(actions.Action):
     def __init__(self, scraper, link, output_path, userid=None):
         super().__init__(scraper)
-        self.__database = scraper.database
+        self.__post_recorder = scraper.post_recorder
         self.__link = link
         self.__output_path = output_path
         self.__userid = userid
@@ -20,29 +21,48 @@ class InitScrape(actions.Action):
     def do(self):
         """
         Load the post page and check whether to start scraping a post with single content or multiple content.
+        The post is written to the database once all of its files are downloaded.
         """
 
+        with self.__post_recorder.post(self.__link):
+            self.__scrape()
+
+    def __scrape(self):
+        # Only the responses of this post page are searched for the post
+        network_capture.clear(self._web_driver)
+
         # Load the post page, trigger on_fail after 3 unsuccessful tries
         post_page_load_success = False
         post_page_load_count = 0
         while not post_page_load_success and post_page_load_count < 3:
             actions.GoToLink(self._scraper, self.__link, force=True).do()
             post_page_load_count += 1
-            try:
-                self._web_driver.find_element_by_css_selector(constants.PAGE_USERNAME)
+            if wait.css(self._web_driver, constants.PAGE_USERNAME):
                 post_page_load_success = True
-            except (NoSuchElementException, StaleElementReferenceException):
-                if post_page_load_count >= 3:
-                    logger.warning('error loading page: post not found at %s' % self.__link)
-                    self.on_fail()
+            elif post_page_load_count >= 3:
+                logger.warning('error loading page: post not found at %s' % self.__link)
+                self.on_fail()
+
+        # All media urls are in the JSON the page loaded, no tabs have to be opened and no slides clicked
+        media = network_capture.get_post_media(self._web_driver, helper.extract_post_id_from_url(self.__link))
+        if media is not None:
+            self.__download_captured(media)
+            self.__post_recorder.record(self.__link, 'edge_sidecar_to_children' in media, self.__userid)
+            return
 
         if actions.PostHasMultipleContent(self._scraper, self.__link).do():
             actions.ScrapeMultipleContent(self._scraper, self.__link, self.__output_path).do()
-            self.__database.insert_post(self.__link, True, self.__userid)
+            self.__post_recorder.record(self.__link, True, self.__userid)
         else:
             actions.ScrapeSingleContent(self._scraper, self.__link, self.__output_path).do()
-            self.__database.insert_post(self.__link, False, self.__userid)
+            self.__post_recorder.record(self.__link, False, self.__userid)
 
     def on_fail(self):
         print('\nerror loading post')
         self._scraper.stop()
+
+    def __download_captured(self, media):
+        date_time = helper.get_datetime_str_from_timestamp(media['taken_at_timestamp'])
+        for url in helper.get_media_urls(media):
+            file_name = date_time + '-' + retriever.get_file_name_from_url(url)
+            self._scraper.download_pool.submit(url, self.__output_path, file_name)
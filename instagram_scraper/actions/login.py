@@ -1,4 +1,3 @@
-import time
 import getpass
 import logging
 
@@ -8,6 +7,7 @@ from selenium.common.exceptions import StaleElementReferenceException
 
 from .. import constants
 from .. import actions
+from .. import wait
 
 logger = logging.getLogger('__name__')
 
@@ -37,7 +37,11 @@ class Login(actions.Action):
 
             self._web_driver.find_element_by_css_selector(constants.LOGIN_BUTTON_CSS).click()
 
-            time.sleep(5)
+            # Wait for any of the pages that can follow a login attempt
+            wait.any_css(self._web_driver, [constants.BUTTON_NO_SAVE_LOGIN_INFO_CSS,
+                                            constants.NO_NOTIFICATIONS_BUTTON_CSS,
+                                            constants.FAILED_LOGIN_MESSAGE_CSS,
+                                            constants.SUCCESS_LOGIN_USERNAME_CSS])
         except (NoSuchElementException, StaleElementReferenceException, ElementClickInterceptedException) as err:
             logger.error(err)
             self.on_fail()
@@ -67,7 +71,8 @@ class Login(actions.Action):
         except(NoSuchElementException, StaleElementReferenceException, ElementClickInterceptedException):
             pass
         else:
-            time.sleep(2)
+            wait.any_css(self._web_driver, [constants.NO_NOTIFICATIONS_BUTTON_CSS,
+                                            constants.SUCCESS_LOGIN_USERNAME_CSS])
 
         # Check for failed login message
         try:
@@ -1,4 +1,3 @@
-import time
 import logging
 
 from selenium.common.exceptions import NoSuchElementException
@@ -7,6 +6,7 @@ from selenium.common.exceptions import StaleElementReferenceException
 
 from .. import constants
 from .. import actions
+from .. import wait
 
 logger = logging.getLogger('__name__')
 
@@ -31,7 +31,7 @@ class Logout(actions.Action):
             return
         else:
             self._scraper.is_logged_in = False
-            time.sleep(2)
+            wait.css(self._web_driver, constants.CREDENTIALS_BOXES_CSS)
 
     def on_fail(self):
         print('logout failed')
@@ -1,15 +1,14 @@
 import logging
-import time
 
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.common.exceptions import ElementClickInterceptedException
-from requests.exceptions import RequestException
 
 from .. import constants
 from .. import actions
 from .. import retriever
 from .. import helper
+from .. import wait
 
 logger = logging.getLogger('__name__')
 
@@ -23,16 +22,18 @@ class ScrapeMultipleContent(actions.Action):
     def do(self):
         """ Find the src url of images and videos from a post with multiple content and download it """
 
-        def click_next_control():
+        def click_next_control(next_index):
             """ Go to the next content in a post with multiple content """
 
             try:
                 self._web_driver.find_element_by_css_selector(constants.NEXT_CONTROL_CSS).click()
-                time.sleep(1)
             except (NoSuchElementException, StaleElementReferenceException, ElementClickInterceptedException) as error:
                 logger.error(error)
                 self._scraper.stop()
 
+            if not wait.active_indicator(self._web_driver, next_index):
+                logger.warning('content %s did not become active at %s' % (next_index, self.__link))
+
         # Get the publish date of the post
         date_time = None
 
@@ -100,7 +101,7 @@ class ScrapeMultipleContent(actions.Action):
                 self.__download(img_url, self.__output_path, file_name=file_name)
 
                 if post_index < post_content_count - 1:
-                    click_next_control()
+                    click_next_control(post_index + 1)
                     continue
                 else:
                     return
@@ -114,7 +115,7 @@ class ScrapeMultipleContent(actions.Action):
             self.__download(vid_url, self.__output_path, file_name=file_name)
 
             if post_index < post_content_count - 1:
-                click_next_control()
+                click_next_control(post_index + 1)
                 continue
             else:
                 return
@@ -124,9 +125,6 @@ class ScrapeMultipleContent(actions.Action):
         self._scraper.stop()
 
     def __download(self, url, output_path, file_name):
-        try:
-            retriever.download(url, output_path, file_name)
-        except (OSError, RequestException) as err:
-            print(' error downloading')
-            logger.error(err)
-            self.on_fail()
+        """ Hand the file over to the download pool, the browser can move on to the next post """
+
+        self._scraper.download_pool.submit(url, output_path, file_name)
@@ -3,7 +3,6 @@ from instagram_scraper import helper
 
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import StaleElementReferenceException
-from requests.exceptions import RequestException
 
 from .. import constants
 from .. import actions
@@ -55,9 +54,6 @@ class ScrapeSingleContent(actions.Action):
         self._scraper.stop()
 
     def __download(self, url, output_path, file_name):
-        try:
-            retriever.download(url, output_path, file_name)
-        except (OSError, RequestException) as err:
-            print(' error downloading')
-            logger.error(err)
-            self.on_fail()
+        """ Hand the file over to the download pool, the browser can move on to the next post """
+
+        self._scraper.download_pool.submit(url, output_path, file_name)
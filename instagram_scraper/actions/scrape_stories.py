@@ -1,14 +1,12 @@
 import logging
-import time
 
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.common.exceptions import ElementClickInterceptedException
-from requests.exceptions import RequestException
 
 from .. import constants
 from .. import actions
-from .. import retriever
+from .. import wait
 from ..progress_bar import ProgressBar
 
 logger = logging.getLogger('__name__')
@@ -19,6 +17,7 @@ class ScrapeStories(actions.Action):
         super().__init__(scraper)
         self.__user = user
         self.__stories_count = stories_count
+        self.__img_css = 'img[class="' + constants.STORIES_IMG_CSS[1:] + '"]'
 
     def do(self):
         """ Find the src urls of images and videos from stories and save """
@@ -31,7 +30,7 @@ class ScrapeStories(actions.Action):
             logger.error(err)
             self.on_fail()
         else:
-            time.sleep(2)
+            wait.until(self._web_driver, self.__story_url, 'first story')
 
         progress_bar = ProgressBar(self.__stories_count, show_count=True)
         for i in range(self.__stories_count):
@@ -45,11 +44,7 @@ class ScrapeStories(actions.Action):
                 vid_elements_src = vid_elements.find_elements_by_tag_name('source')
                 vid_url = vid_elements_src[0].get_attribute('src')
 
-                try:
-                    retriever.download(vid_url, self.__user.output_user_stories_path)
-                except (OSError, RequestException) as err:
-                    logger.error(err)
-                    self.on_fail()
+                self._scraper.download_pool.submit(vid_url, self.__user.output_user_stories_path)
 
                 progress_bar.update(1)
 
@@ -62,23 +57,18 @@ class ScrapeStories(actions.Action):
                         self.on_fail()
                     else:
                         next_story_button.click()
-                        time.sleep(1)
+                        self.__wait_for_next_story(vid_url)
                 continue
 
             # Check if the story is an image and download it
             try:
-                img_element = self._web_driver.find_element_by_css_selector(
-                    'img[class="' + constants.STORIES_IMG_CSS[1:] + '"]')
+                img_element = self._web_driver.find_element_by_css_selector(self.__img_css)
             except (NoSuchElementException, StaleElementReferenceException):
                 pass
             else:
                 img_url = img_element.get_attribute('src')
 
-                try:
-                    retriever.download(img_url, self.__user.output_user_stories_path)
-                except (OSError, RequestException) as err:
-                    logger.error(err)
-                    self.on_fail()
+                self._scraper.download_pool.submit(img_url, self.__user.output_user_stories_path)
 
                 progress_bar.update(1)
 
@@ -91,11 +81,30 @@ class ScrapeStories(actions.Action):
                         self.on_fail()
                     else:
                         next_story_button.click()
-                        time.sleep(1)
+                        self.__wait_for_next_story(img_url)
                 continue
 
         progress_bar.close()
 
+    def __story_url(self, web_driver):
+        """ Return the src url of the story that is displayed """
+
+        try:
+            vid_element = web_driver.find_element_by_css_selector(constants.STORIES_VID_CSS)
+            return vid_element.find_elements_by_tag_name('source')[0].get_attribute('src')
+        except (NoSuchElementException, IndexError):
+            pass
+
+        try:
+            return web_driver.find_element_by_css_selector(self.__img_css).get_attribute('src')
+        except NoSuchElementException:
+            return None
+
+    def __wait_for_next_story(self, previous_url):
+        """ Wait until a story with another src url is displayed """
+
+        wait.until(self._web_driver, lambda d: self.__story_url(d) not in [None, previous_url], 'next story')
+
     def on_fail(self):
         print('\nan error occurred while downloading images/videos')
         self._scraper.stop()
@@ -5,9 +5,13 @@ import logging
 from signal import signal, SIGINT
 
 import colorama
+from requests.exceptions import RequestException
 
 from . import constants
 from .scraper import Scraper
+from .metrics import MetricsExporter
+from .database import Database
+from .session_store import SessionStore
 from .models.user import User
 from .models.tag import Tag
 from . import __version__
@@ -16,6 +20,12 @@ from . import remove_data
 from . import update_data
 from . import get_data
 from . import arguments
+from . import journal
+from . import account_pool
+from . import daemon
+from . import instrumentation
+from . import governor
+from . import user_resolver
 from get_chrome_driver import GetChromeDriver
 from get_chrome_driver.exceptions import GetChromeDriverError
 
@@ -79,6 +89,13 @@ class App:
         if self.__arg_passed(self.__arg_log):
             open(constants.LOG_FILE, 'a').close()
 
+        ###########
+        # PROFILE #
+        ###########
+        self.__arg_profile = self.__args.profile
+        if self.__arg_passed(self.__arg_profile):
+            instrumentation.enable(self.__arg_profile[0] if len(self.__arg_profile) > 0 else None)
+
         ###########
         # VERSION #
         ###########
@@ -209,6 +226,38 @@ class App:
         else:
             headful = False
 
+        ############
+        # BROWSERS #
+        ############
+        self.__arg_browsers = self.__args.browsers
+        if self.__arg_passed(self.__arg_browsers):
+            try:
+                if int(self.__arg_browsers[0]) < 1:
+                    print('--browsers has to be 1 or greater')
+                    sys.exit(0)
+                browsers = int(self.__arg_browsers[0])
+            except (ValueError, TypeError, IndexError):
+                print('--browsers value has to be a number')
+                sys.exit(0)
+        else:
+            browsers = 0
+
+        ####################
+        # DOWNLOAD WORKERS #
+        ####################
+        self.__arg_download_workers = self.__args.download_workers
+        if self.__arg_passed(self.__arg_download_workers):
+            try:
+                if int(self.__arg_download_workers[0]) < 1:
+                    print('--download-workers has to be 1 or greater')
+                    sys.exit(0)
+                download_workers = int(self.__arg_download_workers[0])
+            except (ValueError, TypeError, IndexError):
+                print('--download-workers value has to be a number')
+                sys.exit(0)
+        else:
+            download_workers = constants.DOWNLOAD_WORKERS_DEFAULT
+
         ############
         # TOP TAGS #
         ############
@@ -233,15 +282,19 @@ class App:
                 print(self.__message_must_provide_tag)
                 sys.exit(0)
 
-        # Download and install ChromeDriver
-        get_driver = GetChromeDriver()
-        try:
-            get_driver.install()
-        except GetChromeDriverError:
-            print('error downloading ChromeDriver')
-            sys.exit(0)
+        ##########
+        # ENGINE #
+        ##########
+        self.__arg_engine = self.__args.engine
+        if self.__arg_passed(self.__arg_engine):
+            engines = [constants.ENGINE_SELENIUM, constants.ENGINE_HTTP]
+            if len(self.__arg_engine) < 1 or self.__arg_engine[0].lower() not in engines:
+                print('--engine has to be one of: ' + ', '.join(engines))
+                sys.exit(0)
+            engine = self.__arg_engine[0].lower()
+        else:
+            engine = constants.ENGINE_SELENIUM
 
-        print('starting...')
 
         #########
         # USERS #
@@ -268,6 +321,39 @@ class App:
                 print(self.__message_no_db_found)
                 sys.exit(0)
 
+        ##########
+        # RESUME #
+        ##########
+        self.__arg_resume = self.__args.resume
+        resume = self.__arg_passed(self.__arg_resume)
+        if resume:
+            # Users and tags given on the command line are scraped first
+            usernames = [user.username for user in self.__users]
+            top_tagnames = [tag.tagname for tag in self.__top_tags]
+            recent_tagnames = [tag.tagname for tag in self.__recent_tags]
+            for kind, name, tag_type in journal.get_unfinished_owners():
+                if kind == journal.OWNER_USER and name not in usernames:
+                    self.__users.append(User(name))
+                    usernames.append(name)
+                elif tag_type == constants.TAG_TYPE_TOP and name not in top_tagnames:
+                    self.__top_tags.append(Tag(name))
+                    top_tagnames.append(name)
+                elif tag_type == constants.TAG_TYPE_RECENT and name not in recent_tagnames:
+                    self.__recent_tags.append(Tag(name))
+                    recent_tagnames.append(name)
+
+        ###################
+        # ASYNC DOWNLOADS #
+        ###################
+        self.__arg_async_downloads = self.__args.async_downloads
+        async_downloads = self.__arg_passed(self.__arg_async_downloads)
+
+        #########
+        # STORE #
+        #########
+        self.__arg_store = self.__args.store
+        store = self.__arg_passed(self.__arg_store)
+
         ##################
         # LOGIN USERNAME #
         ##################
@@ -277,20 +363,177 @@ class App:
         else:
             login_username = None
 
+        ##########
+        # LOGOUT #
+        ##########
+        self.__arg_logout = self.__args.logout
+        logout = self.__arg_passed(self.__arg_logout)
+        if logout and not login_username:
+            print('--logout needs --login-username')
+            sys.exit(0)
+
+        ################
+        # METRICS PORT #
+        ################
+        self.__arg_metrics_port = self.__args.metrics_port
+        if self.__arg_passed(self.__arg_metrics_port):
+            metrics_port = self.__get_port(self.__arg_metrics_port, '--metrics-port', constants.METRICS_PORT_DEFAULT)
+            # One exporter for the whole process, the counters keep going when --serve starts a new scraper
+            try:
+                metrics = MetricsExporter(metrics_port).start()
+            except OSError as err:
+                print(self.__c_fore.RED + 'could not serve metrics on port ' + str(metrics_port) + ': ' + str(err)
+                      + self.__c_style.RESET_ALL)
+                sys.exit(0)
+            metrics.add_gauge('governor.rate', governor.rates, label='endpoint')
+            instrumentation.add_listener(metrics)
+        else:
+            metrics = None
+
+        ############
+        # ACCOUNTS #
+        ############
+        self.__arg_accounts = self.__args.accounts
+        if self.__arg_passed(self.__arg_accounts):
+            if login_username:
+                print('use either --login-username or --accounts')
+                sys.exit(0)
+            try:
+                # The cookies of the accounts are kept encrypted, without cryptography they stay in the file
+                session_store = SessionStore()
+            except ImportError as err:
+                print(self.__c_fore.RED + str(err) + self.__c_style.RESET_ALL)
+                session_store = None
+            try:
+                accounts = account_pool.load(self.__arg_accounts[0], session_store)
+            except IndexError:
+                print('provide the accounts file')
+                sys.exit(0)
+            except (OSError, ValueError) as err:
+                print(self.__c_fore.RED + 'could not load accounts: ' + str(err) + self.__c_style.RESET_ALL)
+                sys.exit(0)
+        else:
+            accounts = None
+
+        ##########
+        # DAEMON #
+        ##########
+        self.__arg_daemon = self.__args.daemon
+        if self.__arg_passed(self.__arg_daemon):
+            port = self.__get_port(self.__arg_daemon, '--daemon')
+            job = {'users': [user.username for user in self.__users],
+                   'top_tags': [tag.tagname for tag in self.__top_tags],
+                   'recent_tags': [tag.tagname for tag in self.__recent_tags],
+                   'incremental': self.__arg_passed(self.__arg_update_users)}
+            if max_download > 0:
+                job['max'] = max_download
+            try:
+                job_id = daemon.submit(job, port)
+            except RequestException:
+                print(self.__c_fore.RED + 'no igscraper --serve is running on port ' + str(port)
+                      + self.__c_style.RESET_ALL)
+                sys.exit(0)
+            except ValueError as err:
+                print(self.__c_fore.RED + str(err) + self.__c_style.RESET_ALL)
+                sys.exit(0)
+            print('job ' + str(job_id) + ' submitted')
+            sys.exit(0)
+
+        #########
+        # SERVE #
+        #########
+        self.__arg_serve = self.__args.serve
+        if self.__arg_passed(self.__arg_serve):
+            port = self.__get_port(self.__arg_serve, '--serve')
+            if max_download == 0:
+                print(self.__c_fore.RED + 'add the argument \'--max 3\' to specify the maximum amount of posts '
+                      + 'to scrape of jobs that have no maximum' + self.__c_style.RESET_ALL)
+                sys.exit(0)
+
+            self.__install_chrome_driver(engine)
+            print('starting...')
+            self.__max_download = max_download
+
+            def create_scraper():
+                return Scraper(headful, download_stories, max_download, login_username, download_workers,
+                               engine, browsers, resume, store, async_downloads, accounts, logout, metrics)
+
+            try:
+                daemon.Daemon(create_scraper, self.__run_job, port).serve()
+            except OSError as err:
+                print(self.__c_fore.RED + 'could not listen on port ' + str(port) + ': ' + str(err)
+                      + self.__c_style.RESET_ALL)
+            finally:
+                self.__stop_metrics(metrics)
+            sys.exit(0)
+
         if len(self.__users) == 0 and len(self.__top_tags) == 0 and len(self.__recent_tags) == 0:
-            print('provide at least one username or tag to scrape.')
+            if resume:
+                print('nothing to resume.')
+            else:
+                print('provide at least one username or tag to scrape.')
+            sys.exit(0)
+
+        self.__install_chrome_driver(engine)
+        print('starting...')
+
+        try:
+            self.__scraper = Scraper(headful, download_stories, max_download, login_username, download_workers,
+                                     engine, browsers, resume, store, async_downloads, accounts, logout, metrics)
+
+            if len(self.__users) > 0:
+                self.__scraper.init_scrape_users(self.__users,
+                                                 incremental=self.__arg_passed(self.__arg_update_users))
+            if len(self.__top_tags) > 0:
+                self.__scraper.init_scrape_tags(self.__top_tags, constants.TAG_TYPE_TOP)
+            if len(self.__recent_tags) > 0:
+                self.__scraper.init_scrape_tags(self.__recent_tags, constants.TAG_TYPE_RECENT)
+
+            self.__scraper.stop()
+        finally:
+            self.__stop_metrics(metrics)
+
+    def __stop_metrics(self, metrics):
+        """ The exporter belongs to the app, the daemon replaces scrapers while it keeps serving """
+
+        if metrics is not None:
+            instrumentation.remove_listener(metrics)
+            metrics.shutdown()
+
+    def __install_chrome_driver(self, engine):
+        """ Download and install ChromeDriver """
+
+        if engine == constants.ENGINE_SELENIUM:
+            get_driver = GetChromeDriver()
+            try:
+                get_driver.install()
+            except GetChromeDriverError:
+                print('error downloading ChromeDriver')
+                sys.exit(0)
+
+    def __get_port(self, arg, name, default=constants.DAEMON_PORT_DEFAULT):
+        if len(arg) == 0:
+            return default
+        try:
+            return int(arg[0])
+        except ValueError:
+            print(name + ' port has to be a number')
             sys.exit(0)
 
-        self.__scraper = Scraper(headful, download_stories, max_download, login_username)
+    def __run_job(self, scraper, job):
+        """ Scrape the users and tags of a job that was sent to the daemon """
 
-        if len(self.__users) > 0:
-            self.__scraper.init_scrape_users(self.__users)
-        if len(self.__top_tags) > 0:
-            self.__scraper.init_scrape_tags(self.__top_tags, constants.TAG_TYPE_TOP)
-        if len(self.__recent_tags) > 0:
-            self.__scraper.init_scrape_tags(self.__recent_tags, constants.TAG_TYPE_RECENT)
+        scraper.max_download = job.get('max') or self.__max_download
 
-        self.__scraper.stop()
+        users = self.__create_user_objects(job.get('users', []))
+        if len(users) > 0:
+            scraper.init_scrape_users(users, incremental=job.get('incremental', False))
+        top_tags = self.__create_tag_objects(job.get('top_tags', []))
+        if len(top_tags) > 0:
+            scraper.init_scrape_tags(top_tags, constants.TAG_TYPE_TOP)
+        recent_tags = self.__create_tag_objects(job.get('recent_tags', []))
+        if len(recent_tags) > 0:
+            scraper.init_scrape_tags(recent_tags, constants.TAG_TYPE_RECENT)
 
     def __arg_passed(self, arg):
         if isinstance(arg, list):
@@ -318,12 +561,13 @@ class App:
     def __create_user_objects(self, usernames_to_scrape):
         """ Create user objects """
 
+        usernames = [input_username.lower() for input_username in usernames_to_scrape]
+        if self.__is_db_present():
+            usernames = self.__check_if_usernames_have_changed(usernames)
+
         users = []
-        for input_username in usernames_to_scrape:
-            input_username = input_username.lower()
-            if self.__is_db_present():
-                input_username = self.__check_if_username_has_changed(input_username)
-            user = User(input_username)
+        for username in usernames:
+            user = User(username)
             users.append(user)
         return users
 
@@ -337,18 +581,30 @@ class App:
             tags.append(tag)
         return tags
 
-    def __check_if_username_has_changed(self, input_username):
-        """ If user has a new username, update it in the database and rename the user dir """
-
-        user_id = get_data.get_id_by_username_from_db(input_username)
-        if user_id:
-            username = get_data.get_username_by_id(user_id)
-            if username:
-                if input_username != username:
-                    update_data.rename_user(user_id, username)
-                    helper.rename_user_dir(input_username, username)
-                    return username
-        return input_username
+    def __check_if_usernames_have_changed(self, input_usernames):
+        """
+        If users have a new username, update it in the database and rename the user dir
+        The usernames that were not confirmed recently are looked up at the same time
+        """
+
+        database = Database()
+        database.create_tables()
+        user_ids = {input_username: database.get_id_by_username(input_username) for input_username in input_usernames}
+        current_usernames = user_resolver.resolve_usernames(
+            database, [user_id for user_id in user_ids.values() if user_id], get_data.get_username_by_id)
+        database.close_connection()
+
+        usernames = []
+        for input_username in input_usernames:
+            user_id = user_ids[input_username]
+            username = current_usernames.get(str(user_id)) if user_id else None
+            if username and input_username != username:
+                update_data.rename_user(user_id, username)
+                helper.rename_user_dir(input_username, username)
+                usernames.append(username)
+            else:
+                usernames.append(input_username)
+        return usernames
 
     def __list_all_users(self):
         """ List all users in the database """
@@ -1,6 +1,9 @@
+from . import constants
+
 descriptor = '  {:<30} {}'
 message_help_required_tagname = descriptor.format('', 'required: provide a tag to scrape')
 message_help_required_login_username = descriptor.format('', 'required: add a login username')
+message_help_required_accounts_file = descriptor.format('', 'required: a JSON file with dummy accounts')
 message_help_required_users_to_remove = descriptor.format('', 'required: add users to remove')
 message_help_required_users_n_to_remove = descriptor.format('', 'required: add user numbers to remove')
 message_help_required_tags_to_remove = descriptor.format('', 'required: add tags to remove')
@@ -8,10 +11,20 @@ message_help_required_tags_n_to_remove = descriptor.format('', 'required: add ta
 message_help_required_max = descriptor.format('', 'required: provide a max number of posts to scrape')
 message_help_recommended_max = descriptor.format('', 'recommended: provide a max number of posts to scrape')
 message_help_required_logged_in = descriptor.format('', 'required: you need to be logged in')
+message_help_engine = descriptor.format('', 'selenium (default) or http, http does not start a browser')
+message_help_required_aiohttp = descriptor.format('', 'required: pip install igscraper[async]')
+message_help_required_cryptography = descriptor.format('', 'required: pip install igscraper[session]')
+message_help_default_daemon_port = descriptor.format('', 'default port: ' + str(constants.DAEMON_PORT_DEFAULT))
+message_help_default_metrics_port = descriptor.format('', 'default port: ' + str(constants.METRICS_PORT_DEFAULT))
+message_help_default_download_workers = descriptor.format('', 'default: ' + str(constants.DOWNLOAD_WORKERS_DEFAULT))
 
 args_options = [
-    ['--login-username', 'the login username' + '\n'
+    ['--login-username', 'the login username, the session is saved for the next run' + '\n'
+     + message_help_required_cryptography],
+    ['--logout', 'log out at the end and forget the saved session' + '\n'
      + message_help_required_login_username],
+    ['--accounts', 'spread the requests over the dummy accounts of a file' + '\n'
+     + message_help_required_accounts_file],
     ['--update-users', 'check all previously scraped users for new posts' + '\n'
      + message_help_recommended_max],
     ['--top-tags', 'scrape top tags' + '\n'
@@ -23,6 +36,19 @@ args_options = [
     ['--stories', 'scrape stories also' + '\n'
      + message_help_required_logged_in],
     ['--headful', 'display the browser'],
+    ['--engine', 'scrape engine to use' + '\n'
+     + message_help_engine],
+    ['--browsers', 'number of extra browsers that scrape posts in parallel'],
+    ['--download-workers', 'number of files to download at the same time' + '\n'
+     + message_help_default_download_workers],
+    ['--async-downloads', 'download with asyncio, many more files can be downloaded at the same time' + '\n'
+     + message_help_required_aiohttp],
+    ['--resume', 'continue the users and tags the previous run did not finish'],
+    ['--store', 'write every media file once and link it into the user and tag directories'],
+    ['--serve', 'keep the browser running and scrape the jobs that are sent to it' + '\n'
+     + message_help_default_daemon_port],
+    ['--daemon', 'send the users and tags to a running --serve instead of scraping them here' + '\n'
+     + message_help_default_daemon_port],
     ['--list-users', 'list all scraped users'],
     ['--list-tags', 'list all scraped tags'],
     ['--remove-users', 'remove user(s)' + '\n'
@@ -35,6 +61,9 @@ args_options = [
     ['--remove-tags-n', 'remove tag(s) by number' + '\n'
      + message_help_required_tags_n_to_remove],
     ['--remove-all-tags', 'remove all tags'],
+    ['--profile', 'print where the time of the run went, a JSON trace is written to the given file'],
+    ['--metrics-port', 'serve the counters and latencies of the run as OpenMetrics on /metrics' + '\n'
+     + message_help_default_metrics_port],
     ['--version', 'program version'],
     ['--log', 'create log file'],
     ['--help', 'show help']
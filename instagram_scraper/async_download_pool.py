@@ -0,0 +1,251 @@
+import os
+import asyncio
+import logging
+import threading
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import retriever
+from . import governor
+from . import http_session
+from . import instrumentation
+
+logger = logging.getLogger('__name__')
+
+# Connections that are open to one host at the same time
+PER_HOST_LIMIT = 32
+
+CHUNK_SIZE = 262144
+
+
+class AsyncDownloadPool:
+
+    def __init__(self, concurrency, queue_size=None, per_host=PER_HOST_LIMIT, store=None):
+        """
+        Download files with asyncio on one background thread, the same interface as DownloadPool
+        concurrency downloads are in flight at most, per_host of them to the same host
+        The media rate of the governor paces the downloads, like it paces the downloads of DownloadPool
+        The queue is bounded, submit() blocks when the downloads can not keep up
+        """
+
+        if aiohttp is None:
+            raise ImportError('the async downloader needs aiohttp: pip install igscraper[async]')
+
+        self.__concurrency = max(1, concurrency)
+        self.__queue_size = queue_size if queue_size is not None else self.__concurrency * 4
+        self.__per_host = per_host
+        self.__store = store
+
+        self.__lock = threading.Lock()
+        self.__failed = []
+        self.__downloaded_count = 0
+        self.__listeners = []
+
+        self.__queue = None
+        self.__session = None
+        self.__workers = []
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+        asyncio.run_coroutine_threadsafe(self.__start(), self.__loop).result()
+
+    def add_listener(self, listener):
+        """ Same as DownloadPool.add_listener, file_done is called from the thread of the event loop """
+
+        self.__listeners.append(listener)
+
+    def submit(self, url, output_path='', file_name=''):
+        """ Put a file on the download queue, can be called from any thread """
+
+        for listener in self.__listeners:
+            listener.file_queued(url, output_path, file_name)
+        asyncio.run_coroutine_threadsafe(self.__queue.put((url, output_path, file_name)), self.__loop).result()
+
+    def wait(self):
+        """ Block until every submitted file has been downloaded """
+
+        asyncio.run_coroutine_threadsafe(self.__queue.join(), self.__loop).result()
+
+    def shutdown(self):
+        """ Finish all queued downloads and stop the event loop """
+
+        if not self.__thread.is_alive():
+            return
+
+        self.wait()
+        asyncio.run_coroutine_threadsafe(self.__stop(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+
+    def pop_failed(self):
+        """ Return the urls that failed to download since the last call """
+
+        with self.__lock:
+            failed = self.__failed
+            self.__failed = []
+        return failed
+
+    async def __start(self):
+        # The queue and the session belong to the event loop they are created on
+        self.__queue = asyncio.Queue(maxsize=self.__queue_size)
+        connector = aiohttp.TCPConnector(limit=self.__concurrency, limit_per_host=self.__per_host)
+        self.__session = aiohttp.ClientSession(connector=connector)
+        self.__workers = [asyncio.ensure_future(self.__work()) for _ in range(self.__concurrency)]
+
+    async def __stop(self):
+        for worker in self.__workers:
+            worker.cancel()
+        await asyncio.gather(*self.__workers, return_exceptions=True)
+        await self.__session.close()
+
+    async def __work(self):
+        while True:
+            url, output_path, file_name = await self.__queue.get()
+            success = False
+            try:
+                if self.__store is not None:
+                    # The store downloads with the governed session, it waits for the governor itself
+                    await self.__loop.run_in_executor(None, self.__store.download, url, output_path, file_name)
+                else:
+                    with instrumentation.span(instrumentation.DOWNLOAD_SPAN):
+                        await self.__download(url, output_path, file_name)
+            except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+                logger.error('error downloading %s: %s' % (url, err))
+                with self.__lock:
+                    self.__failed.append(url)
+            else:
+                success = True
+                with self.__lock:
+                    self.__downloaded_count += 1
+            finally:
+                for listener in self.__listeners:
+                    listener.file_done(url, output_path, file_name, success)
+                self.__queue.task_done()
+
+    async def __download(self, url, output_path, file_name):
+        """
+        Same as retriever.download, a file on disk is only asked for again if it changed
+        and an interrupted download continues its .part file
+        The disk is used on the executor, the event loop keeps the other downloads going
+        """
+
+        file_name, full_output_path, part_path = await self.__run(retriever.get_paths, url, output_path, file_name)
+        cached, headers = await self.__run(retriever.get_cache_headers, output_path, file_name, full_output_path)
+
+        for attempt in range(retriever.RESUME_TRIES):
+            if attempt > 0:
+                instrumentation.count('download.retries')
+
+            # Continue the .part file if the server still has the version it was started with
+            part_size, request_headers = await self.__run(retriever.get_resume_headers, output_path, file_name,
+                                                          part_path, headers)
+
+            async with await self.__get(url, request_headers) as res:
+                if res.status == 304 and headers:
+                    instrumentation.count('download.not_modified')
+                    return
+
+                # The .part file does not fit the file on the server anymore
+                if res.status == 416 and 'Range' in request_headers:
+                    await self.__run(os.remove, part_path)
+                    continue
+
+                if res.status not in (200, 206):
+                    raise aiohttp.ClientResponseError(res.request_info, res.history, status=res.status,
+                                                      message='Invalid URL')
+
+                if res.status == 200:
+                    # A file that was written before it had cache metadata is kept when its size matches
+                    content_length = res.headers.get('Content-Length')
+                    if cached is None and await self.__run(retriever.is_written, output_path, file_name,
+                                                           full_output_path, res, content_length):
+                        return
+
+                    # The whole file is sent, start the .part file over
+                    part_size = 0
+                    expected_size = retriever.get_expected_size(res, content_length)
+                    await self.__run(retriever.set_cached, output_path, file_name + retriever.PART_SUFFIX, res, 0)
+                else:
+                    start, expected_size = retriever.parse_content_range(res.headers.get('Content-Range'))
+                    if start != part_size:
+                        logger.warning('unexpected range %s for %s' % (res.headers.get('Content-Range'), url))
+                        await self.__run(os.remove, part_path)
+                        continue
+
+                file = await self.__run(open, part_path, 'ab' if part_size > 0 else 'wb')
+                try:
+                    async for chunk in res.content.iter_chunked(CHUNK_SIZE):
+                        await self.__run(file.write, chunk)
+                        instrumentation.count(instrumentation.BYTES_COUNTER, len(chunk))
+                except (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError, asyncio.TimeoutError) as err:
+                    # The next try continues where the connection dropped
+                    logger.warning('download of %s interrupted: %s' % (url, err))
+                    continue
+                finally:
+                    await self.__run(self.__close, file)
+
+            size = await self.__run(os.path.getsize, part_path)
+            if expected_size is not None and size != expected_size:
+                logger.warning('download of %s has %d of %d bytes' % (url, size, expected_size))
+                if size > expected_size:
+                    await self.__run(os.remove, part_path)
+                continue
+
+            await self.__run(os.replace, part_path, full_output_path)
+            await self.__run(retriever.set_cached, output_path, file_name, res, size)
+            return
+
+        # The .part file is kept, the next download of the file continues it
+        raise aiohttp.ClientPayloadError('Incomplete download: ' + url)
+
+    async def __get(self, url, headers):
+        """ Same as the governed session, wait for the governor and ask again after a 429 """
+
+        for attempt in range(http_session.THROTTLED_RETRIES + 1):
+            # Waiting here keeps the event loop free for the downloads that already have their turn
+            delay = governor.reserve(governor.MEDIA)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            res = await self.__session.get(url, headers=headers)
+            if res.status != 429 or attempt == http_session.THROTTLED_RETRIES:
+                break
+
+            instrumentation.count('request.retries')
+            governor.throttled(governor.MEDIA, self.__get_retry_after(res))
+            res.release()
+
+        governor.report(governor.MEDIA, res.status)
+        return res
+
+    async def __run(self, function, *args):
+        return await self.__loop.run_in_executor(None, function, *args)
+
+    @staticmethod
+    def __close(file):
+        file.flush()
+        os.fsync(file.fileno())
+        file.close()
+
+    @staticmethod
+    def __get_retry_after(res):
+        try:
+            return int(res.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+    @property
+    def workers(self):
+        return self.__concurrency
+
+    @property
+    def queue_depth(self):
+        return self.__queue.qsize()
+
+    @property
+    def downloaded_count(self):
+        return self.__downloaded_count
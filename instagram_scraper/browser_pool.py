@@ -0,0 +1,240 @@
+import queue
+import logging
+import threading
+
+from . import constants
+from . import actions
+from .database import Database
+from .account_pool import use_account
+
+logger = logging.getLogger('__name__')
+
+# Database methods that write, the other methods read
+WRITE_PREFIXES = ('insert_', 'set_', 'remove_', 'rename_')
+
+
+class WorkerStopped(Exception):
+    """ Raised when an action stops the browser worker it runs on """
+
+
+class DatabaseCalls:
+    """
+    Records the database writes of a worker, they are executed later by the single writer
+    Reads go to the connection that get_reader() returns, they do not see the writes that are not executed yet
+    """
+
+    def __init__(self, get_reader):
+        self.__calls = []
+        self.__get_reader = get_reader
+
+    def __getattr__(self, name):
+        if name.startswith(WRITE_PREFIXES):
+            def call(*args, **kwargs):
+                self.__calls.append((name, args, kwargs))
+            return call
+        return getattr(self.__get_reader(), name)
+
+    def execute(self, database):
+        for name, args, kwargs in self.__calls:
+            getattr(database, name)(*args, **kwargs)
+
+
+class BrowserWorker:
+    """ Takes the place of the scraper for the actions that run on a browser of the pool """
+
+    def __init__(self, scraper, web_driver, account=None):
+        self.__scraper = scraper
+        self.__web_driver = web_driver
+        self.__account = account
+        self.__cookies_accepted = scraper.cookies_accepted
+        self.__read_database = None
+        self.__database = DatabaseCalls(self.read_database)
+
+    def stop(self):
+        """ Only stop the post that is being scraped, not the whole scraper """
+
+        raise WorkerStopped()
+
+    def read_database(self):
+        """ Return the connection the worker thread reads with, it is opened on the first read """
+
+        if self.__read_database is None:
+            self.__read_database = Database()
+        return self.__read_database
+
+    def close(self):
+        if self.__read_database is not None:
+            self.__read_database.close_connection()
+            self.__read_database = None
+
+    def switch_account(self, throttled=True):
+        """ Same as Scraper.switch_account, for the account of this browser """
+
+        if self.__account is None:
+            return
+
+        account_pool = self.__scraper.account_pool
+        if throttled:
+            account_pool.throttled(self.__account)
+        self.__account = account_pool.acquire()
+        use_account(self.__web_driver, self.__account)
+
+    @property
+    def is_logged_in(self):
+        return self.__scraper.is_logged_in
+
+    @property
+    def session_unverified(self):
+        # The session was copied from the browser of the scraper, which checks it
+        return False
+
+    @property
+    def cookies_accepted(self):
+        return self.__cookies_accepted
+
+    @cookies_accepted.setter
+    def cookies_accepted(self, accepted):
+        self.__cookies_accepted = accepted
+
+    @property
+    def web_driver(self):
+        return self.__web_driver
+
+    @property
+    def login_username(self):
+        return self.__scraper.login_username
+
+    @property
+    def account(self):
+        return self.__account
+
+    @property
+    def account_pool(self):
+        return self.__scraper.account_pool
+
+    @property
+    def database(self):
+        return self.__database
+
+    @database.setter
+    def database(self, database):
+        self.__database = database
+
+    @property
+    def max_download(self):
+        return self.__scraper.max_download
+
+    @property
+    def download_pool(self):
+        return self.__scraper.download_pool
+
+    @property
+    def post_recorder(self):
+        return self.__scraper.post_recorder
+
+
+class BrowserPool:
+
+    def __init__(self, scraper, size, start_web_driver):
+        """
+        Start size browsers that scrape post links in parallel
+        When the scraper is logged in, the session cookies of its browser are shared with every browser
+        With an account pool every browser gets the least used account of the pool instead
+        """
+
+        self.__scraper = scraper
+        self.__jobs = queue.Queue()
+        self.__results = queue.Queue()
+        self.__workers = []
+        self.__threads = []
+
+        for _ in range(size):
+            web_driver = start_web_driver()
+            account = None
+            if scraper.account_pool is not None:
+                account = scraper.account_pool.acquire()
+                use_account(web_driver, account)
+            elif scraper.is_logged_in:
+                self.__share_session(web_driver)
+
+            worker = BrowserWorker(scraper, web_driver, account)
+            thread = threading.Thread(target=self.__work, args=(worker,), daemon=True)
+            thread.start()
+            self.__workers.append(worker)
+            self.__threads.append(thread)
+
+    def scrape(self, post_links, output_path, userid=None):
+        """
+        Hand the post links out to idle browsers
+        Yields (link, success) as posts finish, the database writes of a post are executed before it is yielded
+        """
+
+        for link in post_links:
+            self.__jobs.put((link, output_path, userid))
+
+        for _ in post_links:
+            link, success, database_calls = self.__results.get()
+            if success:
+                database_calls.execute(self.__scraper.database)
+            yield link, success
+
+    def stop(self):
+        """ Drop all jobs that were not started, stop the workers and quit their browsers """
+
+        while True:
+            try:
+                self.__jobs.get_nowait()
+            except queue.Empty:
+                break
+
+        for _ in self.__threads:
+            self.__jobs.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+
+        for worker in self.__workers:
+            try:
+                worker.web_driver.quit()
+            except AttributeError as err:
+                logger.error('Quit driver error: %s' % err)
+        self.__workers = []
+
+    def __share_session(self, web_driver):
+        """ Copy the cookies of the logged in browser of the scraper """
+
+        web_driver.get(constants.INSTAGRAM_URL)
+        web_driver.delete_all_cookies()
+        for cookie in self.__scraper.web_driver.get_cookies():
+            web_driver.add_cookie(cookie)
+
+    def __work(self, worker):
+        try:
+            self.__work_on_jobs(worker)
+        finally:
+            worker.close()
+
+    def __work_on_jobs(self, worker):
+        while True:
+            job = self.__jobs.get()
+            if job is None:
+                return
+
+            link, output_path, userid = job
+            worker.database = DatabaseCalls(worker.read_database)
+            try:
+                actions.InitScrape(worker, link, output_path, userid).do()
+            except WorkerStopped:
+                success = False
+            except Exception as err:
+                # Never let a worker die, the scraper waits for a result of every link
+                logger.error('error scraping %s: %s' % (link, err))
+                success = False
+            else:
+                success = True
+
+            self.__results.put((link, success, worker.database))
+
+    @property
+    def size(self):
+        return len(self.__workers)
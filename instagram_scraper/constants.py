@@ -3,15 +3,28 @@ INSTAGRAM_USER_INFO_URL_DEFAULT = 'https://www.instagram.com/{}/?__a=1'
 INSTAGRAM_USER_INFO_URL_MOBILE = 'https://i.instagram.com/api/v1/users/{}/info/'
 INSTAGRAM_POST_INFO = 'https://www.instagram.com/p/{}/?__a=1'
 INSTAGRAM_EXPLORE_URL = 'https://www.instagram.com/explore/tags/{}/'
+INSTAGRAM_TAG_INFO_URL = 'https://www.instagram.com/explore/tags/{}/?__a=1'
+INSTAGRAM_GRAPHQL_QUERY_URL = 'https://www.instagram.com/graphql/query/?query_hash={}&variables={}'
+USER_MEDIA_QUERY_HASH = '003056d32c2554def87228bc3fd9668a'
+TAG_MEDIA_QUERY_HASH = '9b498c08113f1e09617a1703c22b2f32'
+GRAPHQL_PAGE_SIZE = 50
 
 CHROMEDRIVER = 'chromedriver'
 LOG_FILE = 'igscraper.log'
 CHROMEDRIVER_LOG_FILE = 'chromedriver.log'
 LOCAL_DB = 'igscraper.db'
+LOCAL_JOURNAL_DB = 'igscraper.journal.db'
 USERS_DIR = 'users'
 TAGS_DIR = 'tags'
+STORE_DIR = 'store'
 TAG_TYPE_TOP = 'top'
 TAG_TYPE_RECENT = 'recent'
+DOWNLOAD_WORKERS_DEFAULT = 4
+ENGINE_SELENIUM = 'selenium'
+ENGINE_HTTP = 'http'
+DAEMON_HOST = '127.0.0.1'
+DAEMON_PORT_DEFAULT = 8765
+METRICS_PORT_DEFAULT = 9108
 
 # CSS & ID
 USERNAME_CSS = '._7UhW9.fKFbl.yUEEX.KV-D4.fDxYl'
@@ -41,6 +54,7 @@ STORIES_IMG_CSS = '.y-yJ5  '
 STORIES_VID_CSS = '.y-yJ5.OFkrO'
 STORIES_NEXT_CSS = '.coreSpriteRightChevron'
 INDICATOR = '.Yi5aA'
+INDICATOR_ACTIVE_CSS = '.Yi5aA.XCodT'
 NEXT_CONTROL_CSS = '.coreSpriteRightChevron'
 MULTIPLE_CONTENT_UL_CSS = '.vi798'
 MULTIPLE_CONTENT_LI_CSS = '.Ckrof'
@@ -51,6 +65,7 @@ SCROLL_LOAD_CSS = '.Igw0E.IwRSH.YBx95._4EzTm._9qQ0O.ZUqME'
 ACCEPT_COOKIES_CSS = '.aOOlW.bIiDR'
 CHROME_RELOAD_BUTTON_ID = 'reload-button'
 SORRY_ID = 'sorry'
+PAGE_LOADED_CSS = 'main, section, #' + SORRY_ID + ', #' + CHROME_RELOAD_BUTTON_ID
 
 # XPATH
 TOP_TAGS_XPATH = '/html/body/div[1]/section/main/article/div[1]/div/div'
@@ -0,0 +1,216 @@
+import json
+import queue
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from . import constants
+
+logger = logging.getLogger('__name__')
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# The lists of names a job can have, at least one of them must not be empty
+JOB_NAME_FIELDS = ('users', 'top_tags', 'recent_tags')
+
+
+class Daemon:
+
+    def __init__(self, create_scraper, run_job, port=constants.DAEMON_PORT_DEFAULT, host=constants.DAEMON_HOST):
+        """
+        Keep a started scraper and run the jobs that are posted to a local HTTP API on it, one at a time
+        create_scraper() returns a new scraper, run_job(scraper, job) scrapes the users and tags of a job
+        A scraper that stopped itself during a job is replaced by a new one for the next job
+        """
+
+        self.__create_scraper = create_scraper
+        self.__run_job = run_job
+        self.__scraper = None
+
+        self.__lock = threading.Lock()
+        self.__jobs = {}
+        self.__next_id = 1
+        self.__queue = queue.Queue()
+
+        self.__server = ThreadingHTTPServer((host, port), self.__handler_class())
+        self.__worker = threading.Thread(target=self.__work, daemon=True)
+
+    def serve(self):
+        """ Start the scraper and answer requests until the process is interrupted """
+
+        self.__worker.start()
+        self.__queue.put(None)
+        print('listening on http://' + self.address)
+        try:
+            self.__server.serve_forever()
+        finally:
+            self.shutdown()
+
+    def start(self):
+        """ Answer requests on a background thread """
+
+        self.__worker.start()
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+
+    def shutdown(self):
+        """ Finish the running job, drop the queued jobs and stop the scraper """
+
+        self.__server.shutdown()
+        self.__server.server_close()
+
+        while True:
+            try:
+                self.__queue.get_nowait()
+            except queue.Empty:
+                break
+        self.__queue.put(False)
+        if self.__worker.is_alive():
+            self.__worker.join()
+
+        if self.__scraper is not None:
+            try:
+                self.__scraper.stop()
+            except SystemExit:
+                pass
+            self.__scraper = None
+
+    def submit(self, job):
+        """ Queue a job, return its id """
+
+        with self.__lock:
+            job_id = self.__next_id
+            self.__next_id += 1
+            self.__jobs[job_id] = {'id': job_id, 'state': JOB_QUEUED, 'job': job}
+        self.__queue.put(job_id)
+        return job_id
+
+    def get_job(self, job_id):
+        with self.__lock:
+            job = self.__jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def get_jobs(self):
+        with self.__lock:
+            return [dict(job) for job in self.__jobs.values()]
+
+    def __set_state(self, job_id, state, error=None):
+        with self.__lock:
+            self.__jobs[job_id]['state'] = state
+            if error is not None:
+                self.__jobs[job_id]['error'] = error
+
+    def __work(self):
+        while True:
+            job_id = self.__queue.get()
+            if job_id is False:
+                return
+
+            # None warms the scraper up before the first job arrives
+            if job_id is not None:
+                self.__set_state(job_id, JOB_RUNNING)
+
+            try:
+                if self.__scraper is None:
+                    self.__scraper = self.__create_scraper()
+                if job_id is not None:
+                    self.__run_job(self.__scraper, self.get_job(job_id)['job'])
+            except SystemExit:
+                # The scraper stopped itself, it already quit its browser and closed its files
+                logger.error('scraper stopped during job %s' % job_id)
+                self.__scraper = None
+                if job_id is not None:
+                    self.__set_state(job_id, JOB_FAILED, 'the scraper stopped')
+            except Exception as err:
+                logger.error('job %s failed: %s' % (job_id, err))
+                if job_id is not None:
+                    self.__set_state(job_id, JOB_FAILED, str(err))
+            else:
+                if job_id is not None:
+                    self.__set_state(job_id, JOB_DONE)
+
+    def __handler_class(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') == '/jobs':
+                    self.__reply(200, daemon.get_jobs())
+                    return
+
+                job = None
+                if self.path.startswith('/jobs/'):
+                    try:
+                        job = daemon.get_job(int(self.path[len('/jobs/'):].rstrip('/')))
+                    except ValueError:
+                        pass
+                if job is None:
+                    self.__reply(404, {'error': 'no such job'})
+                else:
+                    self.__reply(200, job)
+
+            def do_POST(self):
+                if self.path.rstrip('/') != '/jobs':
+                    self.__reply(404, {'error': 'not found'})
+                    return
+
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    job = validate_job(json.loads(self.rfile.read(length)))
+                except ValueError as err:
+                    self.__reply(400, {'error': str(err)})
+                    return
+
+                self.__reply(202, {'id': daemon.submit(job), 'state': JOB_QUEUED})
+
+            def __reply(self, status, data):
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.info('daemon: ' + format % args)
+
+        return Handler
+
+    @property
+    def address(self):
+        host, port = self.__server.server_address[:2]
+        return host + ':' + str(port)
+
+
+def validate_job(job):
+    """ Return the job if it has a list of names to scrape, raise ValueError if not """
+
+    if not isinstance(job, dict):
+        raise ValueError('a job is a JSON object')
+
+    for field in JOB_NAME_FIELDS:
+        names = job.get(field, [])
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError(field + ' must be a list of names')
+
+    if not any(job.get(field) for field in JOB_NAME_FIELDS):
+        raise ValueError('provide at least one username or tag to scrape')
+
+    max_download = job.get('max')
+    if max_download is not None and (not isinstance(max_download, int) or max_download < 1):
+        raise ValueError('max has to be 1 or greater')
+
+    return job
+
+
+def submit(job, port=constants.DAEMON_PORT_DEFAULT, host=constants.DAEMON_HOST):
+    """ Post a job to a running daemon, return its id """
+
+    res = requests.post('http://' + host + ':' + str(port) + '/jobs', json=job, timeout=10)
+    if res.status_code != 202:
+        raise ValueError(res.json().get('error', 'job was not accepted'))
+    return res.json()['id']
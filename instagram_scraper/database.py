@@ -1,48 +1,190 @@
 import sqlite3
 import logging
 import uuid
+import time
+import itertools
+from contextlib import contextmanager
 
 from . import constants
+from . import instrumentation
+from .known_links import KnownLinks
 
 logger = logging.getLogger('__name__')
 
+# Default amount of rows and seconds after which a batch is written
+BATCH_SIZE = 500
+BATCH_INTERVAL = 5
+
+# Ordered schema migrations, the database is at version n when the first n steps are applied
+MIGRATIONS = [
+    # 1: initial tables
+    [
+        "CREATE TABLE IF NOT EXISTS user (id INTEGER PRIMARY KEY UNIQUE, username TEXT);",
+
+        "CREATE TABLE IF NOT EXISTS tag "
+        "(id TEXT PRIMARY KEY UNIQUE, tagname TEXT UNIQUE);",
+
+        "CREATE TABLE IF NOT EXISTS post "
+        "(id TEXT PRIMARY KEY UNIQUE, link TEXT, has_multiple_content INTEGER, "
+        "user_id INTEGER, "
+        "FOREIGN KEY(user_id) REFERENCES user(id) ON DELETE SET NULL );",
+
+        "CREATE TABLE IF NOT EXISTS tag_post "
+        "(tag_id TEXT, post_id TEXT, in_top TEXT, in_recent INTEGER, "
+        "FOREIGN KEY(tag_id) REFERENCES tag(id) ON DELETE CASCADE, "
+        "FOREIGN KEY(post_id) REFERENCES post(id) ON DELETE CASCADE, "
+        "PRIMARY KEY(tag_id, post_id) );",
+    ],
+
+    # 2: indexes for the post and tag post lookups
+    [
+        # Older versions could store a link more than once, the first post of a link is kept
+        "UPDATE post SET user_id = "
+        "(SELECT MAX(duplicate.user_id) FROM post AS duplicate WHERE duplicate.link = post.link) "
+        "WHERE user_id IS NULL;",
+
+        "UPDATE OR IGNORE tag_post SET post_id = "
+        "(SELECT first.id FROM post AS first, post AS duplicate "
+        "WHERE duplicate.id = tag_post.post_id AND first.link = duplicate.link "
+        "ORDER BY first.rowid LIMIT 1);",
+
+        "DELETE FROM post WHERE rowid NOT IN (SELECT MIN(rowid) FROM post GROUP BY link);",
+
+        "CREATE UNIQUE INDEX IF NOT EXISTS post_link_index ON post(link);",
+        "CREATE INDEX IF NOT EXISTS post_user_id_index ON post(user_id);",
+        "CREATE INDEX IF NOT EXISTS user_username_index ON user(username);",
+
+        # Deleting a post looks up its tag posts by post id
+        "CREATE INDEX IF NOT EXISTS tag_post_post_id_index ON tag_post(post_id);",
+
+        # The tag post counters are answered from these indexes alone
+        "CREATE INDEX IF NOT EXISTS tag_post_in_top_index ON tag_post(tag_id, in_top);",
+        "CREATE INDEX IF NOT EXISTS tag_post_in_recent_index ON tag_post(tag_id, in_recent);",
+    ],
+
+    # 3: newest shortcodes of every user for incremental updates
+    [
+        "CREATE TABLE IF NOT EXISTS user_watermark "
+        "(user_id INTEGER PRIMARY KEY, shortcodes TEXT, updated_at INTEGER, "
+        "FOREIGN KEY(user_id) REFERENCES user(id) ON DELETE CASCADE );",
+    ],
+
+    # 4: media store, every blob is referenced by the files that link to it
+    [
+        "CREATE TABLE IF NOT EXISTS blob (asset_id TEXT PRIMARY KEY, path TEXT);",
+
+        "CREATE TABLE IF NOT EXISTS blob_ref "
+        "(path TEXT PRIMARY KEY, asset_id TEXT, "
+        "FOREIGN KEY(asset_id) REFERENCES blob(asset_id) ON DELETE CASCADE );",
+
+        "CREATE INDEX IF NOT EXISTS blob_ref_asset_id_index ON blob_ref(asset_id);",
+    ],
+
+    # 5: username and id pairs that Instagram confirmed, with the time they were last confirmed
+    [
+        "CREATE TABLE IF NOT EXISTS user_id_cache "
+        "(username TEXT PRIMARY KEY, user_id TEXT UNIQUE, verified_at INTEGER);",
+    ],
+]
+
 
 class Database:
 
-    def __init__(self):
-        self.__connection = sqlite3.connect(constants.LOCAL_DB)
+    def __init__(self, check_same_thread=True):
+        """ A connection that is shared by threads has to be created with check_same_thread=False and guarded """
+
+        self.__connection = sqlite3.connect(constants.LOCAL_DB, check_same_thread=check_same_thread)
         self.__connection.execute("PRAGMA foreign_keys = 1")
 
-    def create_tables(self):
-        cursor = self.__connection.cursor()
+        # With a write-ahead log a commit does not have to wait for the whole database file to be synced
+        self.__connection.execute("PRAGMA journal_mode = WAL")
+        self.__connection.execute("PRAGMA synchronous = NORMAL")
 
-        try:
-            cursor.execute("CREATE TABLE IF NOT EXISTS user (id INTEGER PRIMARY KEY UNIQUE, username TEXT);")
+        self.__pending = []
+        self.__batch_depth = 0
+        self.__batch_size = BATCH_SIZE
+        self.__batch_interval = BATCH_INTERVAL
+        self.__batch_started = time.monotonic()
 
-            cursor.execute("CREATE TABLE IF NOT EXISTS tag " +
-                           "(id TEXT PRIMARY KEY UNIQUE, tagname TEXT UNIQUE);")
+    def create_tables(self):
+        """ Bring the schema up to date, every migration that is newer than the version of the database is applied """
+
+        self.flush()
+        version = self.get_schema_version()
+
+        for step, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            cursor = self.__connection.cursor()
+            try:
+                # A step and its version number are committed together, a failed step leaves the database untouched
+                cursor.execute("BEGIN;")
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.execute("PRAGMA user_version = %d;" % step)
+                self.__connection.commit()
+            except sqlite3.Error as err:
+                self.__connection.rollback()
+                logger.error('error at migrating to schema version %d: %s' % (step, err))
+                print('SQL error at creating tables.')
+                return
+            finally:
+                cursor.close()
+
+    def get_schema_version(self):
+        return self.__connection.execute("PRAGMA user_version;").fetchone()[0]
+
+    @contextmanager
+    def batch(self, size=BATCH_SIZE, interval=BATCH_INTERVAL):
+        """
+        Buffer all writes inside the with block
+        The buffer is written in one transaction every size rows, every interval seconds and at the end of the block
+        """
+
+        self.__batch_depth += 1
+        if self.__batch_depth == 1:
+            self.__batch_size = size
+            self.__batch_interval = interval
+            self.__batch_started = time.monotonic()
+        try:
+            yield self
+        finally:
+            self.__batch_depth -= 1
+            if self.__batch_depth == 0:
+                self.flush()
 
-            cursor.execute("CREATE TABLE IF NOT EXISTS post " +
-                           "(id TEXT PRIMARY KEY UNIQUE, link TEXT, has_multiple_content INTEGER, " +
-                           "user_id INTEGER, " +
-                           "FOREIGN KEY(user_id) REFERENCES user(id) ON DELETE SET NULL );")
+    @instrumentation.timed('database.flush')
+    def flush(self):
+        """ Write all buffered queries in one transaction, consecutive equal queries are executed with executemany """
 
-            cursor.execute("CREATE TABLE IF NOT EXISTS tag_post " +
-                           "(tag_id TEXT, post_id TEXT, in_top TEXT, in_recent INTEGER, " +
-                           "FOREIGN KEY(tag_id) REFERENCES tag(id) ON DELETE CASCADE, " +
-                           "FOREIGN KEY(post_id) REFERENCES post(id) ON DELETE CASCADE, " +
-                           "PRIMARY KEY(tag_id, post_id) );")
+        pending = self.__pending
+        self.__pending = []
+        self.__batch_started = time.monotonic()
+        if len(pending) == 0:
+            return
 
-        except sqlite3.Error as err:
-            logger.error(err)
-            print('SQL error at creating tables.')
+        cursor = self.__connection.cursor()
+        try:
+            for query, group in itertools.groupby(pending, key=lambda item: item[0]):
+                try:
+                    cursor.executemany(query, [values for _, values in group])
+                except sqlite3.Error as err:
+                    logger.error('error at executing query: %s' % query)
+                    logger.error('error: %s' % err)
         finally:
+            self.__connection.commit()
             cursor.close()
 
+    @instrumentation.timed('database.write')
     def __execute_query_and_commit(self, query, dict_values=None):
         if dict_values is None:
             dict_values = {}
 
+        if self.__batch_depth > 0:
+            self.__pending.append((query, dict_values))
+            if len(self.__pending) >= self.__batch_size or \
+                    time.monotonic() - self.__batch_started >= self.__batch_interval:
+                self.flush()
+            return
+
         cursor = self.__connection.cursor()
         try:
             cursor.execute(query, dict_values)
@@ -53,11 +195,18 @@ class Database:
             self.__connection.commit()
             cursor.close()
 
-    def __execute_query_and_fetch(self, query):
+    @instrumentation.timed('database.read')
+    def __execute_query_and_fetch(self, query, dict_values=None):
+        if dict_values is None:
+            dict_values = {}
+
+        # Reads have to see the buffered writes
+        self.flush()
+
         cursor = self.__connection.cursor()
 
         try:
-            cursor.execute(query)
+            cursor.execute(query, dict_values)
         except sqlite3.Error as err:
             logger.error('error at executing query: %s' % query)
             logger.error('error: %s' % err)
@@ -66,16 +215,38 @@ class Database:
             cursor.close()
             return data
 
+    def __execute_query_and_iterate(self, query, dict_values=None):
+        """ Yield the first column of every row, the rows are not all held in memory at once """
+
+        if dict_values is None:
+            dict_values = {}
+
+        self.flush()
+
+        cursor = self.__connection.cursor()
+
+        try:
+            for row in cursor.execute(query, dict_values):
+                yield row[0]
+        except sqlite3.Error as err:
+            logger.error('error at executing query: %s' % query)
+            logger.error('error: %s' % err)
+        finally:
+            cursor.close()
+
     def insert_tag(self, tag):
         query = "INSERT OR IGNORE INTO tag VALUES (:id, :tagname);"
         values = {'id': str(uuid.uuid4()), 'tagname': tag}
         self.__execute_query_and_commit(query, values)
 
     def insert_tag_post(self, link, tag, in_top=False, in_recent=False):
-        query = "INSERT OR IGNORE INTO tag_post VALUES (:tag_id, :post_id, :in_top, :in_recent);"
-        post_id = self.__get_post_id(link)
-        tag_id = self.__get_tag_id(tag)
-        values = {'tag_id': tag_id, 'post_id': post_id, 'in_top': in_top, 'in_recent': in_recent}
+        # A post that is both a top and a recent post of the tag keeps both flags
+        query = "INSERT INTO tag_post " \
+                "SELECT tag.id, post.id, :in_top, :in_recent FROM tag, post " \
+                "WHERE tag.tagname = :tagname AND post.link = :link " \
+                "ON CONFLICT(tag_id, post_id) DO UPDATE SET " \
+                "in_top = tag_post.in_top OR excluded.in_top, in_recent = tag_post.in_recent OR excluded.in_recent;"
+        values = {'tagname': tag, 'link': link, 'in_top': in_top, 'in_recent': in_recent}
         self.__execute_query_and_commit(query, values)
 
     def insert_userid_and_username(self, userid, username):
@@ -84,16 +255,79 @@ class Database:
         self.__execute_query_and_commit(query, values)
 
     def insert_post(self, link, has_multiple_content, userid=None):
-        post_id = self.__get_post_id(link)
-
-        if all(v is not None for v in [post_id, userid]):
-            query = "UPDATE post SET user_id =" + userid + " WHERE id ='" + post_id + "';"
-            self.__execute_query_and_commit(query)
-        elif not post_id:
-            query = "INSERT INTO post VALUES (:id, :link, :has_multiple_content, :user_id);"
-            values = {'id': str(uuid.uuid4()), 'link': link, 'has_multiple_content': has_multiple_content,
-                      'user_id': userid}
-            self.__execute_query_and_commit(query, values)
+        values = {'id': str(uuid.uuid4()), 'link': link, 'has_multiple_content': has_multiple_content,
+                  'user_id': userid}
+
+        # An existing post is linked to the user
+        query = "INSERT INTO post (id, link, has_multiple_content, user_id) " \
+                "VALUES (:id, :link, :has_multiple_content, :user_id) " \
+                "ON CONFLICT(link) DO UPDATE SET user_id = coalesce(excluded.user_id, post.user_id);"
+        self.__execute_query_and_commit(query, values)
+
+    def set_user_watermark(self, userid, shortcodes):
+        query = "INSERT INTO user_watermark (user_id, shortcodes, updated_at) " \
+                "VALUES (:user_id, :shortcodes, :updated_at) " \
+                "ON CONFLICT(user_id) DO UPDATE SET shortcodes = excluded.shortcodes, updated_at = excluded.updated_at;"
+        values = {'user_id': userid, 'shortcodes': ' '.join(shortcodes), 'updated_at': int(time.time())}
+        self.__execute_query_and_commit(query, values)
+
+    def get_user_watermark(self, username):
+        """ Return the newest shortcodes that were seen on the profile of the user """
+
+        query = "SELECT shortcodes FROM user_watermark WHERE user_id = (SELECT id FROM user WHERE username = :username);"
+        data = self.__execute_query_and_fetch(query, {'username': username})
+
+        if len(data) > 0 and data[0][0]:
+            return data[0][0].split(' ')
+        return []
+
+    def get_cached_user_ids(self, max_age):
+        """ Return username: id of the pairs that were confirmed at most max_age seconds ago """
+
+        query = "SELECT username, user_id FROM user_id_cache WHERE verified_at >= :since;"
+        data = self.__execute_query_and_fetch(query, {'since': int(time.time()) - max_age})
+        return {username: user_id for username, user_id in data}
+
+    def set_cached_user_id(self, username, user_id):
+        """ Remember that username has user_id now, a previous username of the id or id of the username is dropped """
+
+        values = {'username': username, 'user_id': str(user_id), 'verified_at': int(time.time())}
+        query = "DELETE FROM user_id_cache WHERE user_id = :user_id AND username != :username;"
+        self.__execute_query_and_commit(query, values)
+        query = "INSERT INTO user_id_cache (username, user_id, verified_at) " \
+                "VALUES (:username, :user_id, :verified_at) " \
+                "ON CONFLICT(username) DO UPDATE SET user_id = excluded.user_id, verified_at = excluded.verified_at;"
+        self.__execute_query_and_commit(query, values)
+
+    def insert_blob(self, asset_id, path):
+        query = "INSERT OR IGNORE INTO blob (asset_id, path) VALUES (:asset_id, :path);"
+        self.__execute_query_and_commit(query, {'asset_id': asset_id, 'path': path})
+
+    def insert_blob_ref(self, path, asset_id):
+        query = "INSERT OR REPLACE INTO blob_ref (path, asset_id) VALUES (:path, :asset_id);"
+        self.__execute_query_and_commit(query, {'path': path, 'asset_id': asset_id})
+
+    def get_blob_ref_count(self, asset_id):
+        query = "SELECT COUNT(*) FROM blob_ref WHERE asset_id = :asset_id;"
+        data = self.__execute_query_and_fetch(query, {'asset_id': asset_id})
+        return data[0][0]
+
+    def remove_blob_refs(self, directory):
+        """ Remove the references of all files inside the directory """
+
+        # substr instead of LIKE, an underscore in a name is not a wildcard
+        query = "DELETE FROM blob_ref WHERE substr(path, 1, length(:prefix)) = :prefix;"
+        self.__execute_query_and_commit(query, {'prefix': directory.rstrip('/') + '/'})
+
+    def get_unreferenced_blobs(self):
+        """ Return (asset_id, path) of the blobs no file links to """
+
+        query = "SELECT asset_id, path FROM blob WHERE asset_id NOT IN (SELECT asset_id FROM blob_ref);"
+        return [tuple(row) for row in self.__execute_query_and_fetch(query)]
+
+    def remove_blob(self, asset_id):
+        query = "DELETE FROM blob WHERE asset_id = :asset_id;"
+        self.__execute_query_and_commit(query, {'asset_id': asset_id})
 
     def retrieve_all_usernames(self):
         query = "SELECT username FROM user ORDER BY username ASC;"
@@ -113,33 +347,25 @@ class Database:
             tags.append(username[0])
         return sorted(tags)
 
-    def __get_post_id(self, link):
-        query = "SELECT id FROM post WHERE link ='" + link + "';"
-        data = self.__execute_query_and_fetch(query)
-
-        if len(data) > 0:
-            return data[0][0]
-        return None
-
     def __get_tag_id(self, tagname):
-        query = "SELECT id FROM tag WHERE tagname ='" + tagname + "';"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT id FROM tag WHERE tagname = :tagname;"
+        data = self.__execute_query_and_fetch(query, {'tagname': tagname})
 
         if len(data) > 0:
             return data[0][0]
         return None
 
     def get_username_by_id(self, user_id):
-        query = "SELECT username FROM user WHERE id =" + str(user_id) + ";"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT username FROM user WHERE id = :id;"
+        data = self.__execute_query_and_fetch(query, {'id': user_id})
 
         if len(data) > 0:
             return data[0][0]
         return None
 
     def get_user_post_links(self, userid):
-        query = "SELECT link FROM post WHERE user_id='" + userid + "';"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT link FROM post WHERE user_id = :user_id;"
+        data = self.__execute_query_and_fetch(query, {'user_id': userid})
 
         post_links = []
         for row in data:
@@ -147,18 +373,54 @@ class Database:
         return post_links
 
     def user_post_link_exists(self, username, link):
-        query = "SELECT EXISTS (SELECT 1 FROM post WHERE link ='" + link + "' AND user_id=(SELECT id FROM user WHERE" \
-                + " username='" + username + "') LIMIT 1);"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT EXISTS (SELECT 1 FROM post WHERE link = :link AND user_id = " \
+                "(SELECT id FROM user WHERE username = :username) LIMIT 1);"
+        data = self.__execute_query_and_fetch(query, {'link': link, 'username': username})
+        result = data[0][0]
+
+        if result == 1:
+            return True
+        return False
+
+    def tag_post_link_exists(self, tagname, link, tag_type):
+        column = 'in_top' if tag_type == constants.TAG_TYPE_TOP else 'in_recent'
+        query = "SELECT EXISTS (SELECT 1 FROM tag_post, tag, post " \
+                "WHERE tag_post.tag_id = tag.id AND tag_post.post_id = post.id " \
+                "AND tag.tagname = :tagname AND post.link = :link AND tag_post." + column + " = 1 LIMIT 1);"
+        data = self.__execute_query_and_fetch(query, {'tagname': tagname, 'link': link})
         result = data[0][0]
 
         if result == 1:
             return True
         return False
 
+    def get_known_user_links(self, username):
+        """ Load all post links of a user in one query """
+
+        count = self.get_user_post_count(username)
+        query = "SELECT post.link FROM post, user WHERE post.user_id = user.id AND user.username = :username;"
+        links = self.__execute_query_and_iterate(query, {'username': username})
+        return KnownLinks(links, count, lambda link: self.user_post_link_exists(username, link))
+
+    def get_known_tag_links(self, tagname, tag_type):
+        """ Load all top or recent post links of a tag in one query """
+
+        if tag_type == constants.TAG_TYPE_TOP:
+            count = self.get_top_tag_post_count(tagname)
+            column = 'in_top'
+        else:
+            count = self.get_recent_tag_post_count(tagname)
+            column = 'in_recent'
+
+        query = "SELECT post.link FROM tag_post, tag, post " \
+                "WHERE tag_post.tag_id = tag.id AND tag_post.post_id = post.id " \
+                "AND tag.tagname = :tagname AND tag_post." + column + " = 1;"
+        links = self.__execute_query_and_iterate(query, {'tagname': tagname})
+        return KnownLinks(links, count, lambda link: self.tag_post_link_exists(tagname, link, tag_type))
+
     def user_exists(self, username):
-        query = "SELECT EXISTS( SELECT 1 FROM user WHERE username='" + username + "' LIMIT 1);"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT EXISTS( SELECT 1 FROM user WHERE username = :username LIMIT 1);"
+        data = self.__execute_query_and_fetch(query, {'username': username})
         result = data[0][0]
 
         if result == 1:
@@ -166,8 +428,8 @@ class Database:
         return False
 
     def tag_exists(self, tagname):
-        query = "SELECT EXISTS( SELECT 1 FROM tag WHERE tagname='" + tagname + "' LIMIT 1);"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT EXISTS( SELECT 1 FROM tag WHERE tagname = :tagname LIMIT 1);"
+        data = self.__execute_query_and_fetch(query, {'tagname': tagname})
         result = data[0][0]
 
         if result == 1:
@@ -175,43 +437,39 @@ class Database:
         return False
 
     def get_id_by_username(self, username):
-        query = "SELECT id FROM user WHERE username ='" + username + "';"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT id FROM user WHERE username = :username;"
+        data = self.__execute_query_and_fetch(query, {'username': username})
 
         if len(data) > 0:
             return data[0][0]
         return None
 
     def get_user_post_count(self, username):
-        query = "SELECT COUNT(*) FROM post WHERE user_id =(SELECT id FROM user WHERE username ='" \
-                + username + "');"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT COUNT(*) FROM post WHERE user_id = (SELECT id FROM user WHERE username = :username);"
+        data = self.__execute_query_and_fetch(query, {'username': username})
         post_count = data[0][0]
         return post_count
 
     def get_top_tag_post_count(self, tag):
         tag_id = self.__get_tag_id(tag)
-        query = "SELECT COUNT(*) FROM tag_post WHERE tag_id ='" + tag_id + "' AND in_top=1;"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT COUNT(*) FROM tag_post WHERE tag_id = :tag_id AND in_top = 1;"
+        data = self.__execute_query_and_fetch(query, {'tag_id': tag_id})
         post_count = data[0][0]
         return post_count
 
     def get_recent_tag_post_count(self, tag):
         tag_id = self.__get_tag_id(tag)
-        query = "SELECT COUNT(*) FROM tag_post WHERE tag_id ='" + tag_id + "' AND in_recent=1;"
-        data = self.__execute_query_and_fetch(query)
+        query = "SELECT COUNT(*) FROM tag_post WHERE tag_id = :tag_id AND in_recent = 1;"
+        data = self.__execute_query_and_fetch(query, {'tag_id': tag_id})
         post_count = data[0][0]
         return post_count
 
     def rename_user(self, user_id, new_username):
-        query = "UPDATE user SET username ='" + new_username + "' WHERE id =" + str(user_id) + ";"
-        self.__execute_query_and_commit(query)
+        query = "UPDATE user SET username = :username WHERE id = :id;"
+        self.__execute_query_and_commit(query, {'username': new_username, 'id': user_id})
 
     def remove_user(self, username):
-        query = "SELECT username FROM user WHERE username='" + username + "';"
-        data = self.__execute_query_and_fetch(query)
-
-        if len(data) > 0:
+        if self.user_exists(username):
             query = "DELETE FROM user WHERE username = (:username);"
             values = {'username': username}
             self.__execute_query_and_commit(query, values)
@@ -223,10 +481,7 @@ class Database:
         self.remove_unused_posts()
 
     def remove_tag(self, tag):
-        query = "SELECT tagname FROM tag WHERE tagname='" + tag + "';"
-        data = self.__execute_query_and_fetch(query)
-
-        if len(data) > 0:
+        if self.tag_exists(tag):
             query = "DELETE FROM tag WHERE tagname = (:tagname);"
             values = {'tagname': tag}
             self.__execute_query_and_commit(query, values)
@@ -246,4 +501,5 @@ class Database:
         self.__execute_query_and_commit(query)
 
     def close_connection(self):
+        self.flush()
         self.__connection.close()
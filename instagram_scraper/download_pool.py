@@ -0,0 +1,110 @@
+import logging
+import queue
+import threading
+
+from requests.exceptions import RequestException
+
+from . import retriever
+
+logger = logging.getLogger('__name__')
+
+
+class DownloadPool:
+
+    def __init__(self, workers, queue_size=None, store=None):
+        """
+        Download files in the background with a fixed amount of worker threads
+        The queue is bounded, submit() blocks when the workers can not keep up
+        When a media store is given, the files are written to the store and linked to their output path
+        """
+
+        self.__workers = max(1, workers)
+        self.__download = store.download if store is not None else retriever.download
+        if queue_size is None:
+            queue_size = self.__workers * 4
+        self.__queue = queue.Queue(maxsize=queue_size)
+
+        self.__lock = threading.Lock()
+        self.__failed = []
+        self.__downloaded_count = 0
+        self.__listeners = []
+
+        self.__threads = []
+        for _ in range(self.__workers):
+            thread = threading.Thread(target=self.__work, daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def add_listener(self, listener):
+        """
+        The listener is told about every file, file_queued(url, output_path, file_name) when it is submitted
+        and file_done(url, output_path, file_name, success) from a worker thread when it is finished
+        """
+
+        self.__listeners.append(listener)
+
+    def submit(self, url, output_path='', file_name=''):
+        """ Put a file on the download queue """
+
+        for listener in self.__listeners:
+            listener.file_queued(url, output_path, file_name)
+        self.__queue.put((url, output_path, file_name))
+
+    def wait(self):
+        """ Block until every submitted file has been downloaded """
+
+        self.__queue.join()
+
+    def shutdown(self):
+        """ Finish all queued downloads and stop the workers """
+
+        self.wait()
+        for _ in self.__threads:
+            self.__queue.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+
+    def pop_failed(self):
+        """ Return the urls that failed to download since the last call """
+
+        with self.__lock:
+            failed = self.__failed
+            self.__failed = []
+        return failed
+
+    def __work(self):
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                self.__queue.task_done()
+                return
+
+            url, output_path, file_name = item
+            success = False
+            try:
+                self.__download(url, output_path, file_name)
+            except (OSError, RequestException) as err:
+                logger.error('error downloading %s: %s' % (url, err))
+                with self.__lock:
+                    self.__failed.append(url)
+            else:
+                success = True
+                with self.__lock:
+                    self.__downloaded_count += 1
+            finally:
+                for listener in self.__listeners:
+                    listener.file_done(url, output_path, file_name, success)
+                self.__queue.task_done()
+
+    @property
+    def workers(self):
+        return self.__workers
+
+    @property
+    def queue_depth(self):
+        return self.__queue.qsize()
+
+    @property
+    def downloaded_count(self):
+        return self.__downloaded_count
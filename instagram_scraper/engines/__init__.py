@@ -0,0 +1,3 @@
+from .engine import Engine
+from .selenium_engine import SeleniumEngine
+from .http_engine import HttpEngine
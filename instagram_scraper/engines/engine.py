@@ -0,0 +1,66 @@
+from abc import ABCMeta, abstractmethod
+
+from .. import get_data
+
+
+class Engine:
+    """
+    A scrape backend, the scraper only talks to this interface
+    so users and tags can be scraped with a browser or without one
+    """
+
+    __metaclass__ = ABCMeta
+
+    # True when the engine scrapes with the browser of the scraper, the browser can not be used by two threads
+    uses_browser = False
+
+    def __init__(self, scraper):
+        self._scraper = scraper
+
+    @abstractmethod
+    def get_user_id(self, user): raise NotImplementedError
+
+    def lookup_user_id(self, username):
+        """ Return the id of a username without the browser, the lookups of many users run at the same time """
+
+        return get_data.get_id_by_username_from_ig(username)
+
+    def prefetch(self, user):
+        """ Load what the engine needs of a user ahead of time, called in the background before the user is scraped """
+
+        pass
+
+    def reset(self):
+        """ Forget what was loaded of earlier users, a scraper that is kept by the daemon scrapes them again later """
+
+        pass
+
+    @abstractmethod
+    def scrape_display(self, user): raise NotImplementedError
+
+    @abstractmethod
+    def is_private(self, user): raise NotImplementedError
+
+    @abstractmethod
+    def has_posts(self, user): raise NotImplementedError
+
+    @abstractmethod
+    def grab_user_post_links(self, user, known_links=None):
+        """ Return the post links of a user, newest first, grabbing may stop where known_links.stop_grabbing """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def grab_tag_post_links(self, tag, tag_type, known_links=None):
+        """ Return the top or recent post links of a tag, grabbing may stop where known_links.stop_grabbing """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def scrape_post(self, link, output_path, userid=None):
+        """
+        Scrape a post and record it with the post recorder of the scraper, it is saved once its files are downloaded
+        Return False if the post could not be scraped
+        """
+
+        raise NotImplementedError
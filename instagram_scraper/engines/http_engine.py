@@ -0,0 +1,175 @@
+import json
+import logging
+from urllib.parse import quote
+
+from requests.exceptions import RequestException
+
+from .. import constants
+from .. import helper
+from .. import retriever
+from .. import get_data
+from .. import http_session
+from .engine import Engine
+
+logger = logging.getLogger('__name__')
+
+
+class HttpEngine(Engine):
+    """ Scrape the ?__a=1 and graphql JSON endpoints directly, no browser is needed """
+
+    def __init__(self, scraper, base_url=constants.INSTAGRAM_URL):
+        super().__init__(scraper)
+        self.__base_url = base_url
+        self.__profiles = {}
+
+    def get_user_id(self, user):
+        profile = self.__get_profile(user.username)
+        if profile is None:
+            return None
+        return profile['id']
+
+    def lookup_user_id(self, username):
+        # The profile is needed for the user anyway, it holds the id
+        profile = self.__get_profile(username)
+        if profile is None:
+            return None
+        return profile['id']
+
+    def prefetch(self, user):
+        self.__get_profile(user.username)
+
+    def reset(self):
+        self.__profiles = {}
+
+    def scrape_display(self, user):
+        profile = self.__get_profile(user.username)
+        if profile is None:
+            return
+
+        try:
+            retriever.download(profile['profile_pic_url_hd'], output_path=user.output_user_dp_path)
+        except (OSError, RequestException, KeyError) as err:
+            logger.error(err)
+            print('error downloading display picture')
+
+    def is_private(self, user):
+        profile = self.__get_profile(user.username)
+        if profile is None:
+            return True
+        return profile['is_private'] and not profile.get('followed_by_viewer', False)
+
+    def has_posts(self, user):
+        profile = self.__get_profile(user.username)
+        if profile is None:
+            return False
+        return profile['edge_owner_to_timeline_media']['count'] > 0
+
+    def grab_user_post_links(self, user, known_links=None):
+        profile = self.__get_profile(user.username)
+        if profile is None:
+            return []
+
+        return self.__paginate(profile['edge_owner_to_timeline_media'],
+                               constants.USER_MEDIA_QUERY_HASH,
+                               {'id': profile['id']},
+                               ['user', 'edge_owner_to_timeline_media'],
+                               known_links)
+
+    def grab_tag_post_links(self, tag, tag_type, known_links=None):
+        hashtag = self.__get_json(constants.INSTAGRAM_TAG_INFO_URL.format(tag.tagname), ['graphql', 'hashtag'])
+        if hashtag is None:
+            return []
+
+        if tag_type == constants.TAG_TYPE_TOP:
+            return self.__links_from_edges(hashtag['edge_hashtag_to_top_posts']['edges'])[:self._scraper.max_download]
+
+        return self.__paginate(hashtag['edge_hashtag_to_media'],
+                               constants.TAG_MEDIA_QUERY_HASH,
+                               {'tag_name': tag.tagname},
+                               ['hashtag', 'edge_hashtag_to_media'],
+                               known_links)
+
+    def scrape_post(self, link, output_path, userid=None):
+        """ Take the media urls of a post from its JSON and hand them to the download pool """
+
+        post_id = helper.extract_post_id_from_url(link)
+        media = self.__get_json(constants.INSTAGRAM_POST_INFO.format(post_id), ['graphql', 'shortcode_media'])
+        if media is None:
+            print('\nerror loading post')
+            return False
+
+        date_time = helper.get_datetime_str_from_timestamp(media['taken_at_timestamp'])
+        with self._scraper.post_recorder.post(link):
+            for url in helper.get_media_urls(media):
+                file_name = date_time + '-' + retriever.get_file_name_from_url(url)
+                self._scraper.download_pool.submit(url, output_path, file_name)
+
+            # The post is written to the database when its files are downloaded
+            self._scraper.post_recorder.record(link, 'edge_sidecar_to_children' in media, userid)
+        return True
+
+    def __get_profile(self, username):
+        """ Return the profile JSON of a user, every profile is requested once until the engine is reset """
+
+        if username not in self.__profiles:
+            self.__profiles[username] = self.__get_json(
+                constants.INSTAGRAM_USER_INFO_URL_DEFAULT.format(username), ['graphql', 'user'])
+        return self.__profiles[username]
+
+    def __paginate(self, media, query_hash, variables, keys, known_links=None):
+        """
+        Follow the end cursors of a media edge until the maximum amount of links is reached
+        or until the known links say the remaining pages were grabbed before
+        """
+
+        links = self.__links_from_edges(media['edges'])
+        page_info = media['page_info']
+
+        while len(links) < self._scraper.max_download and page_info['has_next_page']:
+            if known_links is not None and known_links.stop_grabbing(links):
+                break
+
+            page_variables = dict(variables, first=constants.GRAPHQL_PAGE_SIZE, after=page_info['end_cursor'])
+            url = constants.INSTAGRAM_GRAPHQL_QUERY_URL.format(
+                query_hash, quote(json.dumps(page_variables, separators=(',', ':'))))
+            media = self.__get_json(url, ['data'] + keys)
+            if media is None:
+                break
+
+            links += self.__links_from_edges(media['edges'])
+            page_info = media['page_info']
+
+        # Remove any duplicates and keep the order
+        return list(dict.fromkeys(links))[:self._scraper.max_download]
+
+    def __links_from_edges(self, edges):
+        return [constants.INSTAGRAM_URL + 'p/' + edge['node']['shortcode'] + '/' for edge in edges]
+
+    def __get_json(self, url, keys):
+        """ Request a JSON endpoint and return the value found under keys """
+
+        try:
+            result = http_session.get_session().get(self.__url(url), headers=get_data.headers)
+        except RequestException as err:
+            logger.error(err)
+            return None
+
+        if result.status_code != 200:
+            logger.error('status code %s at %s' % (result.status_code, url))
+            return None
+
+        try:
+            data = result.json()
+            for key in keys:
+                data = data[key]
+            return data
+        except (ValueError, KeyError, TypeError) as err:
+            logger.error('could not read JSON from %s: %s' % (url, err))
+            return None
+
+    def __url(self, url):
+        """ Point an Instagram url to the configured base url """
+
+        if url.startswith(constants.INSTAGRAM_URL):
+            return self.__base_url + url[len(constants.INSTAGRAM_URL):]
+        return url
@@ -0,0 +1,43 @@
+from .. import constants
+from .. import actions
+from .. import get_data
+from .engine import Engine
+
+
+class SeleniumEngine(Engine):
+    """ Scrape with the browser by running the actions """
+
+    uses_browser = True
+
+    def __init__(self, scraper):
+        super().__init__(scraper)
+
+    def get_user_id(self, user):
+        # Retrieve the id using actions
+        if self._scraper.is_logged_in:
+            return actions.GetUserId(self._scraper, user.username).do()
+        # Retrieve the id using requests
+        return get_data.get_id_by_username_from_ig(user.username)
+
+    def scrape_display(self, user):
+        actions.ScrapeDisplay(self._scraper, user).do()
+
+    def is_private(self, user):
+        return actions.CheckIfAccountIsPrivate(self._scraper, user).do()
+
+    def has_posts(self, user):
+        return actions.CheckIfProfileHasPosts(self._scraper, user).do()
+
+    def grab_user_post_links(self, user, known_links=None):
+        return actions.GrabPostLinks(self._scraper, user.profile_link, known_links=known_links).do()
+
+    def grab_tag_post_links(self, tag, tag_type, known_links=None):
+        link = constants.INSTAGRAM_EXPLORE_URL.format(tag.tagname)
+        if tag_type == constants.TAG_TYPE_TOP:
+            return actions.GrabTopTagLinks(self._scraper, link).do()
+        return actions.GrabPostLinks(self._scraper, link, constants.RECENT_TAGS_XPATH, known_links).do()
+
+    def scrape_post(self, link, output_path, userid=None):
+        # InitScrape stops the scraper when the post can not be loaded
+        actions.InitScrape(self._scraper, link, output_path, userid).do()
+        return True
@@ -1,9 +1,6 @@
 import logging
 import json
 
-from urllib3.util.retry import Retry
-import requests
-from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
 from requests.exceptions import Timeout
 from requests.exceptions import RequestException
@@ -13,6 +10,7 @@ from bs4 import BeautifulSoup
 
 from .database import Database
 from . import constants
+from . import http_session
 
 logger = logging.getLogger('__name__')
 
@@ -77,10 +75,7 @@ def get_id_by_username_from_ig(username):
     """ Return the username id """
 
     try:
-        session = __retry_session(retries=5,
-                                  backoff_factor=0.1,
-                                  status_forcelist=[429, 500, 502, 503, 504],
-                                  method_whitelist=['GET'])
+        session = http_session.get_session()
         result = session.get(constants.INSTAGRAM_USER_INFO_URL_DEFAULT.format(username), headers=headers)
         soup = BeautifulSoup(result.content, 'html.parser')
     except (HTTPError, ConnectionError, Timeout, RequestException) as err:
@@ -118,10 +113,7 @@ def get_username_by_id(user_id):
     """ Return the username id """
 
     try:
-        session = __retry_session(retries=5,
-                                  backoff_factor=0.1,
-                                  status_forcelist=[429, 500, 502, 503, 504],
-                                  method_whitelist=['GET'])
+        session = http_session.get_session()
         result = session.get(constants.INSTAGRAM_USER_INFO_URL_MOBILE.format(user_id), headers=headers)
 
     except (HTTPError, ConnectionError, Timeout, RequestException) as err:
@@ -144,20 +136,3 @@ def get_username_by_id(user_id):
                 else:
                     return username
 
-
-def __retry_session(retries, backoff_factor, status_forcelist, method_whitelist):
-    """ Retry session """
-
-    retry = Retry(
-        total=retries,
-        read=retries,
-        connect=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=status_forcelist,
-        allowed_methods=method_whitelist)
-
-    adapter = HTTPAdapter(max_retries=retry)
-    session = requests.Session()
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    return session
@@ -0,0 +1,157 @@
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+from . import instrumentation
+
+logger = logging.getLogger('__name__')
+
+# Endpoint classes, every class has its own rate
+PAGE = 'page'
+JSON = 'json'
+MEDIA = 'media'
+
+# Starting, lowest and highest requests per second of every endpoint class
+RATES = {
+    PAGE: (1.0, 0.05, 3.0),
+    JSON: (1.0, 0.05, 5.0),
+    MEDIA: (50.0, 1.0, 200.0)
+}
+
+# Every successful request adds this part of the highest rate, a throttled request halves the rate
+INCREASE = 0.01
+DECREASE_FACTOR = 0.5
+
+# After a throttled request nothing is sent for a while, doubled for every throttled request in a row
+BACKOFF_START = 30
+BACKOFF_MAX = 900
+
+MEDIA_HOSTS = ('cdninstagram.com', 'fbcdn.net')
+MEDIA_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.heic', '.mp4')
+
+_buckets = {}
+_lock = threading.Lock()
+
+
+class _Bucket:
+    """ Token bucket with an additive increase, multiplicative decrease rate """
+
+    def __init__(self, rate, min_rate, max_rate):
+        self.__lock = threading.Lock()
+        self.__rate = rate
+        self.__min_rate = min_rate
+        self.__max_rate = max_rate
+        self.__capacity = max(1.0, rate)
+        self.__tokens = self.__capacity
+        self.__updated = time.monotonic()
+        self.__blocked_until = 0
+        self.__backoff = BACKOFF_START
+
+    def reserve(self):
+        """ Take a token and return the seconds to wait before it may be used """
+
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated) * self.__rate)
+            self.__updated = now
+
+            # Tokens can go below zero, every waiting request gets its own turn
+            self.__tokens -= 1
+            delay = max(0.0, -self.__tokens / self.__rate)
+            return max(delay, self.__blocked_until - now)
+
+    def succeeded(self):
+        with self.__lock:
+            self.__rate = min(self.__max_rate, self.__rate + self.__max_rate * INCREASE)
+            self.__capacity = max(1.0, self.__rate)
+            self.__backoff = BACKOFF_START
+
+    def throttled(self, retry_after=None):
+        with self.__lock:
+            self.__rate = max(self.__min_rate, self.__rate * DECREASE_FACTOR)
+            self.__capacity = max(1.0, self.__rate)
+            self.__tokens = min(self.__tokens, 0)
+
+            pause = retry_after if retry_after is not None else self.__backoff
+            self.__blocked_until = max(self.__blocked_until, time.monotonic() + pause)
+            self.__backoff = min(BACKOFF_MAX, self.__backoff * 2)
+            return pause
+
+    @property
+    def rate(self):
+        return self.__rate
+
+
+def acquire(endpoint):
+    """ Block until a request to the endpoint class is allowed """
+
+    delay = reserve(endpoint)
+    if delay > 0:
+        with instrumentation.span('governor.wait.' + endpoint):
+            time.sleep(delay)
+
+
+def reserve(endpoint):
+    """ Take a turn for a request to the endpoint class, return the seconds to wait before sending it """
+
+    return __get_bucket(endpoint).reserve()
+
+
+def succeeded(endpoint):
+    """ Instagram answered, the rate goes up a little """
+
+    __get_bucket(endpoint).succeeded()
+
+
+def throttled(endpoint, retry_after=None):
+    """ Instagram asked to slow down, halve the rate and pause the endpoint class, return the pause in seconds """
+
+    pause = __get_bucket(endpoint).throttled(retry_after)
+    instrumentation.count('throttled.' + endpoint)
+    logger.warning('%s requests throttled, rate is now %.2f/s, pausing %ds' % (endpoint, rate(endpoint), pause))
+    return pause
+
+
+def report(endpoint, status_code):
+    """ Adjust the rate to a response status code, return True if the request was throttled """
+
+    if status_code == 429:
+        throttled(endpoint)
+        return True
+    if status_code < 400:
+        succeeded(endpoint)
+    return False
+
+
+def rate(endpoint):
+    """ Return the current requests per second of the endpoint class """
+
+    return __get_bucket(endpoint).rate
+
+
+def rates():
+    return {endpoint: rate(endpoint) for endpoint in RATES}
+
+
+def endpoint_for_url(url):
+    """ Media comes from the CDN, everything else from instagram.com is JSON """
+
+    parsed = urlparse(url)
+    if (parsed.hostname or '').endswith(MEDIA_HOSTS) or parsed.path.lower().endswith(MEDIA_EXTENSIONS):
+        return MEDIA
+    return JSON
+
+
+def reset():
+    """ Start every endpoint class over at its starting rate """
+
+    with _lock:
+        _buckets.clear()
+
+
+def __get_bucket(endpoint):
+    with _lock:
+        if endpoint not in _buckets:
+            _buckets[endpoint] = _Bucket(*RATES[endpoint])
+        return _buckets[endpoint]
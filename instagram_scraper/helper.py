@@ -117,6 +117,31 @@ def get_datetime_str(date_time):
     return date.strftime(date_format)
 
 
+def get_datetime_str_from_timestamp(timestamp):
+    """ Create a date-time string from a unix timestamp """
+
+    date = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    date_format = "%Y_%m_%d_%H_%M_%S"
+    return date.strftime(date_format)
+
+
+def get_media_urls(media):
+    """ Return the image and video urls of the shortcode_media JSON of a post, in the order of the post """
+
+    if 'edge_sidecar_to_children' in media:
+        nodes = [edge['node'] for edge in media['edge_sidecar_to_children']['edges']]
+    else:
+        nodes = [media]
+
+    urls = []
+    for node in nodes:
+        if node.get('is_video'):
+            urls.append(node['video_url'])
+        else:
+            urls.append(node['display_url'])
+    return urls
+
+
 def extract_post_id_from_url(url):
     """ Return the post id """
 
@@ -0,0 +1,155 @@
+import threading
+
+import requests
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
+
+from . import governor
+from . import instrumentation
+
+# Amount of hosts to keep a connection pool for (www.instagram.com, i.instagram.com and the CDN hosts)
+POOL_CONNECTIONS = 10
+
+# Amount of keep-alive connections per host
+POOL_MAXSIZE = 10
+
+RETRIES = 5
+BACKOFF_FACTOR = 0.1
+# 429 is not retried here, the governor pauses the requests and retries them itself
+STATUS_FORCELIST = [500, 502, 503, 504]
+ALLOWED_METHODS = ['GET', 'HEAD']
+
+# Amount of times a request is sent again after Instagram answered 429
+THROTTLED_RETRIES = 3
+
+_session = None
+_pool_maxsize = POOL_MAXSIZE
+_account_pool = None
+_cookies = []
+_lock = threading.Lock()
+
+
+class GovernedSession(requests.Session):
+    """
+    Every request waits for its turn at the governor and tells it how Instagram answered
+    With an account pool every request to Instagram is sent with the session of the least used account
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = governor.endpoint_for_url(url)
+        for attempt in range(THROTTLED_RETRIES + 1):
+            account = None
+            if _account_pool is not None and endpoint != governor.MEDIA:
+                account = _account_pool.acquire()
+                _account_pool.record(account)
+                kwargs['cookies'] = account.cookie_dict()
+
+            governor.acquire(endpoint)
+            with instrumentation.span('request.' + endpoint):
+                res = super().request(method, url, *args, **kwargs)
+            if res.status_code != 429 or attempt == THROTTLED_RETRIES:
+                break
+
+            # Wait out the pause the governor sets and ask again, with another account if there is one
+            instrumentation.count('request.retries')
+            if account is not None:
+                _account_pool.throttled(account)
+            governor.throttled(endpoint, self.__get_retry_after(res))
+            res.close()
+
+        governor.report(endpoint, res.status_code)
+        return res
+
+    @staticmethod
+    def __get_retry_after(res):
+        """ Return the seconds of the Retry-After header, None if there is none or it is a date """
+
+        try:
+            return int(res.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+
+def configure(pool_maxsize):
+    """
+    Set the amount of keep-alive connections per host
+    Should be at least the amount of threads that use the session at the same time
+    """
+
+    global _pool_maxsize
+
+    with _lock:
+        if pool_maxsize != _pool_maxsize:
+            _pool_maxsize = pool_maxsize
+            __close_session()
+
+
+def set_account_pool(account_pool):
+    """ Send the requests to Instagram with the accounts of the pool, None to send them without an account """
+
+    global _account_pool
+
+    _account_pool = account_pool
+
+
+def set_cookies(cookies):
+    """ Send every request with the cookies of a browser session, a list of selenium cookie dicts """
+
+    global _cookies
+
+    with _lock:
+        _cookies = list(cookies)
+        if _session is not None:
+            __set_session_cookies(_session, _cookies)
+
+
+def get_session():
+    """ Return the session that is shared by the whole run, create it on first use """
+
+    global _session
+
+    with _lock:
+        if _session is None:
+            _session = __new_session(_pool_maxsize)
+        return _session
+
+
+def close():
+    """ Close all pooled connections, a new session will be created on next use """
+
+    with _lock:
+        __close_session()
+
+
+def __new_session(pool_maxsize):
+    """ Create a session with a shared retry policy and a connection pool per host """
+
+    retry = Retry(
+        total=RETRIES,
+        read=RETRIES,
+        connect=RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=STATUS_FORCELIST,
+        allowed_methods=ALLOWED_METHODS,
+        respect_retry_after_header=False)
+
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = GovernedSession()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    __set_session_cookies(session, _cookies)
+    return session
+
+
+def __set_session_cookies(session, cookies):
+    for cookie in cookies:
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                            path=cookie.get('path', '/'))
+
+
+def __close_session():
+    global _session
+
+    if _session is not None:
+        _session.close()
+        _session = None
@@ -0,0 +1,180 @@
+import json
+import math
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger('__name__')
+
+# Counters the report turns into rates
+BYTES_COUNTER = 'download.bytes'
+POSTS_COUNTER = 'posts'
+DOWNLOAD_SPAN = 'download'
+
+_enabled = False
+_trace_path = None
+_started = time.monotonic()
+_durations = {}
+_counters = {}
+_trace = []
+_listeners = []
+_lock = threading.Lock()
+
+
+def enable(trace_path=None):
+    """ Start measuring, a JSON trace with every span is written to trace_path when the run finishes """
+
+    global _enabled, _trace_path
+
+    reset()
+    _enabled = True
+    _trace_path = trace_path
+
+
+def disable():
+    global _enabled, _trace_path
+
+    _enabled = False
+    _trace_path = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def add_listener(listener):
+    """
+    Hand every span and count to listener.span_recorded(name, duration) and listener.counted(name, amount)
+    Listeners get them also when measuring is not enabled
+    """
+
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def reset():
+    global _started
+
+    with _lock:
+        _started = time.monotonic()
+        _durations.clear()
+        _counters.clear()
+        _trace.clear()
+
+
+@contextmanager
+def span(name):
+    """ Measure the duration of the block under name, does nothing when measuring is not enabled """
+
+    if not _enabled and not _listeners:
+        yield
+        return
+
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        record(name, start, time.monotonic() - start)
+
+
+def timed(name):
+    """ Decorator that measures every call of the function under name """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name, start, duration):
+    if _enabled:
+        with _lock:
+            _durations.setdefault(name, []).append(duration)
+            if _trace_path is not None:
+                _trace.append({'name': name, 'start': round(start - _started, 6), 'duration': round(duration, 6),
+                               'thread': threading.current_thread().name})
+
+    for listener in _listeners:
+        listener.span_recorded(name, duration)
+
+
+def count(name, amount=1):
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+    for listener in _listeners:
+        listener.counted(name, amount)
+
+
+def percentile(values, p):
+    """ Nearest rank percentile of a list of numbers """
+
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summary():
+    """ Return the spans with their count, total, p50 and p95 in seconds, the counters and the rates of the run """
+
+    with _lock:
+        elapsed = time.monotonic() - _started
+        spans = {name: {'count': len(durations), 'total': sum(durations), 'p50': percentile(durations, 50),
+                        'p95': percentile(durations, 95)}
+                 for name, durations in _durations.items()}
+        counters = dict(_counters)
+
+    rates = {'posts_per_minute': counters.get(POSTS_COUNTER, 0) / elapsed * 60 if elapsed > 0 else 0}
+    download_time = spans.get(DOWNLOAD_SPAN, {}).get('total', 0)
+    if download_time > 0:
+        # Downloads run in parallel, this is the speed of a single download
+        rates['bytes_per_second_per_download'] = counters.get(BYTES_COUNTER, 0) / download_time
+    return {'elapsed': elapsed, 'spans': spans, 'counters': counters, 'rates': rates}
+
+
+def print_report():
+    data = summary()
+
+    print('')
+    print('run profile (%.1fs)' % data['elapsed'])
+    print('  {:<40} {:>7} {:>10} {:>9} {:>9}'.format('span', 'count', 'total s', 'p50 ms', 'p95 ms'))
+    for name, values in sorted(data['spans'].items(), key=lambda item: -item[1]['total']):
+        print('  {:<40} {:>7} {:>10.2f} {:>9.1f} {:>9.1f}'.format(name[:40], values['count'], values['total'],
+                                                                values['p50'] * 1000, values['p95'] * 1000))
+    for name, value in sorted(data['counters'].items()):
+        print('  {:<40} {:>7}'.format(name, int(value)))
+    for name, value in sorted(data['rates'].items()):
+        print('  {:<40} {:>7.1f}'.format(name.replace('_', ' '), value))
+
+
+def write_trace(path):
+    """ Write the summary and every span to a JSON file """
+
+    with _lock:
+        spans = list(_trace)
+    try:
+        with open(path, 'w') as file:
+            json.dump({'summary': summary(), 'spans': spans}, file, indent=1)
+    except OSError as err:
+        logger.error('could not write trace: %s' % err)
+
+
+def finish():
+    """ Print the report and write the trace of the run, if measuring was enabled """
+
+    if not _enabled:
+        return
+
+    print_report()
+    if _trace_path is not None:
+        write_trace(_trace_path)
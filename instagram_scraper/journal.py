@@ -0,0 +1,149 @@
+import sqlite3
+import logging
+import threading
+
+from . import constants
+
+logger = logging.getLogger('__name__')
+
+OWNER_USER = 'user'
+OWNER_TAG = 'tag'
+
+# A link is queued when it is collected, resolved when its post is scraped and its files are submitted,
+# downloaded when the files of its owner are written and failed when its post could not be scraped
+STATE_QUEUED = 'queued'
+STATE_RESOLVED = 'resolved'
+STATE_DOWNLOADED = 'downloaded'
+STATE_FAILED = 'failed'
+
+
+class Journal:
+    """
+    Work journal of a run, kept in its own database file so every step is committed the moment it happens
+    A run that died can be continued with the links and files the journal still holds
+    """
+
+    def __init__(self, path=constants.LOCAL_JOURNAL_DB):
+        # Files are reported by the download workers, every access goes through the lock
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode = WAL")
+        self.__connection.execute("PRAGMA synchronous = NORMAL")
+
+        with self.__connection:
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS owner "
+                                      "(key TEXT PRIMARY KEY, kind TEXT, name TEXT, tag_type TEXT, "
+                                      "links_complete INTEGER DEFAULT 0);")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS link "
+                                      "(owner_key TEXT, link TEXT, position INTEGER, state TEXT, "
+                                      "PRIMARY KEY(owner_key, link) );")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS file "
+                                      "(url TEXT PRIMARY KEY, output_path TEXT, file_name TEXT);")
+
+    def __execute(self, query, values=None):
+        with self.__lock:
+            try:
+                with self.__connection:
+                    return self.__connection.execute(query, values or {}).fetchall()
+            except sqlite3.Error as err:
+                logger.error('error at executing journal query: %s' % query)
+                logger.error('error: %s' % err)
+                return []
+
+    def clear(self):
+        """ Forget the previous run """
+
+        self.__execute("DELETE FROM owner;")
+        self.__execute("DELETE FROM link;")
+        self.__execute("DELETE FROM file;")
+
+    def plan(self, kind, names, tag_type=None):
+        """ Record the users or tags of the run in order, before any of them is started """
+
+        for name in names:
+            self.__execute("INSERT OR IGNORE INTO owner (key, kind, name, tag_type) "
+                           "VALUES (:key, :kind, :name, :tag_type);",
+                           {'key': owner_key(kind, name, tag_type), 'kind': kind, 'name': name, 'tag_type': tag_type})
+
+    def get_unfinished_owners(self):
+        """ Return (kind, name, tag_type) of every user and tag that was not finished, in the order of the run """
+
+        return [tuple(row) for row in self.__execute("SELECT kind, name, tag_type FROM owner ORDER BY rowid;")]
+
+    def add_links(self, key, links):
+        """ Record the collected links of a user or tag, they will not be collected again on resume """
+
+        with self.__lock:
+            try:
+                with self.__connection:
+                    self.__connection.executemany(
+                        "INSERT OR IGNORE INTO link VALUES (:owner_key, :link, :position, :state);",
+                        [{'owner_key': key, 'link': link, 'position': position, 'state': STATE_QUEUED}
+                         for position, link in enumerate(links)])
+                    self.__connection.execute("UPDATE owner SET links_complete = 1 WHERE key = :key;", {'key': key})
+            except sqlite3.Error as err:
+                logger.error('error at adding links to the journal: %s' % err)
+
+    def get_pending_links(self, key):
+        """ Return the links that still have to be scraped, None if the links were never collected """
+
+        data = self.__execute("SELECT links_complete FROM owner WHERE key = :key;", {'key': key})
+        if len(data) == 0 or not data[0][0]:
+            return None
+
+        rows = self.__execute("SELECT link FROM link WHERE owner_key = :key AND state IN (:queued, :failed) "
+                              "ORDER BY position;", {'key': key, 'queued': STATE_QUEUED, 'failed': STATE_FAILED})
+        return [row[0] for row in rows]
+
+    def set_link_state(self, key, link, state):
+        self.__execute("UPDATE link SET state = :state WHERE owner_key = :key AND link = :link;",
+                       {'state': state, 'key': key, 'link': link})
+
+    def finish_owner(self, key):
+        """
+        Call when the files of the user or tag are written
+        The user or tag is forgotten, unless some of its posts failed, those are retried on resume
+        """
+
+        self.__execute("UPDATE link SET state = :downloaded WHERE owner_key = :key AND state = :resolved;",
+                       {'key': key, 'downloaded': STATE_DOWNLOADED, 'resolved': STATE_RESOLVED})
+
+        failed = self.__execute("SELECT COUNT(*) FROM link WHERE owner_key = :key AND state = :failed;",
+                                {'key': key, 'failed': STATE_FAILED})
+        if len(failed) > 0 and failed[0][0] == 0:
+            self.__execute("DELETE FROM link WHERE owner_key = :key;", {'key': key})
+            self.__execute("DELETE FROM owner WHERE key = :key;", {'key': key})
+
+    def file_queued(self, url, output_path, file_name):
+        self.__execute("INSERT OR REPLACE INTO file VALUES (:url, :output_path, :file_name);",
+                       {'url': url, 'output_path': output_path, 'file_name': file_name})
+
+    def file_done(self, url, output_path, file_name, success):
+        """ A written file is forgotten, a failed file stays in the journal """
+
+        if success:
+            self.__execute("DELETE FROM file WHERE url = :url;", {'url': url})
+
+    def get_unfinished_files(self):
+        """ Return (url, output_path, file_name) of the files that were submitted but not written """
+
+        return [tuple(row) for row in self.__execute("SELECT url, output_path, file_name FROM file ORDER BY rowid;")]
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+
+def owner_key(kind, name, tag_type=None):
+    if kind == OWNER_TAG:
+        return kind + ':' + tag_type + ':' + name
+    return kind + ':' + name
+
+
+def get_unfinished_owners():
+    """ Return the users and tags a previous run did not finish """
+
+    journal = Journal()
+    owners = journal.get_unfinished_owners()
+    journal.close()
+    return owners
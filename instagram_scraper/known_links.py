@@ -0,0 +1,136 @@
+import math
+import hashlib
+
+from . import helper
+
+# Above this amount of links the shortcodes are kept in a bloom filter instead of a set
+BLOOM_THRESHOLD = 100000
+BLOOM_ERROR_RATE = 0.001
+
+# Grabbing links can stop after this many known links in a row, pinned posts can never fill a run
+KNOWN_RUN = 36
+
+# A profile can pin this many old posts above its newest posts
+PINNED_POSTS = 3
+
+# Amount of newest shortcodes of a user that are kept as its watermark
+WATERMARK_SIZE = 12
+
+
+class BloomFilter:
+    """ Compact set that can answer 'maybe' for members that were never added, it never forgets a member """
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.__size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.__hash_count = max(1, round(self.__size / capacity * math.log(2)))
+        self.__bits = bytearray((self.__size + 7) // 8)
+
+    def add(self, item):
+        for position in self.__positions(item):
+            self.__bits[position // 8] |= 1 << position % 8
+
+    def __contains__(self, item):
+        return all(self.__bits[position // 8] & 1 << position % 8 for position in self.__positions(item))
+
+    def __positions(self, item):
+        # Double hashing, every position is derived from two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little')
+        return [(first + i * second) % self.__size for i in range(self.__hash_count)]
+
+    @property
+    def size(self):
+        return self.__size
+
+    @property
+    def hash_count(self):
+        return self.__hash_count
+
+
+class KnownLinks:
+    """
+    The post links that are already in the database for a user or a tag
+    Membership is checked by shortcode in memory, a bloom filter hit is confirmed with confirm(link)
+    """
+
+    def __init__(self, links, count, confirm=None):
+        if count > BLOOM_THRESHOLD and confirm is not None:
+            self.__shortcodes = BloomFilter(count)
+            self.__confirm = confirm
+            for link in links:
+                self.__shortcodes.add(helper.extract_post_id_from_url(link))
+        else:
+            self.__shortcodes = set(helper.extract_post_id_from_url(link) for link in links)
+            self.__confirm = None
+
+        self.__count = count
+        self.__watermark = set()
+        self.__stop_at_known_run = False
+
+    def __contains__(self, link):
+        if helper.extract_post_id_from_url(link) not in self.__shortcodes:
+            return False
+        if self.__confirm is not None:
+            return self.__confirm(link)
+        return True
+
+    def filter_new(self, links):
+        """ Return the links that are not known, in the same order """
+
+        return [link for link in links if link not in self]
+
+    def ends_with_known_run(self, links):
+        """ Return True if the last KNOWN_RUN links are all known, older links will be known as well """
+
+        if len(links) < KNOWN_RUN:
+            return False
+        return all(link in self for link in links[-KNOWN_RUN:])
+
+    def covers(self, max_download):
+        """ Return True if the known links go at least max_download posts deep, 0 is no maximum """
+
+        return max_download > 0 and self.__count >= max_download
+
+    def reached_watermark(self, links):
+        """ Return True if a watermark post is found below the pinned posts, every post under it is older """
+
+        if len(self.__watermark) == 0:
+            return False
+        return any(helper.extract_post_id_from_url(link) in self.__watermark for link in links[PINNED_POSTS:])
+
+    def stop_grabbing(self, links):
+        """
+        Return True if the links that are not grabbed yet are all known
+        A run of known links only stops grabbing when stop_at_known_run is set, the known links of a run
+        with a lower maximum are the newest posts and the older posts under them were never grabbed
+        """
+
+        if self.reached_watermark(links):
+            return True
+        return self.__stop_at_known_run and self.ends_with_known_run(links)
+
+    @property
+    def watermark(self):
+        return self.__watermark
+
+    @watermark.setter
+    def watermark(self, shortcodes):
+        self.__watermark = set(shortcodes)
+
+    @property
+    def stop_at_known_run(self):
+        return self.__stop_at_known_run
+
+    @stop_at_known_run.setter
+    def stop_at_known_run(self, stop):
+        self.__stop_at_known_run = stop
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def uses_bloom_filter(self):
+        return isinstance(self.__shortcodes, BloomFilter)
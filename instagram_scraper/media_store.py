@@ -0,0 +1,82 @@
+import os
+import hashlib
+import threading
+
+from . import constants
+from . import helper
+from . import retriever
+from .database import Database
+
+# Downloads of the same asset wait for each other, other assets only share a lock by chance
+LOCK_STRIPES = 64
+
+
+class MediaStore:
+    """
+    Writes every media file once under root, keyed by the asset id the CDN puts in the file name
+    The user and tag directories get hard links to the blobs, or symbolic links where hard links are not possible
+    """
+
+    def __init__(self, root=constants.STORE_DIR):
+        self.__root = root
+
+        # The download workers share one connection
+        self.__database = Database(check_same_thread=False)
+        self.__database_lock = threading.Lock()
+        self.__asset_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def download(self, url, output_path='', file_name=''):
+        """ Same as retriever.download, an asset that is already in the store is not downloaded again """
+
+        asset_id = retriever.get_file_name_from_url(url)
+        if file_name == '':
+            file_name = asset_id
+
+        if output_path == '':
+            full_output_path = file_name
+        else:
+            os.makedirs(output_path, exist_ok=True)
+            full_output_path = output_path + '/' + file_name
+
+        blob_path = self.blob_path(asset_id)
+        with self.__asset_locks[hash(asset_id) % LOCK_STRIPES]:
+            # The retriever only gives a blob its name once it is complete
+            if not os.path.isfile(blob_path):
+                retriever.download(url, os.path.dirname(blob_path), asset_id)
+
+            self.__link(blob_path, full_output_path)
+
+        with self.__database_lock:
+            self.__database.insert_blob(asset_id, blob_path)
+            self.__database.insert_blob_ref(full_output_path, asset_id)
+        return full_output_path, file_name
+
+    def blob_path(self, asset_id):
+        """ Blobs are spread over 256 directories """
+
+        return self.__root + '/' + hashlib.sha1(asset_id.encode()).hexdigest()[:2] + '/' + asset_id
+
+    def close(self):
+        with self.__database_lock:
+            self.__database.close_connection()
+
+    @staticmethod
+    def __link(blob_path, full_output_path):
+        if os.path.lexists(full_output_path):
+            if os.path.exists(full_output_path) and os.path.samefile(blob_path, full_output_path):
+                return
+            os.remove(full_output_path)
+
+        try:
+            os.link(blob_path, full_output_path)
+        except OSError:
+            os.symlink(os.path.abspath(blob_path), full_output_path)
+
+
+def release(database, directory):
+    """ Forget the files inside the directory and delete the blobs no other file links to """
+
+    database.remove_blob_refs(directory)
+    for asset_id, path in database.get_unreferenced_blobs():
+        helper.remove_file(path)
+        database.remove_blob(asset_id)
@@ -0,0 +1,142 @@
+import re
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from . import constants
+
+logger = logging.getLogger('__name__')
+
+PREFIX = 'igscraper_'
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Upper bounds in seconds of the histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class MetricsExporter:
+
+    def __init__(self, port, host=constants.DAEMON_HOST):
+        """
+        Serve the counters and span durations of the instrumentation as OpenMetrics on http://host:port/metrics
+        Add it as listener of the instrumentation, gauges are read when the endpoint is scraped
+        """
+
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__histograms = {}
+        self.__gauges = {}
+        self.__server = ThreadingHTTPServer((host, port), self.__handler_class())
+
+    def start(self):
+        """ Answer requests on a background thread """
+
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def add_gauge(self, name, function, label=None):
+        """
+        Read a gauge from function every time the metrics are scraped
+        With a label the function returns a dict of label value: gauge value
+        """
+
+        self.__gauges[name] = (function, label)
+
+    def span_recorded(self, name, duration):
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                histogram = self.__histograms[name] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += duration
+            histogram['count'] += 1
+
+    def counted(self, name, amount):
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + amount
+
+    def render(self):
+        """ Return the metrics in the OpenMetrics text format """
+
+        lines = []
+        with self.__lock:
+            counters = dict(self.__counters)
+            histograms = {name: dict(histogram, buckets=list(histogram['buckets']))
+                          for name, histogram in self.__histograms.items()}
+
+        for name, value in sorted(counters.items()):
+            metric = PREFIX + metric_name(name)
+            lines.append('# TYPE ' + metric + ' counter')
+            lines.append(metric + '_total ' + format_value(value))
+
+        if len(histograms) > 0:
+            metric = PREFIX + 'span_seconds'
+            lines.append('# TYPE ' + metric + ' histogram')
+            lines.append('# HELP ' + metric + ' Duration of the measured actions, requests and database calls.')
+            for name, histogram in sorted(histograms.items()):
+                for bound, bucket in zip(BUCKETS, histogram['buckets']):
+                    lines.append('%s_bucket{span="%s",le="%s"} %d' % (metric, name, float(bound), bucket))
+                lines.append('%s_bucket{span="%s",le="+Inf"} %d' % (metric, name, histogram['count']))
+                lines.append('%s_sum{span="%s"} %s' % (metric, name, format_value(histogram['sum'])))
+                lines.append('%s_count{span="%s"} %d' % (metric, name, histogram['count']))
+
+        for name, (function, label) in sorted(self.__gauges.items()):
+            try:
+                value = function()
+            except Exception as err:
+                logger.error('could not read gauge %s: %s' % (name, err))
+                continue
+
+            metric = PREFIX + metric_name(name)
+            lines.append('# TYPE ' + metric + ' gauge')
+            if label is None:
+                lines.append(metric + ' ' + format_value(value))
+            else:
+                for label_value, gauge_value in sorted(value.items()):
+                    lines.append('%s{%s="%s"} %s' % (metric, label, label_value, format_value(gauge_value)))
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def __handler_class(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def port(self):
+        return self.__server.server_address[1]
+
+
+def metric_name(name):
+    """ download.bytes becomes download_bytes """
+
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
@@ -0,0 +1,96 @@
+import json
+import base64
+import logging
+
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger('__name__')
+
+LOG_TYPE = 'performance'
+
+
+def enable(driver_options):
+    """ Let Chrome record the network events of every page in the performance log """
+
+    driver_options.set_capability('goog:loggingPrefs', {LOG_TYPE: 'ALL'})
+
+
+def clear(web_driver):
+    """ Drop the network events that were recorded so far """
+
+    __read_log(web_driver)
+
+
+def get_post_media(web_driver, shortcode):
+    """
+    Return the shortcode_media JSON of a post from the JSON responses the page loaded since the last read
+    Returns None if the post was not in any captured response
+    """
+
+    for message in __read_log(web_driver):
+        if message.get('method') != 'Network.responseReceived':
+            continue
+
+        response = message['params']['response']
+        if 'json' not in response.get('mimeType', ''):
+            continue
+
+        data = __get_response_json(web_driver, message['params']['requestId'])
+        media = find_shortcode_media(data, shortcode)
+        if media is not None:
+            return media
+    return None
+
+
+def find_shortcode_media(data, shortcode):
+    """ Search the JSON for the shortcode_media of the post with shortcode """
+
+    if isinstance(data, dict):
+        media = data.get('shortcode_media')
+        if isinstance(media, dict) and media.get('shortcode') == shortcode:
+            return media
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return None
+
+    for value in values:
+        media = find_shortcode_media(value, shortcode)
+        if media is not None:
+            return media
+    return None
+
+
+def __read_log(web_driver):
+    try:
+        entries = web_driver.get_log(LOG_TYPE)
+    except WebDriverException as err:
+        logger.error('could not read the network log: %s' % err)
+        return []
+
+    messages = []
+    for entry in entries:
+        try:
+            messages.append(json.loads(entry['message'])['message'])
+        except (ValueError, KeyError) as err:
+            logger.error('invalid network log entry: %s' % err)
+    return messages
+
+
+def __get_response_json(web_driver, request_id):
+    try:
+        result = web_driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+    except WebDriverException as err:
+        # The body is gone when the page was left or the buffer was full
+        logger.debug('no response body for request %s: %s' % (request_id, err))
+        return None
+
+    body = result['body']
+    if result.get('base64Encoded'):
+        body = base64.b64decode(body).decode('utf-8', errors='replace')
+
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
@@ -0,0 +1,74 @@
+import queue
+import logging
+import threading
+
+logger = logging.getLogger('__name__')
+
+# Items a background stage can be ahead of the next stage
+QUEUE_SIZE = 2
+
+# Seconds a blocked stage waits before it checks if the next stage still wants items
+PUT_INTERVAL = 0.1
+
+_END = object()
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+def run(items, stages, queue_size=QUEUE_SIZE):
+    """
+    Pass the items through the stages and return an iterator over what the last stage yields
+    A stage is a pair (function, background), function takes an iterator and yields the items for the next stage
+    A background stage runs on its own thread with a queue of queue_size items to the next stage,
+    the other stages run on the thread that iterates. An error of a background stage is raised on that thread
+    """
+
+    stream = iter(items)
+    for function, background in stages:
+        stream = function(stream)
+        if background:
+            stream = __in_background(stream, queue_size)
+    return stream
+
+
+def __in_background(stream, queue_size):
+    """ Iterate the stream on a thread of its own, at most queue_size items are waiting for the consumer """
+
+    items = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=PUT_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in stream:
+                if not put(item):
+                    return
+        except BaseException as err:
+            put(_Failed(err))
+        finally:
+            put(_END)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        # The consumer stopped early, the producer stops at its next item
+        stopped.set()
@@ -0,0 +1,88 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger('__name__')
+
+
+class PostRecorder:
+
+    def __init__(self):
+        """
+        Listener of the download pool that holds a scraped post back until all of its files are written
+        A post with a file that could not be downloaded is never recorded, the next run scrapes it again
+        """
+
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__posts = {}
+        self.__files = {}
+        self.__recorded = []
+
+    @contextmanager
+    def post(self, link):
+        """ The files that are submitted on this thread inside the with block are the files of the post """
+
+        with self.__lock:
+            # The block itself counts as a pending file, the post can not be finished while it is scraped
+            self.__posts[link] = {'pending': 1, 'failed': False, 'row': None}
+        self.__local.link = link
+        try:
+            yield
+        finally:
+            self.__local.link = None
+            with self.__lock:
+                self.__release(link, True)
+
+    def record(self, link, has_multiple_content, userid=None):
+        """ Call inside the post block when the post is scraped, a post that is not recorded is dropped """
+
+        with self.__lock:
+            post = self.__posts.get(link)
+            if post is not None:
+                post['row'] = (link, has_multiple_content, userid)
+
+    def pop_recorded(self):
+        """ Return (link, has multiple content, userid) of the posts whose files are all written since the last call """
+
+        with self.__lock:
+            recorded = self.__recorded
+            self.__recorded = []
+        return recorded
+
+    def file_queued(self, url, output_path, file_name):
+        link = getattr(self.__local, 'link', None)
+        if link is None:
+            return
+
+        with self.__lock:
+            self.__posts[link]['pending'] += 1
+            self.__files.setdefault((url, output_path, file_name), []).append(link)
+
+    def file_done(self, url, output_path, file_name, success):
+        key = (url, output_path, file_name)
+        with self.__lock:
+            links = self.__files.get(key)
+            if not links:
+                return
+
+            link = links.pop(0)
+            if len(links) == 0:
+                del self.__files[key]
+            self.__release(link, success)
+
+    def __release(self, link, success):
+        post = self.__posts.get(link)
+        if post is None:
+            return
+
+        post['failed'] = post['failed'] or not success
+        post['pending'] -= 1
+        if post['pending'] > 0:
+            return
+
+        del self.__posts[link]
+        if post['failed']:
+            logger.warning('post %s is not recorded, some of its files could not be downloaded' % link)
+        elif post['row'] is not None:
+            self.__recorded.append(post['row'])
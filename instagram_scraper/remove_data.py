@@ -5,6 +5,7 @@ import logging
 from . import helper
 from .database import Database
 from . import constants
+from . import media_store
 
 logger = logging.getLogger('__name__')
 
@@ -30,7 +31,7 @@ def remove_users_by_username(input_usernames):
         for username in input_usernames:
             database.remove_user(username)
             try:
-                helper.remove_dir(constants.USERS_DIR + '/' + username)
+                __remove_output_dir(database, constants.USERS_DIR + '/' + username)
             except OSError as err:
                 logger.error(err)
     database.close_connection()
@@ -57,7 +58,7 @@ def remove_tags_by_tagname(input_tags):
         for tag in input_tags:
             database.remove_tag(tag)
             try:
-                helper.remove_dir(constants.TAGS_DIR + '/' + tag)
+                __remove_output_dir(database, constants.TAGS_DIR + '/' + tag)
             except OSError as err:
                 logger.error(err)
     database.close_connection()
@@ -89,7 +90,7 @@ def remove_users_by_number(usernames_dict, input_numbers):
             if database.user_exists(username):
                 database.remove_user(username)
             try:
-                helper.remove_dir(constants.USERS_DIR + '/' + username)
+                __remove_output_dir(database, constants.USERS_DIR + '/' + username)
             except OSError as err:
                 logger.error(err)
     database.close_connection()
@@ -121,7 +122,7 @@ def remove_tags_by_number(tags_dict, input_numbers):
             if database.tag_exists(tag):
                 database.remove_tag(tag)
             try:
-                helper.remove_dir(constants.TAGS_DIR + '/' + tag)
+                __remove_output_dir(database, constants.TAGS_DIR + '/' + tag)
             except OSError as err:
                 logger.error(err)
 
@@ -138,7 +139,7 @@ def remove_all_users():
             usernames = database.retrieve_all_usernames()
 
             for username in usernames:
-                helper.remove_dir(constants.USERS_DIR + '/' + username)
+                __remove_output_dir(database, constants.USERS_DIR + '/' + username)
 
             if len(usernames) > 0:
                 database.remove_all_users()
@@ -155,8 +156,15 @@ def remove_all_tags():
             tagnames = database.retrieve_all_tags()
 
             for tagname in tagnames:
-                helper.remove_dir(constants.TAGS_DIR + '/' + tagname)
+                __remove_output_dir(database, constants.TAGS_DIR + '/' + tagname)
 
             if len(tagnames) > 0:
                 database.remove_all_tags()
             database.close_connection()
+
+
+def __remove_output_dir(database, directory):
+    """ Remove an output directory, the media store blobs that are only linked from inside it are removed too """
+
+    media_store.release(database, directory)
+    helper.remove_dir(directory)
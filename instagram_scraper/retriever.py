@@ -1,69 +1,171 @@
 import os
-import requests
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+import json
+import logging
+import threading
 from urllib.parse import urlparse
 from requests.exceptions import RequestException
 from requests.exceptions import HTTPError
 
+from . import http_session
+from . import instrumentation
 
-def download(url, output_path='', file_name=''):
+logger = logging.getLogger('__name__')
+
+# Every output directory keeps the ETag, Last-Modified and size of its files in this append only file
+CACHE_FILE_NAME = '.igscraper-cache'
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+CHUNK_SIZE = 1048576
+PART_SUFFIX = '.part'
+
+# Amount of requests for one download, every request after the first continues the .part file
+RESUME_TRIES = 3
+
+
+@instrumentation.timed(instrumentation.DOWNLOAD_SPAN)
+def download(url, output_path='', file_name='', chunk_size=None):
     """
     Download a file from url
     If output_path is '', the file will be downloaded directly into the current directory
     If file_name is '', the file name from the url will be used
+    A file that is already on disk is only downloaded again when the server has a different version
+    The file is written to a .part file first, an interrupted download continues from the end of the .part file
     """
 
-    session = __retry_session(retries=3,
-                              backoff_factor=0.1,
-                              status_forcelist=[429, 500, 502, 503, 504],
-                              method_whitelist=['GET'])
-    try:
-        res = session.get(url=url)
-    except RequestException as err:
-        raise RequestException(err)
-    else:
-        if res.status_code != 200:
-            raise HTTPError('Invalid URL')
-
-        if file_name == '' or None:
-            # Get the file name from the url
-            file_name = get_file_name_from_url(url)
-
-        if output_path == '' or None:
-            # The full path will be the file name if no output path was given
-            full_output_path = file_name
-        else:
-            # The full path will be the given output path with the file name at the end
-            __create_dir(output_path)
-            full_output_path = output_path + '/' + file_name
-
-        with open(full_output_path, 'wb') as file:
-            # Download the file in chunks
-            for chunk in res.iter_content(chunk_size=1048576):
-                if chunk:
-                    file.write(chunk)
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+
+    file_name, full_output_path, part_path = get_paths(url, output_path, file_name)
+
+    # Ask for the file only if it changed since it was written
+    cached, headers = get_cache_headers(output_path, file_name, full_output_path)
+
+    session = http_session.get_session()
+    for attempt in range(RESUME_TRIES):
+        if attempt > 0:
+            instrumentation.count('download.retries')
+
+        # Continue the .part file if the server still has the version it was started with
+        part_size, request_headers = get_resume_headers(output_path, file_name, part_path, headers)
+
+        try:
+            res = session.get(url=url, stream=True, headers=request_headers)
+        except RequestException as err:
+            raise RequestException(err)
+
+        with res:
+            if res.status_code == 304 and headers:
+                instrumentation.count('download.not_modified')
+                return full_output_path, file_name
+
+            # The .part file does not fit the file on the server anymore
+            if res.status_code == 416 and 'Range' in request_headers:
+                os.remove(part_path)
+                continue
+
+            if res.status_code not in (200, 206):
+                raise HTTPError('Invalid URL')
+
+            if res.status_code == 200:
+                # A file that was written before it had cache metadata is kept when its size matches
+                content_length = res.headers.get('Content-Length')
+                if cached is None and is_written(output_path, file_name, full_output_path, res, content_length):
+                    return full_output_path, file_name
+
+                # The whole file is sent, start the .part file over
+                part_size = 0
+                expected_size = get_expected_size(res, content_length)
+                set_cached(output_path, file_name + PART_SUFFIX, res, 0)
+            else:
+                start, expected_size = parse_content_range(res.headers.get('Content-Range'))
+                if start != part_size:
+                    logger.warning('unexpected range %s for %s' % (res.headers.get('Content-Range'), url))
+                    os.remove(part_path)
+                    continue
+
+            try:
+                with open(part_path, 'ab' if part_size > 0 else 'wb') as file:
+                    # Download the file in chunks
+                    for chunk in res.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            file.write(chunk)
+                            instrumentation.count(instrumentation.BYTES_COUNTER, len(chunk))
+                    file.flush()
+                    os.fsync(file.fileno())
+            except RequestException as err:
+                # The next try continues where the connection dropped
+                logger.warning('download of %s interrupted: %s' % (url, err))
+                continue
+
+        size = os.path.getsize(part_path)
+        if expected_size is not None and size != expected_size:
+            logger.warning('download of %s has %d of %d bytes' % (url, size, expected_size))
+            if size > expected_size:
+                os.remove(part_path)
+            continue
+
+        os.replace(part_path, full_output_path)
+        set_cached(output_path, file_name, res, size)
         return full_output_path, file_name
-    finally:
-        session.close()
+
+    # The .part file is kept, the next download of the file continues it
+    raise HTTPError('Incomplete download: ' + url)
+
+
+def get_paths(url, output_path='', file_name=''):
+    """ Return the file name, the full output path and the .part path of a download, the output path is created """
+
+    if file_name == '' or None:
+        # Get the file name from the url
+        file_name = get_file_name_from_url(url)
+
+    if output_path == '' or None:
+        # The full path will be the file name if no output path was given
+        full_output_path = file_name
+    else:
+        # The full path will be the given output path with the file name at the end
+        __create_dir(output_path)
+        full_output_path = output_path + '/' + file_name
+    return file_name, full_output_path, full_output_path + PART_SUFFIX
+
+
+def get_cache_headers(output_path, file_name, full_output_path):
+    """ Return the cache entry of a file that is on disk as it was written and the headers to ask if it changed """
+
+    cached = __get_cached(output_path, file_name)
+    headers = {}
+    if cached is not None and os.path.isfile(full_output_path) and os.path.getsize(full_output_path) == cached['size']:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    return cached, headers
 
 
-def __retry_session(retries, backoff_factor, status_forcelist, method_whitelist):
-    """ Retry session """
+def get_resume_headers(output_path, file_name, part_path, headers):
+    """ Return the size of the .part file and the headers that ask for the rest of it """
 
-    retry = Retry(
-        total=retries,
-        read=retries,
-        connect=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=status_forcelist,
-        allowed_methods=method_whitelist)
+    request_headers = dict(headers)
+    part_size = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    part_cached = __get_cached(output_path, file_name + PART_SUFFIX)
+    if part_size > 0 and part_cached is not None:
+        request_headers['Range'] = 'bytes=%d-' % part_size
+        validator = part_cached.get('etag') or part_cached.get('last_modified')
+        if validator:
+            request_headers['If-Range'] = validator
+    return part_size, request_headers
 
-    adapter = HTTPAdapter(max_retries=retry)
-    session = requests.Session()
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    return session
+
+def is_written(output_path, file_name, full_output_path, res, content_length):
+    """ Return True if a file that was written before it had cache metadata has the size of the file on the server """
+
+    if content_length is None or not os.path.isfile(full_output_path) \
+            or os.path.getsize(full_output_path) != int(content_length):
+        return False
+    set_cached(output_path, file_name, res, int(content_length))
+    return True
 
 
 def get_file_name_from_url(url):
@@ -80,3 +182,70 @@ def __create_dir(directory):
         os.makedirs(directory, exist_ok=True)
     except OSError as err:
         raise OSError(err)
+
+
+def get_expected_size(res, content_length):
+    """ The size the file must have, unknown when the body is compressed in transfer """
+
+    if content_length is None or res.headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+    return int(content_length)
+
+
+def parse_content_range(content_range):
+    """ Return the first byte and the total size of a 'bytes first-last/total' range """
+
+    try:
+        _, byte_range = content_range.split(' ')
+        first, total = byte_range.split('/')
+        return int(first.split('-')[0]), None if total == '*' else int(total)
+    except (AttributeError, ValueError):
+        return None, None
+
+
+def __cache_path(output_path):
+    if output_path == '':
+        return CACHE_FILE_NAME
+    return output_path + '/' + CACHE_FILE_NAME
+
+
+def __load_cache(output_path):
+    """ Return the cache of a directory, a later line of the cache file replaces an earlier line of the same file """
+
+    if output_path not in _cache:
+        entries = {}
+        try:
+            with open(__cache_path(output_path), 'r') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                        entries[entry['name']] = entry
+                    except (ValueError, KeyError):
+                        # A line that was cut off by a crash
+                        continue
+        except FileNotFoundError:
+            pass
+        except OSError as err:
+            logger.error('could not read download cache: %s' % err)
+        _cache[output_path] = entries
+    return _cache[output_path]
+
+
+def __get_cached(output_path, file_name):
+    with _cache_lock:
+        return __load_cache(output_path).get(file_name)
+
+
+def set_cached(output_path, file_name, res, size):
+    """ Remember the version of a written file, res is the response it was written from """
+
+    entry = {'name': file_name, 'etag': res.headers.get('ETag'), 'last_modified': res.headers.get('Last-Modified'),
+             'size': size}
+
+    with _cache_lock:
+        __load_cache(output_path)[file_name] = entry
+        try:
+            with open(__cache_path(output_path), 'a') as file:
+                file.write(json.dumps(entry) + '\n')
+        except OSError as err:
+            logger.error('could not write download cache: %s' % err)
@@ -13,16 +13,41 @@ import colorama
 from .database import Database
 from . import constants
 from .progress_bar import ProgressBar
+from .download_pool import DownloadPool
+from .async_download_pool import AsyncDownloadPool
+from .browser_pool import BrowserPool
+from .journal import Journal
+from .media_store import MediaStore
+from .account_pool import use_account
+from .account_pool import load_cookies
+from .session_store import SessionStore
+from .session_store import has_session_cookie
+from .post_recorder import PostRecorder
 from . import helper
 from . import get_data
+from . import http_session
+from . import governor
+from . import instrumentation
 from . import actions
+from . import engines
+from . import known_links
+from . import network_capture
+from . import journal
+from . import user_resolver
+from . import pipeline
 
 logger = logging.getLogger('__name__')
 
+# Amount of times the official Instagram profile is loaded before the ip address is considered restricted
+RESTRICTED_TRIES = 4
+
 
 class Scraper:
 
-    def __init__(self, headful, download_stories, max_download, login_username):
+    def __init__(self, headful, download_stories, max_download, login_username,
+                 download_workers=constants.DOWNLOAD_WORKERS_DEFAULT, engine=constants.ENGINE_SELENIUM, browsers=0,
+                 resume=False, store=False, async_downloads=False, account_pool=None, logout=False,
+                 metrics=None):
         self.__c_fore = colorama.Fore
         self.__c_style = colorama.Style
         colorama.init()
@@ -30,18 +55,87 @@ class Scraper:
         self.__database = Database()
         self.__database.create_tables()
 
+        # Every download worker keeps its own connection to the CDN alive
+        http_session.configure(pool_maxsize=max(http_session.POOL_MAXSIZE, download_workers))
+        self.__media_store = MediaStore() if store else None
+        if async_downloads:
+            try:
+                self.__download_pool = AsyncDownloadPool(download_workers, store=self.__media_store)
+            except ImportError as err:
+                print(self.__c_fore.RED + str(err) + self.__c_style.RESET_ALL)
+                sys.exit(0)
+        else:
+            self.__download_pool = DownloadPool(download_workers, store=self.__media_store)
+
+        # Without resume the work of the previous run is forgotten
+        self.__journal = Journal()
+        self.__resume = resume
+        if not resume:
+            self.__journal.clear()
+        self.__download_pool.add_listener(self.__journal)
+
+        # A post is written to the database once all of its files are downloaded
+        self.__post_recorder = PostRecorder()
+        self.__download_pool.add_listener(self.__post_recorder)
+        self.__recording_tag = None
+
+        # The exporter outlives the scraper, the gauge follows the download pool of the newest scraper
+        if metrics is not None:
+            metrics.add_gauge('download.queue_depth', lambda: self.__download_pool.queue_depth)
+
         self.__headful = headful
         self.__download_stories = download_stories
         self.__max_download = max_download
         self.__login_username = login_username
 
         self.__is_logged_in = False
+        self.__ip_checked = False
         self.__cookies_accepted = False
+        self.__browser_pool = None
 
-        self.__web_driver = self.__start_web_driver()
+        # The requests and browsers of the run are spread over the accounts of the pool
+        self.__account_pool = account_pool
+        self.__account = None
+        http_session.set_account_pool(account_pool)
 
+        # The session of the login username is kept between runs, unless it should be logged out
+        self.__logout = logout
+        self.__session_store = None
+        self.__session_unverified = False
         if self.__login_username:
+            try:
+                self.__session_store = SessionStore()
+            except ImportError as err:
+                print(self.__c_fore.RED + str(err) + self.__c_style.RESET_ALL)
+
+        if engine == constants.ENGINE_HTTP:
+            # The http engine never opens a browser
+            self.__web_driver = None
+            self.__engine = engines.HttpEngine(self)
+
+            if self.__login_username:
+                # The http engine can only use a session that the selenium engine saved
+                cookies = self.__session_store.load(self.__login_username) if self.__session_store else None
+                if not cookies:
+                    print(self.__c_fore.RED + 'login is only possible with the selenium engine, '
+                          + 'the http engine uses the session it saves' + self.__c_style.RESET_ALL)
+                    self.stop()
+                http_session.set_cookies(cookies)
+
+            if self.__account_pool:
+                for account in self.__account_pool.accounts:
+                    if not account.cookies:
+                        print(self.__c_fore.RED + 'account ' + account.username + ' has no saved session, '
+                              + 'log it in once with the selenium engine' + self.__c_style.RESET_ALL)
+                        self.stop()
+        else:
+            self.__web_driver = self.__start_web_driver()
+            self.__engine = engines.SeleniumEngine(self)
+
+        if self.__login_username and self.__web_driver is not None:
             self.__init_login()
+        elif self.__account_pool and self.__web_driver is not None:
+            self.__init_accounts()
 
         if self.__max_download == 0:
             print(self.__c_fore.RED
@@ -53,6 +147,18 @@ class Scraper:
             print(self.__c_fore.RED + 'you need to be logged in to scrape stories' + self.__c_style.RESET_ALL)
             self.stop()
 
+        if browsers > 0:
+            if engine != constants.ENGINE_SELENIUM:
+                print(self.__c_fore.RED + '--browsers is only possible with the selenium engine'
+                      + self.__c_style.RESET_ALL)
+                self.stop()
+
+            print('starting ' + str(browsers) + ' browser(s)...')
+            self.__browser_pool = BrowserPool(self, browsers, self.__start_web_driver)
+
+        if resume:
+            self.__resume_files()
+
     def __start_web_driver(self):
         """ Start the web driver """
 
@@ -61,6 +167,7 @@ class Scraper:
         driver_options.add_argument('--mute-audio')
         driver_options.add_argument('--user-agent=Mozilla/5.0 Chrome/74.0.3729.169 Safari/537.36')
         driver_options.headless = not self.__headful
+        network_capture.enable(driver_options)
 
         try:
             driver = webdriver.Chrome(service_log_path=os.devnull, options=driver_options)
@@ -83,24 +190,118 @@ class Scraper:
         """
         Check if the official Instagram profile can be seen.
         If not, then Instagram has temporarily restricted the ip address.
+        The governor slows the requests down and the check is tried again after every pause
+        The check is done once per run, the governor takes care of restrictions that come later
         """
 
-        if get_data.get_id_by_username_from_ig('instagram') is None:
+        if self.__ip_checked:
+            return
+
+        for attempt in range(RESTRICTED_TRIES):
+            if get_data.get_id_by_username_from_ig('instagram') is not None:
+                self.__ip_checked = True
+                return
+            if attempt == RESTRICTED_TRIES - 1:
+                break
+
+            pause = governor.throttled(governor.JSON)
             print(self.__c_fore.RED +
-                  'unable to load profiles at this time (IP temporarily restricted by Instagram)' + '\n' +
-                  'try to login with a DUMMY account to scrape' +
+                  'unable to load profiles at this time (IP temporarily restricted by Instagram), ' +
+                  'waiting ' + str(pause) + ' seconds' +
                   self.__c_style.RESET_ALL)
-            self.stop()
+
+        print(self.__c_fore.RED +
+              'unable to load profiles at this time (IP temporarily restricted by Instagram)' + '\n' +
+              'try to login with a DUMMY account to scrape' +
+              self.__c_style.RESET_ALL)
+        self.stop()
 
     def __init_login(self):
         """ Login """
 
         if self.__login_username and not self.__is_logged_in:
+            # A saved session is used without checking it, the first page load tells if it expired
+            cookies = self.__session_store.load(self.__login_username) if self.__session_store else None
+            if cookies:
+                load_cookies(self.__web_driver, cookies)
+                http_session.set_cookies(cookies)
+                self.__is_logged_in = True
+                self.__session_unverified = True
+                return
+
             sys.stdout.write('\n')
             print('login with a DUMMY account, never use your personal account')
             login_password = getpass.getpass(prompt='enter your password: ')
             actions.Login(self, self.__login_username, login_password).do()
             print('login success')
+            self.__save_session()
+
+    def __save_session(self):
+        """ Encrypt the cookies of the browser to the session store, the next run does not have to login """
+
+        if self.__session_store is None:
+            return
+
+        try:
+            cookies = self.__web_driver.get_cookies()
+        except WebDriverException as err:
+            logger.error('could not read cookies: %s' % err)
+            return
+
+        self.__session_store.save(self.__login_username, cookies)
+        http_session.set_cookies(cookies)
+
+    def verify_session(self):
+        """
+        Call after the first page load with a saved session
+        Return False if the session expired, the login is then done again
+        """
+
+        self.__session_unverified = False
+        if has_session_cookie(self.__web_driver.get_cookies()):
+            return True
+
+        print('saved session expired')
+        self.__session_store.remove(self.__login_username)
+        self.__is_logged_in = False
+        self.__init_login()
+        return False
+
+    def __init_accounts(self):
+        """ Log in the accounts without a saved session and give the browser the least used account """
+
+        logged_in = False
+        for account in self.__account_pool.accounts:
+            if account.cookies:
+                continue
+
+            print('login ' + account.username + '...')
+            actions.Login(self, account.username, account.password).do()
+            account.cookies = self.__web_driver.get_cookies()
+            self.__web_driver.delete_all_cookies()
+            actions.GoToLink(self, constants.INSTAGRAM_URL, force=True).do()
+            logged_in = True
+
+        if logged_in:
+            self.__account_pool.save()
+
+        self.__account = self.__account_pool.acquire()
+        use_account(self.__web_driver, self.__account)
+        self.__is_logged_in = True
+
+    def switch_account(self, throttled=True):
+        """
+        Instagram throttled the account of the browser, continue with the least used healthy account
+        An account that only used up its budget is switched without a cooldown
+        """
+
+        if self.__account is None:
+            return
+
+        if throttled:
+            self.__account_pool.throttled(self.__account)
+        self.__account = self.__account_pool.acquire()
+        use_account(self.__web_driver, self.__account)
 
     def __init_scrape_stories(self, user):
         """ Start function for scraping stories """
@@ -116,67 +317,118 @@ class Scraper:
         else:
             print('no stories found')
 
-    def __filter_post_links(self, user):
-        """
-        Check if the post link is already in the database (if post link was added by scraping a profile).
-        If yes then skip it.
+    def __resume_files(self):
+        """ Download the files the previous run submitted but did not write """
+
+        files = self.__journal.get_unfinished_files()
+        if len(files) > 0:
+            print('resuming ' + str(len(files)) + ' download(s) of the previous run')
+        for url, output_path, file_name in files:
+            self.__download_pool.submit(url, output_path, file_name)
+
+    def __wait_for_downloads(self):
+        """ Wait until the download pool is empty and report the files that could not be downloaded """
+
+        self.__download_pool.wait()
+        self.__record_posts()
+        failed = self.__download_pool.pop_failed()
+        if len(failed) > 0:
+            print(self.__c_fore.RED + str(len(failed)) + ' file(s) could not be downloaded' + self.__c_style.RESET_ALL)
+
+    def __record_posts(self):
+        """ Write the posts whose files are all downloaded, a post of a tag is added to the tag too """
+
+        for link, has_multiple_content, userid in self.__post_recorder.pop_recorded():
+            self.__database.insert_post(link, has_multiple_content, userid)
+            if self.__recording_tag is not None:
+                tag, tag_type = self.__recording_tag
+                self.__database.insert_tag_post(link, tag.tagname,
+                                                in_top=tag_type == constants.TAG_TYPE_TOP,
+                                                in_recent=tag_type == constants.TAG_TYPE_RECENT)
+
+    def __scrape_posts(self, post_links, output_path, journal_key, userid=None, tag=None, tag_type=None):
+        """ Scrape posts one by one, or in parallel when there is a browser pool """
+
+        self.__recording_tag = (tag, tag_type) if tag else None
+        if self.__browser_pool:
+            results = self.__browser_pool.scrape(post_links, output_path, userid)
+        else:
+            results = ((link, self.__engine.scrape_post(link, output_path, userid)) for link in post_links)
+
+        progress_bar = ProgressBar(len(post_links), show_count=True)
+        with self.__database.batch():
+            for link, success in results:
+                self.__journal.set_link_state(journal_key, link, journal.STATE_RESOLVED if success
+                                              else journal.STATE_FAILED)
+                if success:
+                    instrumentation.count(instrumentation.POSTS_COUNTER)
+                self.__record_posts()
+                progress_bar.update(1)
+        progress_bar.close()
+
+    def __update_watermark(self, user, userid, post_links):
+        """ Remember the newest posts of the user that are in the database """
+
+        shortcodes = [helper.extract_post_id_from_url(link) for link in post_links[:known_links.WATERMARK_SIZE]
+                      if self.__database.user_post_link_exists(user.username, link)]
+        if len(shortcodes) > 0:
+            self.__database.set_user_watermark(userid, shortcodes)
+
+    def init_scrape_users(self, users, incremental=False):
         """
+        Start function for scraping users
+        An incremental scrape stops grabbing post links at the newest posts of the previous scrape
 
-        filtered_post_links = []
-        for link in user.post_links:
-            if not self.__database.user_post_link_exists(user.username, link):
-                filtered_post_links.append(link)
-        return filtered_post_links
-
-    def init_scrape_users(self, users):
-        """ Start function for scraping users """
+        The users go through a pipeline of three stages with small queues between them:
+        ids and profiles of the next users are resolved over http in the background,
+        then the post links of a user are collected, then its posts are scraped and downloaded
+        Links are collected in the background too when the posts are not scraped with the same browser
+        """
 
         helper.create_dir(constants.USERS_DIR)
+        self.__journal.plan(journal.OWNER_USER, [user.username for user in users])
+        self.__engine.reset()
 
-        for x, user in enumerate(users):
-
-            if not self.__is_logged_in:
-                self.__check_if_ip_is_restricted()
+        if not self.__is_logged_in:
+            self.__check_if_ip_is_restricted()
 
-            sys.stdout.write('\n')
-            print('\033[1m' + 'username: ' + user.username + '\033[0;0m')
+        # The journal is read here, only the thread of the last stage uses it
+        pending_links = {}
+        if self.__resume:
+            for user in users:
+                pending_links[user.username] = self.__journal.get_pending_links(
+                    journal.owner_key(journal.OWNER_USER, user.username))
 
-            user.create_user_output_directories()
+        # Stories are scraped with the browser while links are collected and print their progress
+        collect_in_background = (not self.__engine.uses_browser or self.__browser_pool is not None) \
+            and not (self.__is_logged_in and self.__download_stories)
 
-            # Retrieve the id using actions
-            if self.__is_logged_in:
-                userid = actions.GetUserId(self, user.username).do()
-            # Retrieve the id using requests
-            else:
-                userid = get_data.get_id_by_username_from_ig(user.username)
+        def resolve(stream):
+            return self.__resolve_users(stream, users)
 
-            # Continue to next user if id not found
-            if userid is None:
-                print(self.__c_fore.RED + 'could not load user profile' + self.__c_style.RESET_ALL)
-                import time
-                time.sleep(1000)
-                continue
+        def collect(stream):
+            return self.__collect_user_post_links(stream, incremental, pending_links, collect_in_background)
 
-            actions.ScrapeDisplay(self, user).do()
+        stages = [(resolve, True), (collect, collect_in_background)]
+        for user, userid, error, grabbed_post_links in pipeline.run(users, stages):
+            journal_key = journal.owner_key(journal.OWNER_USER, user.username)
+            if collect_in_background:
+                self.__print_username(user)
 
-            if not self.__database.user_exists(user.username):
+            if userid is not None and not self.__database.user_exists(user.username):
                 self.__database.insert_userid_and_username(userid, user.username)
 
-            if self.__is_logged_in and self.__download_stories:
-                self.__init_scrape_stories(user)
-
-            if actions.CheckIfAccountIsPrivate(self, user).do():
-                print(self.__c_fore.RED + 'account is private' + self.__c_style.RESET_ALL)
+            # Continue to next user if the profile can not be scraped
+            if error is not None:
+                print(self.__c_fore.RED + error + self.__c_style.RESET_ALL)
+                self.__journal.finish_owner(journal_key)
                 continue
 
-            if not actions.CheckIfProfileHasPosts(self, user).do():
-                print(self.__c_fore.RED + 'no posts found' + self.__c_style.RESET_ALL)
-                continue
-
-            print('retrieving post links from profile, please wait... ')
-
-            user.post_links = actions.GrabPostLinks(self, user.profile_link).do()
-            user.post_links = self.__filter_post_links(user)
+            if grabbed_post_links is None:
+                print('resuming ' + str(len(user.post_links)) + ' post(s) of the previous run')
+                grabbed_post_links = []
+            else:
+                self.__journal.add_links(journal_key, user.post_links)
 
             if len(user.post_links) <= 0:
                 print('no new posts to download')
@@ -184,47 +436,186 @@ class Scraper:
                 print(self.__c_fore.GREEN + str(len(user.post_links)) +
                       ' post(s) will be downloaded: ' + self.__c_style.RESET_ALL)
 
-                progress_bar = ProgressBar(len(user.post_links), show_count=True)
-                for link in user.post_links:
-                    actions.InitScrape(self, link, user.output_user_posts_path, userid).do()
-                    progress_bar.update(1)
-                progress_bar.close()
+                self.__scrape_posts(user.post_links, user.output_user_posts_path, journal_key, userid)
+
+            self.__wait_for_downloads()
+            self.__update_watermark(user, userid, grabbed_post_links)
+            self.__journal.finish_owner(journal_key)
+
+    def __print_username(self, user):
+        sys.stdout.write('\n')
+        print('\033[1m' + 'username: ' + user.username + '\033[0;0m')
+
+    def __resolve_users(self, users, all_users):
+        """
+        First stage of the user pipeline, runs in the background and only uses http
+        The ids of all users are looked up at the same time, known ids come from the cache,
+        then every user is yielded with its id after the engine fetched what it can ahead of time
+        """
+
+        database = Database()
+        try:
+            user_ids = user_resolver.resolve_user_ids(database, [user.username for user in all_users],
+                                                      self.__engine.lookup_user_id)
+        finally:
+            database.close_connection()
+
+        for user in users:
+            self.__engine.prefetch(user)
+            yield user, user_ids.get(user.username)
+
+    def __collect_user_post_links(self, users, incremental, pending_links, background):
+        """
+        Second stage of the user pipeline, yields (user, userid, error, grabbed post links) for every user
+        The new post links are in user.post_links, grabbed post links is None when they come from the journal
+        A stage in the background reads the known links with a database connection of its own
+        """
+
+        database = Database() if background else self.__database
+        try:
+            for user, userid in users:
+                if not background:
+                    self.__print_username(user)
+
+                user.create_user_output_directories()
+
+                if userid is None:
+                    userid = self.__engine.get_user_id(user)
+                if userid is None:
+                    yield user, None, 'could not load user profile', None
+                    continue
+
+                self.__engine.scrape_display(user)
+
+                if self.__is_logged_in and self.__download_stories:
+                    self.__init_scrape_stories(user)
+
+                if self.__engine.is_private(user):
+                    yield user, userid, 'account is private', None
+                    continue
+
+                if not self.__engine.has_posts(user):
+                    yield user, userid, 'no posts found', None
+                    continue
+
+                # The links that were collected by the previous run are not collected again
+                user.post_links = pending_links.get(user.username)
+                if user.post_links is not None:
+                    yield user, userid, None, None
+                    continue
+
+                if not background:
+                    print('retrieving post links from profile, please wait... ')
+
+                # Skip the post links that are already in the database
+                user_known_links = database.get_known_user_links(user.username)
+                user_known_links.stop_at_known_run = incremental or user_known_links.covers(self.__max_download)
+                if incremental:
+                    user_known_links.watermark = database.get_user_watermark(user.username)
+                grabbed_post_links = self.__engine.grab_user_post_links(user, user_known_links)
+                user.post_links = user_known_links.filter_new(grabbed_post_links)
+                yield user, userid, None, grabbed_post_links
+        finally:
+            if background:
+                database.close_connection()
 
     def init_scrape_tags(self, tags, tag_type):
         """ Start function for scraping tags """
 
         helper.create_dir(constants.TAGS_DIR)
+        self.__journal.plan(journal.OWNER_TAG, [tag.tagname for tag in tags], tag_type)
 
-        for tag in tags:
+        if not self.__is_logged_in:
+            self.__check_if_ip_is_restricted()
 
-            if not self.__is_logged_in:
-                self.__check_if_ip_is_restricted()
+        for tag in tags:
+            journal_key = journal.owner_key(journal.OWNER_TAG, tag.tagname, tag_type)
 
             sys.stdout.write('\n')
             print('\033[1m' + 'tag: #' + tag.tagname + '\033[0;0m')
 
             tag.create_tag_output_directories()
 
-            link = constants.INSTAGRAM_EXPLORE_URL.format(tag.tagname)
             self.__database.insert_tag(tag.tagname)
 
+            # The links that were collected by the previous run are not collected again
+            tag.post_links = self.__journal.get_pending_links(journal_key) if self.__resume else None
+            if tag.post_links is not None:
+                print('resuming ' + str(len(tag.post_links)) + ' post(s) of the previous run')
+            else:
+                print('retrieving post links from explore, please wait... ')
+
+                tag_known_links = self.__database.get_known_tag_links(tag.tagname, tag_type)
+                tag_known_links.stop_at_known_run = tag_known_links.covers(self.__max_download)
+                tag.post_links = self.__engine.grab_tag_post_links(tag, tag_type, tag_known_links)
+
+                if len(tag.post_links) < 1:
+                    print(self.__c_fore.RED + 'no posts found' + self.__c_style.RESET_ALL)
+                    self.__journal.finish_owner(journal_key)
+                    continue
+
+                tag.post_links = tag_known_links.filter_new(tag.post_links)
+                self.__journal.add_links(journal_key, tag.post_links)
+
+            if len(tag.post_links) < 1:
+                print('no new posts to download')
+                self.__journal.finish_owner(journal_key)
+                continue
+
+            print(self.__c_fore.GREEN + str(len(tag.post_links)) + ' ' + tag_type +
+                  ' post(s) will be downloaded: ' + self.__c_style.RESET_ALL)
+
             if tag_type == constants.TAG_TYPE_TOP:
-                actions.ScrapeTopTags(self, link, tag).do()
-            elif tag_type == constants.TAG_TYPE_RECENT:
-                actions.ScrapeRecentTags(self, link, tag).do()
+                output_path = tag.output_top_tag_path
+            else:
+                output_path = tag.output_recent_tag_path
+
+            self.__scrape_posts(tag.post_links, output_path, journal_key, tag=tag, tag_type=tag_type)
+
+            self.__wait_for_downloads()
+            self.__journal.finish_owner(journal_key)
 
     def stop(self):
         """ Stop the program """
 
-        if self.__is_logged_in:
-            actions.Logout(self, self.__login_username).do()
+        if self.__browser_pool:
+            self.__browser_pool.stop()
+
+        try:
+            self.__download_pool.shutdown()
+            self.__record_posts()
+        except AttributeError as err:
+            logger.error('Download pool shutdown error: %s' % err)
+
+        if self.__media_store is not None:
+            self.__media_store.close()
+
+        if self.__account is not None:
+            # Logging out would end the saved session, keep it for the next run
+            try:
+                self.__account.cookies = self.__web_driver.get_cookies()
+            except WebDriverException as err:
+                logger.error('could not read cookies: %s' % err)
+            self.__account_pool.save()
+        elif self.__is_logged_in and self.__web_driver is not None:
+            if self.__logout or self.__session_store is None:
+                actions.Logout(self, self.__login_username).do()
+                if self.__session_store is not None:
+                    self.__session_store.remove(self.__login_username)
+            else:
+                # Logging out would end the saved session, keep it for the next run
+                self.__save_session()
 
         try:
-            self.__web_driver.quit()
+            if self.__web_driver is not None:
+                self.__web_driver.quit()
         except AttributeError as err:
             logger.error('Quit driver error: %s' % err)
 
         self.__database.close_connection()
+        self.__journal.close()
+        http_session.close()
+        instrumentation.finish()
         sys.exit(0)
 
     @property
@@ -235,6 +626,10 @@ class Scraper:
     def is_logged_in(self, is_logged_in):
         self.__is_logged_in = is_logged_in
 
+    @property
+    def session_unverified(self):
+        return self.__session_unverified
+
     @property
     def cookies_accepted(self):
         return self.__cookies_accepted
@@ -255,6 +650,26 @@ class Scraper:
     def database(self):
         return self.__database
 
+    @property
+    def account(self):
+        return self.__account
+
+    @property
+    def account_pool(self):
+        return self.__account_pool
+
     @property
     def max_download(self):
         return self.__max_download
+
+    @max_download.setter
+    def max_download(self, max_download):
+        self.__max_download = max_download
+
+    @property
+    def download_pool(self):
+        return self.__download_pool
+
+    @property
+    def post_recorder(self):
+        return self.__post_recorder
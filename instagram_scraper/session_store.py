@@ -0,0 +1,84 @@
+import os
+import json
+import logging
+
+try:
+    from cryptography.fernet import Fernet
+    from cryptography.fernet import InvalidToken
+except ImportError:
+    Fernet = None
+
+logger = logging.getLogger('__name__')
+
+# The key and the sessions are kept in the home directory, never next to the scraped data
+SESSION_DIR = os.path.join(os.path.expanduser('~'), '.igscraper')
+KEY_FILE_NAME = 'key'
+SESSION_SUFFIX = '.session'
+
+
+class SessionStore:
+
+    def __init__(self, directory=SESSION_DIR):
+        """
+        Keeps the session cookies of every login username encrypted on disk
+        The key is created on first use and only readable by the user that runs the scraper
+        """
+
+        if Fernet is None:
+            raise ImportError('saving the session needs cryptography: pip install igscraper[session]')
+
+        self.__directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.__fernet = Fernet(self.__get_key())
+
+    def load(self, username):
+        """ Return the saved cookies of the username, None if there are none or they can not be read """
+
+        try:
+            with open(self.__session_path(username), 'rb') as file:
+                return json.loads(self.__fernet.decrypt(file.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, InvalidToken) as err:
+            logger.error('could not read saved session of %s: %s' % (username, err))
+            return None
+
+    def save(self, username, cookies):
+        token = self.__fernet.encrypt(json.dumps(cookies).encode('utf-8'))
+        try:
+            with self.__open_private(self.__session_path(username)) as file:
+                file.write(token)
+        except OSError as err:
+            logger.error('could not save session of %s: %s' % (username, err))
+
+    def remove(self, username):
+        try:
+            os.remove(self.__session_path(username))
+        except FileNotFoundError:
+            pass
+
+    def __session_path(self, username):
+        return os.path.join(self.__directory, username.lower() + SESSION_SUFFIX)
+
+    def __get_key(self):
+        path = os.path.join(self.__directory, KEY_FILE_NAME)
+        try:
+            with open(path, 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            key = Fernet.generate_key()
+            with self.__open_private(path) as file:
+                file.write(key)
+            return key
+
+    @staticmethod
+    def __open_private(path):
+        """ Open a file for writing that only the owner can read """
+
+        return os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb')
+
+
+def has_session_cookie(cookies):
+    """ A browser or session that is logged in has a sessionid cookie """
+
+    return any(cookie['name'] == 'sessionid' for cookie in cookies)
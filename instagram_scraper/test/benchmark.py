@@ -0,0 +1,239 @@
+"""
+Offline benchmark of the scraper against a fake Instagram on localhost
+
+    python -m instagram_scraper.test.benchmark [--quick] [--output results.json]
+
+Measures link grabbing against profile depth, posts per second, download throughput and database inserts
+Every measurement is the median of REPEAT runs, the governor is opened up so the numbers only show the scraper
+Everything is measured with the http engine, the selenium engine spends its time in the browser which is not started
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+from .fake_instagram import FakeInstagram
+from ..engines import HttpEngine
+from ..database import Database
+from ..download_pool import DownloadPool
+from ..post_recorder import PostRecorder
+from ..models.user import User
+from .. import constants
+from .. import governor
+from .. import http_session
+
+REPEAT = 3
+
+# Posts on the first page of a profile, the rest is paginated
+PROFILE_PAGE_SIZE = 12
+
+SETTINGS = {
+    'full': {'depths': [12, 120, 1200], 'posts': 200, 'media_files': 50, 'media_size': 1048576, 'rows': 20000},
+    'quick': {'depths': [12, 60], 'posts': 20, 'media_files': 5, 'media_size': 65536, 'rows': 1000}
+}
+
+
+class ScraperStub:
+    def __init__(self, max_download):
+        self.max_download = max_download
+        self.database = Database()
+        self.database.create_tables()
+        self.download_pool = DownloadPool(constants.DOWNLOAD_WORKERS_DEFAULT)
+        self.post_recorder = PostRecorder()
+        self.download_pool.add_listener(self.post_recorder)
+
+    def close(self):
+        self.download_pool.shutdown()
+        self.database.close_connection()
+
+
+def shortcode(username, index):
+    return username + 'x' + str(index)
+
+
+def build_recording(profiles):
+    """ A recording with a profile of post_count posts for every username: post_count of profiles """
+
+    recording = {'pages': {}, 'graphql': {}}
+    for username, post_count in profiles.items():
+        nodes = [{'__typename': 'GraphImage', 'shortcode': shortcode(username, i), 'is_video': False,
+                  'display_url': '{host}/media/' + shortcode(username, i) + '_n.jpg',
+                  'taken_at_timestamp': 1600000000 - i} for i in range(post_count)]
+
+        pages = [nodes[:PROFILE_PAGE_SIZE]]
+        for start in range(PROFILE_PAGE_SIZE, post_count, constants.GRAPHQL_PAGE_SIZE):
+            pages.append(nodes[start:start + constants.GRAPHQL_PAGE_SIZE])
+
+        for number, page in enumerate(pages):
+            has_next_page = number + 1 < len(pages)
+            media = {'count': post_count,
+                     'page_info': {'has_next_page': has_next_page,
+                                   'end_cursor': username + '-' + str(number + 1) if has_next_page else None},
+                     'edges': [{'node': node} for node in page]}
+            if number == 0:
+                recording['pages']['/' + username + '/?__a=1'] = {'graphql': {'user': {
+                    'id': str(len(recording['pages']) + 1), 'username': username, 'is_private': False,
+                    'followed_by_viewer': False, 'profile_pic_url_hd': '{host}/media/' + username + '_dp_n.jpg',
+                    'edge_owner_to_timeline_media': media}}}
+            else:
+                key = constants.USER_MEDIA_QUERY_HASH + '/' + username + '-' + str(number)
+                recording['graphql'][key] = {'data': {'user': {'edge_owner_to_timeline_media': media}}}
+
+        for node in nodes:
+            recording['pages']['/p/' + node['shortcode'] + '/?__a=1'] = {'graphql': {'shortcode_media': node}}
+
+    return recording
+
+
+def measure(function, repeat=REPEAT):
+    """ Run function repeat times and return the median of the seconds it took """
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def bench_link_grab_http(fake, depths):
+    """ Seconds to collect every post link of a profile with the http engine """
+
+    results = {}
+    for depth in depths:
+        scraper = ScraperStub(depth)
+        grabbed = []
+
+        def grab():
+            # The engine keeps the profiles it loaded, every run gets a new engine
+            grabbed[:] = HttpEngine(scraper, fake.url).grab_user_post_links(User('depth' + str(depth)))
+
+        results[str(depth)] = measure(grab)
+        assert len(grabbed) == depth
+        scraper.close()
+    return results
+
+
+def bench_scrape_posts(fake, post_count):
+    """ Posts per second scraped with the http engine, including the download of their media """
+
+    username = 'depth' + str(post_count)
+    links = [constants.INSTAGRAM_URL + 'p/' + shortcode(username, i) + '/' for i in range(post_count)]
+
+    def scrape():
+        scraper = ScraperStub(post_count)
+        engine = HttpEngine(scraper, fake.url)
+        with tempfile.TemporaryDirectory(dir='.') as output_path:
+            for link in links:
+                engine.scrape_post(link, output_path)
+            scraper.download_pool.wait()
+            scraper.close()
+
+    return post_count / measure(scrape)
+
+
+def bench_downloads(fake, file_count, media_size):
+    """ Bytes per second downloaded by the download pool """
+
+    urls = [fake.url + 'media/file' + str(i) + '_n.jpg' for i in range(file_count)]
+
+    def download():
+        download_pool = DownloadPool(constants.DOWNLOAD_WORKERS_DEFAULT)
+        with tempfile.TemporaryDirectory(dir='.') as output_path:
+            for url in urls:
+                download_pool.submit(url, output_path)
+            download_pool.shutdown()
+            assert len(os.listdir(output_path)) >= file_count
+
+    return file_count * media_size / measure(download)
+
+
+def bench_database(row_count):
+    """ Posts per second inserted one transaction each and in batches """
+
+    def insert(batched):
+        database = Database()
+        database.create_tables()
+        database.insert_userid_and_username('1', 'benchuser')
+        rows = [constants.INSTAGRAM_URL + 'p/' + str(time.perf_counter_ns()) + '-' + str(i) + '/'
+                for i in range(row_count)]
+        if batched:
+            with database.batch():
+                for row in rows:
+                    database.insert_post(row, False, '1')
+        else:
+            for row in rows:
+                database.insert_post(row, False, '1')
+        database.close_connection()
+
+    return {'single': row_count / measure(lambda: insert(False)),
+            'batch': row_count / measure(lambda: insert(True))}
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(quick=False):
+    """ Run every benchmark in a temporary directory and return the results """
+
+    settings = SETTINGS['quick' if quick else 'full']
+    profiles = {'depth' + str(depth): depth for depth in settings['depths'] + [settings['posts']]}
+
+    rates = governor.RATES
+    governor.RATES = {endpoint: (100000, 1, 100000) for endpoint in rates}
+    governor.reset()
+    http_session.close()
+
+    cwd = os.getcwd()
+    fake = FakeInstagram(build_recording(profiles), media_size=settings['media_size']).start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                results = {
+                    'link_grab_http_seconds': bench_link_grab_http(fake, settings['depths']),
+                    'posts_per_second': bench_scrape_posts(fake, settings['posts']),
+                    'download_bytes_per_second': bench_downloads(fake, settings['media_files'],
+                                                                 settings['media_size']),
+                    'database_inserts_per_second': bench_database(settings['rows'])
+                }
+            finally:
+                # The directory can only be removed after it is left
+                os.chdir(cwd)
+    finally:
+        fake.stop()
+        governor.RATES = rates
+        governor.reset()
+        http_session.close()
+
+    return {'commit': get_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+            'settings': settings, 'repeat': REPEAT, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='offline benchmark of igscraper')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes, for a quick check')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    data = run(args.quick)
+    text = json.dumps(data, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
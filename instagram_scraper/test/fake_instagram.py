@@ -0,0 +1,95 @@
+import os
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+RECORDING = os.path.join(os.path.dirname(__file__), 'data', 'fake_instagram.json')
+
+
+class FakeInstagram:
+    """
+    Local HTTP server that serves recorded Instagram JSON and media
+    Every {host} inside the recording is replaced with the url of the server
+    recording is the path of a recording file or a recording dict, media files are media_size bytes when given
+    """
+
+    def __init__(self, recording=RECORDING, media_size=None):
+        if isinstance(recording, dict):
+            self.__recording = recording
+        else:
+            with open(recording, 'r') as file:
+                self.__recording = json.load(file)
+
+        self.__media = b'\0' * media_size if media_size else None
+
+        self.__requests = []
+        self.__httpd = ThreadingHTTPServer(('127.0.0.1', 0), self.__handler())
+        self.__thread = None
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__httpd.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__httpd.shutdown()
+        self.__httpd.server_close()
+
+    @staticmethod
+    def media_content(file_name):
+        """ The bytes that are served for a media file """
+
+        return file_name.encode() * 100
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:' + str(self.__httpd.server_address[1]) + '/'
+
+    @property
+    def requests(self):
+        return self.__requests
+
+    def response(self, path):
+        """ Return the status, content type and body for a request path """
+
+        parsed = urlparse(path)
+
+        if parsed.path.startswith('/media/'):
+            if self.__media is not None:
+                return 200, 'image/jpeg', self.__media
+            return 200, 'image/jpeg', self.media_content(parsed.path.split('/')[-1])
+
+        if parsed.path == '/graphql/query/':
+            query = parse_qs(parsed.query)
+            variables = json.loads(query['variables'][0])
+            key = query['query_hash'][0] + '/' + str(variables.get('after'))
+            data = self.__recording['graphql'].get(key)
+        else:
+            data = self.__recording['pages'].get(path)
+
+        if data is None:
+            return 404, 'text/html', b'<html><body>Page Not Found</body></html>'
+
+        body = json.dumps(data).replace('{host}', self.url.rstrip('/'))
+        return 200, 'application/json', body.encode()
+
+    def __handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                fake.requests.append(self.path)
+                status, content_type, body = fake.response(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
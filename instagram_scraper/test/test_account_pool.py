@@ -0,0 +1,169 @@
+import os
+import json
+import stat
+import threading
+import pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .. import account_pool
+from .. import governor
+from .. import http_session
+from ..account_pool import Account, AccountPool
+from ..session_store import SessionStore
+
+
+def session_cookies(username):
+    return [{'name': 'sessionid', 'value': username, 'domain': '.instagram.com', 'path': '/'}]
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    sessions = []
+    throttled_sessions = []
+
+    def do_GET(self):
+        session = self.headers.get('Cookie', '').replace('sessionid=', '')
+        CookieHandler.sessions.append(session)
+        status = 429 if session in CookieHandler.throttled_sessions else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAccountPool:
+
+    ##############
+    # LEAST USED #
+    ##############
+    def test_least_used_account(self):
+        pool = AccountPool([Account('one'), Account('two')])
+        first = pool.acquire()
+        pool.record(first)
+        pool.record(first)
+        assert pool.acquire().username == 'two'
+
+    def test_equally_used_accounts_take_turns(self):
+        pool = AccountPool([Account('one'), Account('two'), Account('three')])
+        assert [pool.acquire().username for _ in range(4)] == ['one', 'two', 'three', 'one']
+
+    ##########
+    # BUDGET #
+    ##########
+    def test_waits_for_budget(self, monkeypatch):
+        monkeypatch.setattr(account_pool, 'BUDGET_WINDOW', 0.2)
+        pool = AccountPool([Account('one')], budget=1)
+        pool.record(pool.acquire())
+        assert pool.acquire().username == 'one'
+        assert len(pool.accounts[0].requests) == 0
+
+    #################
+    # OUT OF BUDGET #
+    #################
+    def test_out_of_budget(self):
+        pool = AccountPool([Account('one'), Account('two')], budget=2)
+        one = pool.acquire()
+        pool.record(one)
+        assert pool.is_available(one)
+        pool.record(one)
+        assert not pool.is_available(one)
+        assert pool.acquire().username == 'two'
+
+    ############
+    # COOLDOWN #
+    ############
+    def test_throttled_account_cools_down(self):
+        pool = AccountPool([Account('one'), Account('two')], cooldown=60)
+        pool.throttled(pool.accounts[0])
+        assert [pool.acquire().username for _ in range(3)] == ['two', 'two', 'two']
+
+    ########
+    # LOAD #
+    ########
+    def test_load_and_save(self, tmp_path):
+        path = str(tmp_path / 'accounts.json')
+        with open(path, 'w') as file:
+            json.dump([{'username': 'one', 'password': 'secret'},
+                       {'username': 'two', 'cookies': session_cookies('two')}], file)
+
+        pool = account_pool.load(path)
+        assert [account.username for account in pool.accounts] == ['one', 'two']
+        assert pool.accounts[1].cookie_dict() == {'sessionid': 'two'}
+
+        pool.accounts[0].cookies = session_cookies('one')
+        pool.save()
+        assert account_pool.load(path).accounts[0].cookie_dict() == {'sessionid': 'one'}
+
+    def test_save_is_private(self, tmp_path):
+        path = str(tmp_path / 'accounts.json')
+        with open(path, 'w') as file:
+            json.dump([{'username': 'one', 'password': 'secret'}], file)
+        os.chmod(path, 0o644)
+
+        account_pool.load(path).save()
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert os.listdir(tmp_path) == ['accounts.json']
+
+    def test_save_cookies_in_session_store(self, tmp_path):
+        pytest.importorskip('cryptography')
+        path = str(tmp_path / 'accounts.json')
+        with open(path, 'w') as file:
+            json.dump([{'username': 'one', 'password': 'secret', 'cookies': session_cookies('one')}], file)
+
+        store = SessionStore(str(tmp_path / 'sessions'))
+        account_pool.load(path, store).save()
+        with open(path, 'r') as file:
+            assert json.load(file) == [{'username': 'one', 'password': 'secret'}]
+        assert account_pool.load(path, store).accounts[0].cookie_dict() == {'sessionid': 'one'}
+
+    def test_load_invalid(self, tmp_path):
+        path = str(tmp_path / 'accounts.json')
+        with open(path, 'w') as file:
+            json.dump([{'username': 'one'}], file)
+        with pytest.raises(ValueError):
+            account_pool.load(path)
+
+    ################
+    # HTTP SESSION #
+    ################
+    def test_requests_are_spread_over_accounts(self, server):
+        pool = AccountPool([Account('one', cookies=session_cookies('one')),
+                            Account('two', cookies=session_cookies('two'))])
+        http_session.set_account_pool(pool)
+        for _ in range(4):
+            http_session.get_session().get(server + '/info/')
+        assert CookieHandler.sessions == ['one', 'two', 'one', 'two']
+
+    def test_throttled_account_is_replaced(self, server):
+        CookieHandler.throttled_sessions = ['one']
+        pool = AccountPool([Account('one', cookies=session_cookies('one')),
+                            Account('two', cookies=session_cookies('two'))])
+        http_session.set_account_pool(pool)
+        res = http_session.get_session().get(server + '/info/')
+        assert res.status_code == 200
+        assert CookieHandler.sessions == ['one', 'two']
+        assert pool.accounts[0].cooling_until > 0
+
+    ##########
+    # SERVER #
+    ##########
+    @pytest.fixture
+    def server(self, monkeypatch):
+        monkeypatch.setattr(governor, 'RATES', {governor.PAGE: (100, 1, 100), governor.JSON: (100, 1, 100),
+                                                governor.MEDIA: (100, 1, 100)})
+        monkeypatch.setattr(governor, 'BACKOFF_START', 0)
+        governor.reset()
+        http_session.close()
+        CookieHandler.sessions = []
+        CookieHandler.throttled_sessions = []
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), CookieHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield 'http://127.0.0.1:' + str(httpd.server_address[1])
+        http_session.set_account_pool(None)
+        http_session.close()
+        governor.reset()
+        httpd.shutdown()
+        httpd.server_close()
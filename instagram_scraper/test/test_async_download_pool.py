@@ -0,0 +1,215 @@
+import os
+import time
+import asyncio
+import threading
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+
+from .. import governor
+from ..async_download_pool import AsyncDownloadPool
+from ..download_pool import DownloadPool
+
+
+class StubServer:
+    """
+    aiohttp server on its own thread, every file is slow to send so downloads overlap
+    Files have an ETag and Range support, a throttled file is answered with 429 and a cut file is cut off once
+    """
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+        self.statuses = []
+        self.ranges = []
+        self.throttled = set()
+        self.cut = set()
+
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+        self.url = asyncio.run_coroutine_threadsafe(self.__start(), self.__loop).result()
+
+    async def __start(self):
+        app = web.Application()
+        app.router.add_get('/media/{name}', self.__media)
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, '127.0.0.1', 0)
+        await site.start()
+        return 'http://127.0.0.1:' + str(self.__runner.addresses[0][1])
+
+    async def __media(self, request):
+        name = request.match_info['name']
+        if name.startswith('missing'):
+            return self.__respond(web.Response(status=404))
+        if name.startswith('throttled') and name not in self.throttled:
+            self.throttled.add(name)
+            return self.__respond(web.Response(status=429, headers={'Retry-After': '0'}))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return self.__respond(web.Response(status=304))
+
+        self.started.append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+
+        body = name.encode() * 1000
+        start = 0
+        headers = {'ETag': '"v1"'}
+        if request.headers.get('Range') and request.headers.get('If-Range') == '"v1"':
+            start = int(request.headers['Range'].split('=')[1].split('-')[0])
+            headers['Content-Range'] = 'bytes %d-%d/%d' % (start, len(body) - 1, len(body))
+        self.ranges.append(request.headers.get('Range'))
+
+        response = web.StreamResponse(status=206 if start > 0 else 200, headers=headers)
+        response.content_length = len(body) - start
+        await response.prepare(request)
+        self.statuses.append(response.status)
+        if name.startswith('cut') and name not in self.cut:
+            # Send half of the file and drop the connection
+            self.cut.add(name)
+            await response.write(body[start:len(body) // 2])
+            await asyncio.sleep(0.05)
+            request.transport.close()
+            return response
+        await response.write(body[start:])
+        await response.write_eof()
+        return response
+
+    def __respond(self, response):
+        self.statuses.append(response.status)
+        return response
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.__runner.cleanup(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+
+
+class TestAsyncDownloadPool:
+
+    ##################
+    # DOWNLOAD FILES #
+    ##################
+    def test_download_files(self, server, tmp_path):
+        pool = AsyncDownloadPool(50)
+        for i in range(100):
+            pool.submit(server.url + '/media/file' + str(i) + '.jpg', str(tmp_path / 'out'))
+        pool.submit(server.url + '/media/missing.jpg', str(tmp_path / 'out'))
+        pool.wait()
+
+        assert pool.downloaded_count == 100
+        assert pool.pop_failed() == [server.url + '/media/missing.jpg']
+        for i in range(100):
+            with open(tmp_path / 'out' / ('file' + str(i) + '.jpg'), 'rb') as file:
+                assert file.read() == ('file' + str(i) + '.jpg').encode() * 1000
+        assert server.max_in_flight > 4
+        pool.shutdown()
+
+    ##################
+    # PER HOST LIMIT #
+    ##################
+    def test_per_host_limit(self, server, tmp_path):
+        pool = AsyncDownloadPool(50, per_host=3)
+        for i in range(20):
+            pool.submit(server.url + '/media/file' + str(i) + '.jpg', str(tmp_path))
+        pool.shutdown()
+
+        assert pool.downloaded_count == 20
+        assert server.max_in_flight == 3
+
+    ##############
+    # RATE LIMIT #
+    ##############
+    def test_rate_limit(self, server, tmp_path, monkeypatch):
+        # The media rate of the governor is the only rate limit of the downloads
+        monkeypatch.setitem(governor.RATES, governor.MEDIA, (20.0, 1.0, 20.0))
+        governor.reset()
+        pool = AsyncDownloadPool(50)
+        for i in range(30):
+            pool.submit(server.url + '/media/file' + str(i) + '.jpg', str(tmp_path))
+        pool.shutdown()
+
+        # A burst of 20, the other 10 are spread over half a second
+        assert server.started[-1] - server.started[0] >= 0.4
+
+    #####################
+    # NOT MODIFIED FILE #
+    #####################
+    def test_not_modified(self, server, tmp_path):
+        pool = AsyncDownloadPool(4)
+        pool.submit(server.url + '/media/file.jpg', str(tmp_path))
+        pool.wait()
+        pool.submit(server.url + '/media/file.jpg', str(tmp_path))
+        pool.shutdown()
+
+        # The second download only asks if the file changed
+        assert server.statuses == [200, 304]
+        assert pool.downloaded_count == 2
+        with open(tmp_path / 'file.jpg', 'rb') as file:
+            assert file.read() == b'file.jpg' * 1000
+
+    ##########
+    # RESUME #
+    ##########
+    def test_resume(self, server, tmp_path):
+        pool = AsyncDownloadPool(4)
+        pool.submit(server.url + '/media/cut.jpg', str(tmp_path))
+        pool.shutdown()
+
+        # The second request continues the .part file of the first one
+        assert server.ranges == [None, 'bytes=3500-']
+        assert pool.pop_failed() == []
+        with open(tmp_path / 'cut.jpg', 'rb') as file:
+            assert file.read() == b'cut.jpg' * 1000
+        assert not os.path.exists(tmp_path / 'cut.jpg.part')
+
+    #####################
+    # THROTTLED RETRIED #
+    #####################
+    def test_throttled_retried(self, server, tmp_path):
+        pool = AsyncDownloadPool(4)
+        pool.submit(server.url + '/media/throttled.jpg', str(tmp_path))
+        pool.shutdown()
+
+        assert server.statuses == [429, 200]
+        assert pool.pop_failed() == []
+        assert governor.rate(governor.MEDIA) < governor.RATES[governor.MEDIA][0]
+
+    ################
+    # BACKPRESSURE #
+    ################
+    def test_backpressure(self, server, tmp_path):
+        server.delay = 0.2
+        pool = AsyncDownloadPool(2, queue_size=2)
+        start = time.monotonic()
+        for i in range(8):
+            pool.submit(server.url + '/media/file' + str(i) + '.jpg', str(tmp_path))
+            assert pool.queue_depth <= 2
+
+        # Only 2 downloads run and 2 wait, submitting the other files had to wait for them
+        assert time.monotonic() - start >= 0.3
+        pool.shutdown()
+
+    #######################
+    # SAME AS THREAD POOL #
+    #######################
+    def test_same_interface(self):
+        public = [name for name in dir(DownloadPool) if not name.startswith('_')]
+        assert all(hasattr(AsyncDownloadPool, name) for name in public)
+
+    ##########
+    # SERVER #
+    ##########
+    @pytest.fixture
+    def server(self):
+        governor.reset()
+        server = StubServer()
+        yield server
+        server.stop()
+        governor.reset()
@@ -0,0 +1,24 @@
+from . import benchmark
+
+
+class TestBenchmark:
+
+    #############
+    # RECORDING #
+    #############
+    def test_build_recording(self):
+        recording = benchmark.build_recording({'deep': 100})
+        assert len([page for page in recording['pages'] if page.startswith('/p/')]) == 100
+        assert len(recording['graphql']) == 2
+
+    #######
+    # RUN #
+    #######
+    def test_quick_run(self, monkeypatch):
+        monkeypatch.setattr(benchmark, 'REPEAT', 1)
+        monkeypatch.setitem(benchmark.SETTINGS, 'quick', {'depths': [12, 30], 'posts': 3, 'media_files': 2,
+                                                          'media_size': 1024, 'rows': 10})
+        data = benchmark.run(quick=True)
+        assert set(data['results']['link_grab_http_seconds']) == {'12', '30'}
+        assert data['results']['posts_per_second'] > 0
+        assert data['results']['database_inserts_per_second']['batch'] > 0
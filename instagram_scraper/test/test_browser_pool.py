@@ -0,0 +1,124 @@
+import time
+import threading
+import pytest
+
+from .. import actions
+from .. import browser_pool
+from ..browser_pool import BrowserPool, DatabaseCalls
+from ..database import Database
+
+link = 'https://www.instagram.com/p/{}/'
+
+
+class WebDriverStub:
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+class ScraperStub:
+    def __init__(self):
+        self.account_pool = None
+        self.is_logged_in = False
+        self.cookies_accepted = True
+        self.login_username = None
+        self.max_download = 10
+        self.database = Database()
+        self.database.create_tables()
+        self.database.insert_userid_and_username('1', 'fakeuser')
+
+
+class FakeInitScrape:
+    """ Scrapes a post by its shortcode: STOP stops the worker, ERROR raises, SLOW takes a while """
+
+    started = None
+
+    def __init__(self, worker, link, output_path, userid=None):
+        self.__worker = worker
+        self.__link = link
+        self.__userid = userid
+
+    def do(self):
+        FakeInitScrape.started.set()
+        if 'STOP' in self.__link:
+            self.__worker.stop()
+        if 'ERROR' in self.__link:
+            raise ValueError('broken post')
+        if 'SLOW' in self.__link:
+            time.sleep(0.3)
+            return
+
+        # A read goes to the connection of the worker, the write waits for the single writer
+        assert self.__worker.database.user_exists('fakeuser')
+        self.__worker.database.insert_post(self.__link, False, self.__userid)
+
+
+class TestBrowserPool:
+
+    ##########
+    # SCRAPE #
+    ##########
+    def test_one_result_per_link(self, pool, scraper):
+        links = [link.format(shortcode) for shortcode in ['AAA', 'BBB', 'STOP', 'ERROR', 'CCC']]
+        results = dict(pool.scrape(links, 'out', '1'))
+
+        assert results == {link.format('AAA'): True, link.format('BBB'): True, link.format('STOP'): False,
+                           link.format('ERROR'): False, link.format('CCC'): True}
+        assert sorted(scraper.database.get_user_post_links('1')) == \
+            [link.format('AAA'), link.format('BBB'), link.format('CCC')]
+
+    def test_writes_run_on_the_scraper_thread(self, pool, scraper):
+        # The connection of the scraper can only be used by its own thread
+        assert list(pool.scrape([link.format('AAA')], 'out', '1')) == [(link.format('AAA'), True)]
+        assert scraper.database.user_post_link_exists('fakeuser', link.format('AAA'))
+
+    ########
+    # STOP #
+    ########
+    def test_stop_drops_waiting_jobs(self, pool):
+        results = pool.scrape([link.format('SLOW' + str(i)) for i in range(20)], 'out', '1')
+        thread = threading.Thread(target=lambda: next(results), daemon=True)
+        thread.start()
+        assert FakeInitScrape.started.wait(1)
+
+        start = time.monotonic()
+        drivers = [worker.web_driver for worker in pool._BrowserPool__workers]
+        pool.stop()
+        # Only the jobs that were started are finished, not the 20 jobs of 0.3 seconds
+        assert time.monotonic() - start < 2
+        assert all(driver.quit_called for driver in drivers)
+        assert pool.size == 0
+
+    ##################
+    # DATABASE CALLS #
+    ##################
+    def test_database_calls(self, scraper):
+        calls = DatabaseCalls(lambda: scraper.database)
+        calls.insert_post(link.format('AAA'), False, '1')
+        calls.set_user_watermark('1', ['AAA'])
+        assert not scraper.database.user_post_link_exists('fakeuser', link.format('AAA'))
+        assert calls.user_exists('fakeuser')
+
+        calls.execute(scraper.database)
+        assert scraper.database.user_post_link_exists('fakeuser', link.format('AAA'))
+        assert scraper.database.get_user_watermark('fakeuser') == ['AAA']
+
+    ########
+    # POOL #
+    ########
+    @pytest.fixture
+    def scraper(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        scraper = ScraperStub()
+        yield scraper
+        scraper.database.close_connection()
+
+    @pytest.fixture
+    def pool(self, scraper, monkeypatch):
+        FakeInitScrape.started = threading.Event()
+        monkeypatch.setattr(actions, 'InitScrape', FakeInitScrape)
+        pool = BrowserPool(scraper, 3, WebDriverStub)
+        yield pool
+        pool.stop()
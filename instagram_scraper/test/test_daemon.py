@@ -0,0 +1,87 @@
+import sys
+import time
+import pytest
+import requests
+
+from .. import daemon
+from ..daemon import Daemon
+
+
+class FakeScraper:
+    started = 0
+
+    def __init__(self):
+        FakeScraper.started += 1
+        self.jobs = []
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+        sys.exit(0)
+
+
+def run_job(scraper, job):
+    scraper.jobs.append(job)
+    if 'stop' in job.get('users', []):
+        scraper.stop()
+
+
+def wait_for_state(server, job_id, states=(daemon.JOB_DONE, daemon.JOB_FAILED)):
+    for _ in range(100):
+        job = server.get_job(job_id)
+        if job['state'] in states:
+            return job
+        time.sleep(0.02)
+    raise AssertionError('job did not finish')
+
+
+class TestDaemon:
+
+    ########
+    # JOBS #
+    ########
+    def test_jobs_share_one_scraper(self, server):
+        first = server.submit({'users': ['one']})
+        second = server.submit({'top_tags': ['tag']})
+        assert wait_for_state(server, first)['state'] == daemon.JOB_DONE
+        assert wait_for_state(server, second)['state'] == daemon.JOB_DONE
+        assert FakeScraper.started == 1
+
+    def test_stopped_scraper_is_started_again(self, server):
+        failed = server.submit({'users': ['stop']})
+        assert wait_for_state(server, failed)['state'] == daemon.JOB_FAILED
+        done = server.submit({'users': ['one']})
+        assert wait_for_state(server, done)['state'] == daemon.JOB_DONE
+        assert FakeScraper.started == 2
+
+    ############
+    # HTTP API #
+    ############
+    def test_submit_over_http(self, server):
+        port = int(server.address.split(':')[1])
+        job_id = daemon.submit({'users': ['one'], 'max': 3}, port)
+        assert wait_for_state(server, job_id)['job'] == {'users': ['one'], 'max': 3}
+
+        res = requests.get('http://' + server.address + '/jobs/' + str(job_id))
+        assert res.json()['state'] == daemon.JOB_DONE
+        assert requests.get('http://' + server.address + '/jobs/999').status_code == 404
+
+    def test_invalid_job_is_refused(self, server):
+        port = int(server.address.split(':')[1])
+        with pytest.raises(ValueError):
+            daemon.submit({'users': []}, port)
+        with pytest.raises(ValueError):
+            daemon.submit({'users': ['one'], 'max': 0}, port)
+        res = requests.post('http://' + server.address + '/jobs', data='not json')
+        assert res.status_code == 400
+
+    ##########
+    # SERVER #
+    ##########
+    @pytest.fixture
+    def server(self):
+        FakeScraper.started = 0
+        server = Daemon(FakeScraper, run_job, port=0)
+        server.start()
+        yield server
+        server.shutdown()
@@ -0,0 +1,142 @@
+import sqlite3
+import pytest
+
+from ..database import Database, MIGRATIONS
+from .. import constants
+
+link = 'https://www.instagram.com/p/{}/'
+
+
+class TestDatabase:
+
+    ###############
+    # INSERT POST #
+    ###############
+    def test_insert_post(self, database):
+        database.insert_userid_and_username('1234', 'fakeuser')
+        database.insert_post(link.format('AAA'), False)
+        database.insert_post(link.format('AAA'), False, '1234')
+        database.insert_post(link.format('BBB'), True, '1234')
+
+        assert database.get_user_post_links('1234') == [link.format('AAA'), link.format('BBB')]
+        assert database.user_post_link_exists('fakeuser', link.format('AAA'))
+        assert not database.user_post_link_exists('fakeuser', link.format('CCC'))
+        assert database.get_user_post_count('fakeuser') == 2
+
+    ###################
+    # INSERT TAG POST #
+    ###################
+    def test_insert_tag_post(self, database):
+        database.insert_tag('faketag')
+        database.insert_post(link.format('AAA'), False)
+        database.insert_tag_post(link.format('AAA'), 'faketag', in_top=True)
+        database.insert_tag_post(link.format('AAA'), 'faketag', in_top=True)
+        database.insert_tag_post(link.format('BBB'), 'faketag', in_recent=True)
+
+        assert database.get_top_tag_post_count('faketag') == 1
+        assert database.get_recent_tag_post_count('faketag') == 0
+
+    ###############
+    # KNOWN LINKS #
+    ###############
+    def test_known_links(self, database):
+        database.insert_userid_and_username('1234', 'fakeuser')
+        database.insert_tag('faketag')
+        database.insert_post(link.format('AAA'), False, '1234')
+        database.insert_post(link.format('BBB'), False)
+        database.insert_tag_post(link.format('BBB'), 'faketag', in_recent=True)
+        database.insert_tag_post(link.format('BBB'), 'faketag', in_top=True)
+
+        known_user_links = database.get_known_user_links('fakeuser')
+        assert link.format('AAA') in known_user_links
+        assert link.format('BBB') not in known_user_links
+
+        known_top_links = database.get_known_tag_links('faketag', constants.TAG_TYPE_TOP)
+        known_recent_links = database.get_known_tag_links('faketag', constants.TAG_TYPE_RECENT)
+        assert link.format('BBB') in known_top_links
+        assert link.format('BBB') in known_recent_links
+        assert link.format('AAA') not in known_top_links
+
+    #############
+    # WATERMARK #
+    #############
+    def test_watermark(self, database):
+        database.insert_userid_and_username('1234', 'fakeuser')
+        assert database.get_user_watermark('fakeuser') == []
+
+        database.set_user_watermark('1234', ['AAA', 'BBB'])
+        database.set_user_watermark('1234', ['CCC', 'AAA'])
+        assert database.get_user_watermark('fakeuser') == ['CCC', 'AAA']
+
+        database.remove_user('fakeuser')
+        assert database.get_user_watermark('fakeuser') == []
+
+    #########
+    # BATCH #
+    #########
+    def test_batch(self, database):
+        database.insert_userid_and_username('1234', 'fakeuser')
+        with database.batch(size=1000, interval=1000):
+            for i in range(10):
+                database.insert_post(link.format(i), False, '1234')
+            # Reads see the buffered writes
+            assert database.get_user_post_count('fakeuser') == 10
+            database.insert_post(link.format(10), False, '1234')
+
+        other = Database()
+        assert other.get_user_post_count('fakeuser') == 11
+        other.close_connection()
+
+    ##########################
+    # MIGRATE FROM VERSION 1 #
+    ##########################
+    def test_migrate_from_version_1(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        connection = sqlite3.connect(constants.LOCAL_DB)
+        for statement in MIGRATIONS[0]:
+            connection.execute(statement)
+        connection.execute("INSERT INTO user VALUES (1234, 'fakeuser');")
+        connection.execute("INSERT INTO tag VALUES ('t1', 'faketag');")
+        connection.execute("INSERT INTO post VALUES ('p1', :link, 0, NULL);", {'link': link.format('AAA')})
+        connection.execute("INSERT INTO post VALUES ('p2', :link, 0, 1234);", {'link': link.format('AAA')})
+        connection.execute("INSERT INTO tag_post VALUES ('t1', 'p2', 1, 0);")
+        connection.execute("PRAGMA user_version = 1;")
+        connection.commit()
+        connection.close()
+
+        database = Database()
+        database.create_tables()
+        assert database.get_schema_version() == len(MIGRATIONS)
+        assert database.get_user_post_links(1234) == [link.format('AAA')]
+        assert database.get_top_tag_post_count('faketag') == 1
+
+        # Applied migrations are not run again
+        database.create_tables()
+        assert database.get_schema_version() == len(MIGRATIONS)
+        database.close_connection()
+
+    #####################
+    # LOOKUPS USE INDEX #
+    #####################
+    def test_lookups_use_index(self, database):
+        connection = sqlite3.connect(constants.LOCAL_DB)
+        queries = ["SELECT 1 FROM post WHERE link = 'x';",
+                   "SELECT link FROM post WHERE user_id = 1;",
+                   "SELECT id FROM user WHERE username = 'x';",
+                   "SELECT COUNT(*) FROM tag_post WHERE tag_id = 'x' AND in_top = 1;",
+                   "SELECT COUNT(*) FROM tag_post WHERE tag_id = 'x' AND in_recent = 1;"]
+        for query in queries:
+            plan = ' '.join(row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + query))
+            assert 'USING' in plan and 'INDEX' in plan, query
+        connection.close()
+
+    ###########
+    # FIXTURE #
+    ###########
+    @pytest.fixture
+    def database(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        database = Database()
+        database.create_tables()
+        yield database
+        database.close_connection()
@@ -0,0 +1,76 @@
+import os
+import threading
+import pytest
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+
+from ..download_pool import DownloadPool
+from ..journal import Journal
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDownloadPool:
+
+    ##################
+    # DOWNLOAD FILES #
+    ##################
+    def test_download_files(self, server, tmp_path):
+        pool = DownloadPool(3)
+        for i in range(10):
+            pool.submit(server + '/file' + str(i) + '.jpg', str(tmp_path / 'out'))
+        pool.shutdown()
+
+        assert pool.downloaded_count == 10
+        assert pool.pop_failed() == []
+        for i in range(10):
+            with open(tmp_path / 'out' / ('file' + str(i) + '.jpg'), 'rb') as file:
+                assert file.read() == str(i).encode() * 1000
+
+    ################
+    # FAILED FILES #
+    ################
+    def test_failed_files(self, server, tmp_path):
+        pool = DownloadPool(2)
+        pool.submit(server + '/file0.jpg', str(tmp_path))
+        pool.submit(server + '/missing.jpg', str(tmp_path))
+        pool.wait()
+
+        assert pool.pop_failed() == [server + '/missing.jpg']
+        assert pool.pop_failed() == []
+        pool.shutdown()
+
+    ####################
+    # JOURNAL LISTENER #
+    ####################
+    def test_journal_listener(self, server, tmp_path):
+        journal = Journal(str(tmp_path / 'journal.db'))
+        pool = DownloadPool(2)
+        pool.add_listener(journal)
+        pool.submit(server + '/file0.jpg', str(tmp_path), 'a.jpg')
+        pool.submit(server + '/missing.jpg', str(tmp_path), 'b.jpg')
+        pool.shutdown()
+
+        assert journal.get_unfinished_files() == [(server + '/missing.jpg', str(tmp_path), 'b.jpg')]
+        journal.close()
+
+    ##########
+    # SERVER #
+    ##########
+    @pytest.fixture
+    def server(self, tmp_path):
+        served_dir = tmp_path / 'served'
+        os.makedirs(served_dir)
+        for i in range(10):
+            with open(served_dir / ('file' + str(i) + '.jpg'), 'wb') as file:
+                file.write(str(i).encode() * 1000)
+
+        httpd = HTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=str(served_dir)))
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield 'http://127.0.0.1:' + str(httpd.server_address[1])
+        httpd.shutdown()
+        httpd.server_close()
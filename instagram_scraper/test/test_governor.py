@@ -0,0 +1,116 @@
+import threading
+import pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .. import governor
+from .. import http_session
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    throttled = 0
+    requests = 0
+
+    def do_GET(self):
+        ThrottlingHandler.requests += 1
+        if ThrottlingHandler.requests <= ThrottlingHandler.throttled:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestGovernor:
+
+    ##########
+    # PACING #
+    ##########
+    def test_reserve_paces_requests(self, rates):
+        delays = [governor.reserve(governor.JSON) for _ in range(12)]
+        assert delays[:10] == [0] * 10
+        assert delays[10] == pytest.approx(0.1, abs=0.01)
+        assert delays[11] == pytest.approx(0.2, abs=0.01)
+
+    ########
+    # AIMD #
+    ########
+    def test_throttled_halves_rate(self, rates):
+        pause = governor.throttled(governor.JSON, retry_after=5)
+        assert pause == 5
+        assert governor.rate(governor.JSON) == 5
+        assert governor.reserve(governor.JSON) == pytest.approx(5, abs=0.1)
+
+        # Other endpoint classes are not paused
+        assert governor.reserve(governor.MEDIA) == 0
+
+    def test_rate_stays_between_bounds(self, rates):
+        for _ in range(10):
+            governor.throttled(governor.JSON, retry_after=0)
+        assert governor.rate(governor.JSON) == 1
+
+        for _ in range(200):
+            governor.succeeded(governor.JSON)
+        assert governor.rate(governor.JSON) == 20
+
+    def test_backoff_doubles(self, rates):
+        assert governor.throttled(governor.PAGE) == governor.BACKOFF_START
+        assert governor.throttled(governor.PAGE) == governor.BACKOFF_START * 2
+        governor.succeeded(governor.PAGE)
+        assert governor.throttled(governor.PAGE) == governor.BACKOFF_START
+
+    ##################
+    # ENDPOINT CLASS #
+    ##################
+    def test_endpoint_for_url(self):
+        assert governor.endpoint_for_url('https://scontent.cdninstagram.com/v/t51/abc.jpg?x=1') == governor.MEDIA
+        assert governor.endpoint_for_url('https://scontent-ams4-1.xx.fbcdn.net/v/t50/abc') == governor.MEDIA
+        assert governor.endpoint_for_url('https://www.instagram.com/instagram/?__a=1') == governor.JSON
+
+    ####################
+    # GOVERNED SESSION #
+    ####################
+    def test_session_retries_throttled_request(self, rates, server):
+        ThrottlingHandler.throttled = 2
+        res = http_session.get_session().get(server + '/info/')
+        assert res.status_code == 200
+        assert ThrottlingHandler.requests == 3
+        assert governor.rate(governor.JSON) < 10
+
+    def test_session_gives_up_after_retries(self, rates, server):
+        ThrottlingHandler.throttled = http_session.THROTTLED_RETRIES + 1
+        res = http_session.get_session().get(server + '/info/')
+        assert res.status_code == 429
+        assert ThrottlingHandler.requests == http_session.THROTTLED_RETRIES + 1
+
+    ##########
+    # SERVER #
+    ##########
+    @pytest.fixture
+    def rates(self, monkeypatch):
+        monkeypatch.setattr(governor, 'RATES', {governor.PAGE: (10, 1, 20), governor.JSON: (10, 1, 20),
+                                                governor.MEDIA: (10, 1, 20)})
+        governor.reset()
+        yield
+        governor.reset()
+
+    @pytest.fixture
+    def server(self):
+        http_session.close()
+        ThrottlingHandler.requests = 0
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield 'http://127.0.0.1:' + str(httpd.server_address[1])
+        http_session.close()
+        httpd.shutdown()
+        httpd.server_close()
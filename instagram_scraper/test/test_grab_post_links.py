@@ -0,0 +1,100 @@
+from selenium.common.exceptions import NoSuchElementException
+
+from ..actions import GrabPostLinks
+from ..actions.grab_post_links import GRAB_NEW_LINKS_SCRIPT
+from ..known_links import KnownLinks
+from .. import constants
+
+link = 'https://www.instagram.com/p/{}/'
+profile_link = 'https://www.instagram.com/fakeuser/'
+
+
+class ScrollingDriver:
+    """ Serves one page of new links per scroll, like the page script does """
+
+    def __init__(self, pages):
+        self.current_url = profile_link
+        self.__pages = pages
+        self.__scrolls = 0
+        self.grab_calls = 0
+
+    def execute_script(self, script, *args):
+        if script == GRAB_NEW_LINKS_SCRIPT:
+            self.grab_calls += 1
+            return self.__pages[self.__scrolls] if self.__scrolls < len(self.__pages) else []
+        if script.startswith('window.scrollTo'):
+            self.__scrolls += 1
+        return self.__scrolls
+
+    def find_elements_by_css_selector(self, css_selector):
+        return []
+
+    def find_element_by_css_selector(self, css_selector):
+        if css_selector == constants.SCROLL_LOAD_CSS and self.__scrolls < len(self.__pages):
+            return object()
+        raise NoSuchElementException()
+
+    def get_window_size(self):
+        return {'width': 1000, 'height': 1000}
+
+    def set_window_size(self, width, height):
+        pass
+
+    def maximize_window(self):
+        pass
+
+
+class ScraperStub:
+    def __init__(self, web_driver, max_download):
+        self.web_driver = web_driver
+        self.max_download = max_download
+        self.cookies_accepted = True
+
+
+class TestGrabPostLinks:
+
+    ##################
+    # GRAB ALL LINKS #
+    ##################
+    def test_grab_all_links(self):
+        pages = [[link.format(page * 12 + i) for i in range(12)] for page in range(1000)]
+        # A link that is seen again on a later page is kept once
+        pages[1].append(link.format(0))
+        web_driver = ScrollingDriver(pages)
+        post_links = GrabPostLinks(ScraperStub(web_driver, 20000), profile_link).do()
+        assert post_links == [link.format(i) for i in range(12000)]
+        assert web_driver.grab_calls == 1001
+
+    ###########
+    # MAXIMUM #
+    ###########
+    def test_maximum(self):
+        pages = [[link.format(page * 12 + i) for i in range(12)] for page in range(10)]
+        post_links = GrabPostLinks(ScraperStub(ScrollingDriver(pages), 30), profile_link).do()
+        assert post_links == [link.format(i) for i in range(30)]
+
+    #######################
+    # STOP AT KNOWN LINKS #
+    #######################
+    def test_stop_at_known_links(self):
+        pages = [[link.format(page * 12 + i) for i in range(12)] for page in range(100)]
+        known = KnownLinks([link.format(i) for i in range(12, 1200)], 1188)
+        known.stop_at_known_run = known.covers(1000)
+        web_driver = ScrollingDriver(pages)
+
+        post_links = GrabPostLinks(ScraperStub(web_driver, 1000), profile_link, known_links=known).do()
+        assert known.filter_new(post_links) == [link.format(i) for i in range(12)]
+        assert web_driver.grab_calls < 10
+
+    ###################
+    # RAISE MAX LATER #
+    ###################
+    def test_raise_max_later(self):
+        # The previous run with --max 50 stored the 50 newest posts, this run asks for 200
+        pages = [[link.format(page * 12 + i) for i in range(12)] for page in range(100)]
+        known = KnownLinks([link.format(i) for i in range(50)], 50)
+        known.stop_at_known_run = known.covers(200)
+        web_driver = ScrollingDriver(pages)
+
+        post_links = GrabPostLinks(ScraperStub(web_driver, 200), profile_link, known_links=known).do()
+        assert known.filter_new(post_links) == [link.format(i) for i in range(50, 200)]
@@ -0,0 +1,182 @@
+import os
+import pytest
+
+from .fake_instagram import FakeInstagram
+from ..engines import HttpEngine
+from ..database import Database
+from ..download_pool import DownloadPool
+from ..post_recorder import PostRecorder
+from ..daemon import Daemon
+from ..models.user import User
+from ..models.tag import Tag
+from .. import constants
+from .. import daemon
+from .. import known_links
+from .. import retriever
+from .test_daemon import wait_for_state
+
+
+class ScraperStub:
+    def __init__(self, max_download):
+        self.max_download = max_download
+        self.database = Database()
+        self.database.create_tables()
+        self.download_pool = DownloadPool(2)
+        self.post_recorder = PostRecorder()
+        self.download_pool.add_listener(self.post_recorder)
+
+    def stop(self):
+        pass
+
+    def record_posts(self):
+        self.download_pool.wait()
+        for row in self.post_recorder.pop_recorded():
+            self.database.insert_post(*row)
+
+
+class TestHttpEngine:
+
+    ################
+    # USER PROFILE #
+    ################
+    def test_user_profile(self, engine):
+        user = User('fakeuser')
+        assert engine.get_user_id(user) == '1234567'
+        assert not engine.is_private(user)
+        assert engine.has_posts(user)
+        assert engine.is_private(User('privateuser'))
+        assert engine.get_user_id(User('nobody')) is None
+
+    ##########################
+    # PROFILE IS LOADED ONCE #
+    ##########################
+    def test_profile_loaded_once(self, engine, fake_instagram):
+        user = User('fakeuser')
+        engine.get_user_id(user)
+        engine.is_private(user)
+        engine.has_posts(user)
+        assert fake_instagram.requests.count('/fakeuser/?__a=1') == 1
+
+    ######################
+    # USER POST PAGINATE #
+    ######################
+    def test_user_post_links(self, engine):
+        links = engine.grab_user_post_links(User('fakeuser'))
+        shortcodes = ['AAA111', 'BBB222', 'CCC333', 'DDD444', 'EEE555']
+        assert links == [constants.INSTAGRAM_URL + 'p/' + shortcode + '/' for shortcode in shortcodes]
+
+    ############################
+    # USER POST LINKS WITH MAX #
+    ############################
+    def test_user_post_links_max(self, fake_instagram, scraper_stub):
+        scraper_stub.max_download = 2
+        engine = HttpEngine(scraper_stub, fake_instagram.url)
+        assert len(engine.grab_user_post_links(User('fakeuser'))) == 2
+        assert not any(path.startswith('/graphql') for path in fake_instagram.requests)
+
+    ###################
+    # TWO DAEMON JOBS #
+    ###################
+    def test_two_daemon_jobs(self, engine, scraper_stub, fake_instagram):
+        grabbed = []
+
+        def run_job(scraper, job):
+            # The daemon sets the maximum of every job, a scrape of users starts with a reset engine
+            scraper.max_download = job['max']
+            engine.reset()
+            grabbed.append(engine.grab_user_post_links(User(job['users'][0])))
+
+        server = Daemon(lambda: scraper_stub, run_job, port=0)
+        server.start()
+        try:
+            for max_download in [2, 3]:
+                job_id = server.submit({'users': ['fakeuser'], 'max': max_download})
+                assert wait_for_state(server, job_id)['state'] == daemon.JOB_DONE
+        finally:
+            server.shutdown()
+
+        assert [len(links) for links in grabbed] == [2, 3]
+        # The profile is requested again for the second job, the user may have posted in between
+        assert fake_instagram.requests.count('/fakeuser/?__a=1') == 2
+
+    #################################
+    # USER POST LINKS STOP AT KNOWN #
+    #################################
+    def test_user_post_links_stop_at_known(self, engine, scraper_stub, fake_instagram, monkeypatch):
+        monkeypatch.setattr(known_links, 'KNOWN_RUN', 2)
+        scraper_stub.database.insert_userid_and_username('1234567', 'fakeuser')
+        for shortcode in ['BBB222', 'CCC333']:
+            scraper_stub.database.insert_post(constants.INSTAGRAM_URL + 'p/' + shortcode + '/', False, '1234567')
+
+        known = scraper_stub.database.get_known_user_links('fakeuser')
+        known.stop_at_known_run = True
+        links = engine.grab_user_post_links(User('fakeuser'), known)
+        assert known.filter_new(links) == [constants.INSTAGRAM_URL + 'p/AAA111/']
+        assert not any(path.startswith('/graphql') for path in fake_instagram.requests)
+
+    #####################################
+    # USER POST LINKS STOP AT WATERMARK #
+    #####################################
+    def test_user_post_links_stop_at_watermark(self, engine, scraper_stub, fake_instagram, monkeypatch):
+        monkeypatch.setattr(known_links, 'PINNED_POSTS', 1)
+        scraper_stub.database.insert_userid_and_username('1234567', 'fakeuser')
+        scraper_stub.database.set_user_watermark('1234567', ['BBB222'])
+
+        known = scraper_stub.database.get_known_user_links('fakeuser')
+        known.watermark = scraper_stub.database.get_user_watermark('fakeuser')
+        engine.grab_user_post_links(User('fakeuser'), known)
+        assert not any(path.startswith('/graphql') for path in fake_instagram.requests)
+
+    #############
+    # TAG LINKS #
+    #############
+    def test_tag_links(self, engine):
+        tag = Tag('faketag')
+        top = engine.grab_tag_post_links(tag, constants.TAG_TYPE_TOP)
+        recent = engine.grab_tag_post_links(tag, constants.TAG_TYPE_RECENT)
+        assert top == [constants.INSTAGRAM_URL + 'p/' + shortcode + '/' for shortcode in ['DDD444', 'AAA111']]
+        assert recent == [constants.INSTAGRAM_URL + 'p/' + shortcode + '/'
+                          for shortcode in ['FFF666', 'EEE555', 'DDD444', 'AAA111']]
+
+    ###############
+    # SCRAPE POST #
+    ###############
+    def test_scrape_post(self, engine, scraper_stub, tmp_path):
+        scraper_stub.database.insert_userid_and_username('1234567', 'fakeuser')
+        output_path = str(tmp_path / 'posts')
+        assert engine.scrape_post(constants.INSTAGRAM_URL + 'p/BBB222/', output_path, '1234567')
+        assert engine.scrape_post(constants.INSTAGRAM_URL + 'p/CCC333/', output_path, '1234567')
+        assert not engine.scrape_post(constants.INSTAGRAM_URL + 'p/ZZZ999/', output_path, '1234567')
+        scraper_stub.record_posts()
+
+        files = [name for name in os.listdir(output_path) if name != retriever.CACHE_FILE_NAME]
+        assert sorted(files) == ['2020_09_13_12_31_40-333_c1_n.jpg',
+                                 '2020_09_13_12_31_40-333_c2_n.mp4',
+                                 '2020_09_13_12_33_20-222_b_n.mp4']
+        with open(os.path.join(output_path, '2020_09_13_12_33_20-222_b_n.mp4'), 'rb') as file:
+            assert file.read() == FakeInstagram.media_content('222_b_n.mp4')
+
+        assert scraper_stub.database.user_post_link_exists('fakeuser', constants.INSTAGRAM_URL + 'p/BBB222/')
+        assert scraper_stub.database.user_post_link_exists('fakeuser', constants.INSTAGRAM_URL + 'p/CCC333/')
+        assert not scraper_stub.database.user_post_link_exists('fakeuser', constants.INSTAGRAM_URL + 'p/ZZZ999/')
+
+    ###########
+    # FIXTURE #
+    ###########
+    @pytest.fixture
+    def fake_instagram(self):
+        fake_instagram = FakeInstagram().start()
+        yield fake_instagram
+        fake_instagram.stop()
+
+    @pytest.fixture
+    def scraper_stub(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        scraper_stub = ScraperStub(max_download=10)
+        yield scraper_stub
+        scraper_stub.download_pool.shutdown()
+        scraper_stub.database.close_connection()
+
+    @pytest.fixture
+    def engine(self, fake_instagram, scraper_stub):
+        return HttpEngine(scraper_stub, fake_instagram.url)
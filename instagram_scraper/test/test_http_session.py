@@ -0,0 +1,66 @@
+import threading
+import pytest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from .. import http_session
+from .. import retriever
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        CountingHandler.connections += 1
+
+    def do_GET(self):
+        body = b'x' * 100
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpSession:
+
+    ##################
+    # SHARED SESSION #
+    ##################
+    def test_shared_session(self):
+        assert http_session.get_session() is http_session.get_session()
+
+    #############
+    # CONFIGURE #
+    #############
+    def test_configure_pool_maxsize(self):
+        http_session.configure(pool_maxsize=32)
+        adapter = http_session.get_session().get_adapter('https://www.instagram.com/')
+        assert adapter._pool_maxsize == 32
+        http_session.configure(pool_maxsize=http_session.POOL_MAXSIZE)
+
+    ##############
+    # KEEP-ALIVE #
+    ##############
+    def test_connection_is_reused(self, server, tmp_path):
+        for i in range(5):
+            retriever.download(server + '/file' + str(i) + '.jpg', str(tmp_path))
+        assert CountingHandler.connections == 1
+
+    ##########
+    # SERVER #
+    ##########
+    @pytest.fixture
+    def server(self):
+        http_session.close()
+        CountingHandler.connections = 0
+        httpd = HTTPServer(('127.0.0.1', 0), CountingHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield 'http://127.0.0.1:' + str(httpd.server_address[1])
+        http_session.close()
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,94 @@
+import json
+import time
+import pytest
+
+from .. import actions
+from .. import instrumentation
+
+
+class SleepAction(actions.Action):
+    def __init__(self):
+        self._scraper = None
+        self._web_driver = None
+
+    def do(self):
+        time.sleep(0.01)
+        return 'done'
+
+    def on_fail(self):
+        pass
+
+
+class TestInstrumentation:
+
+    #########
+    # SPANS #
+    #########
+    def test_span(self, enabled):
+        for _ in range(3):
+            with instrumentation.span('block'):
+                time.sleep(0.01)
+        span = instrumentation.summary()['spans']['block']
+        assert span['count'] == 3
+        assert span['p50'] >= 0.01
+        assert span['total'] >= 0.03
+
+    def test_disabled_span_is_not_recorded(self):
+        instrumentation.disable()
+        instrumentation.reset()
+        with instrumentation.span('block'):
+            pass
+        instrumentation.count('things')
+        assert 'block' not in instrumentation.summary()['spans']
+        assert 'things' not in instrumentation.summary()['counters']
+
+    def test_action_is_measured(self, enabled):
+        assert SleepAction().do() == 'done'
+        assert instrumentation.summary()['spans']['action.SleepAction']['count'] == 1
+
+    ############
+    # COUNTERS #
+    ############
+    def test_counters_and_rates(self, enabled):
+        instrumentation.count(instrumentation.POSTS_COUNTER)
+        instrumentation.count(instrumentation.BYTES_COUNTER, 1000)
+        instrumentation.record(instrumentation.DOWNLOAD_SPAN, 0, 2)
+        data = instrumentation.summary()
+        assert data['counters'][instrumentation.BYTES_COUNTER] == 1000
+        assert data['rates']['bytes_per_second_per_download'] == 500
+        assert data['rates']['posts_per_minute'] > 0
+
+    ##############
+    # PERCENTILE #
+    ##############
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert instrumentation.percentile(values, 50) == 50
+        assert instrumentation.percentile(values, 95) == 95
+        assert instrumentation.percentile([7], 95) == 7
+
+    #########
+    # TRACE #
+    #########
+    def test_trace(self, tmp_path, capsys):
+        path = str(tmp_path / 'trace.json')
+        instrumentation.enable(path)
+        with instrumentation.span('block'):
+            pass
+        instrumentation.finish()
+        instrumentation.disable()
+
+        assert 'block' in capsys.readouterr().out
+        with open(path) as file:
+            trace = json.load(file)
+        assert trace['spans'][0]['name'] == 'block'
+        assert trace['summary']['spans']['block']['count'] == 1
+
+    ###########
+    # ENABLED #
+    ###########
+    @pytest.fixture
+    def enabled(self):
+        instrumentation.enable()
+        yield
+        instrumentation.disable()
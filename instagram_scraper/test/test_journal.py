@@ -0,0 +1,76 @@
+import pytest
+
+from .. import journal
+from ..journal import Journal
+from .. import constants
+
+link = 'https://www.instagram.com/p/{}/'
+
+
+class TestJournal:
+
+    #################
+    # PENDING LINKS #
+    #################
+    def test_pending_links(self, run):
+        key = journal.owner_key(journal.OWNER_USER, 'fakeuser')
+        run.plan(journal.OWNER_USER, ['fakeuser'])
+        assert run.get_pending_links(key) is None
+
+        run.add_links(key, [link.format('AAA'), link.format('BBB'), link.format('CCC')])
+        run.set_link_state(key, link.format('AAA'), journal.STATE_RESOLVED)
+        run.set_link_state(key, link.format('BBB'), journal.STATE_FAILED)
+        assert run.get_pending_links(key) == [link.format('BBB'), link.format('CCC')]
+
+    ########################
+    # RESUME AFTER A CRASH #
+    ########################
+    def test_resume_after_crash(self, run, tmp_path):
+        run.plan(journal.OWNER_USER, ['fakeuser', 'otheruser'])
+        run.plan(journal.OWNER_TAG, ['faketag'], constants.TAG_TYPE_RECENT)
+        key = journal.owner_key(journal.OWNER_USER, 'fakeuser')
+        run.add_links(key, [link.format('AAA'), link.format('BBB')])
+        run.set_link_state(key, link.format('AAA'), journal.STATE_RESOLVED)
+        run.file_queued('https://cdn/a.jpg', 'users/fakeuser/posts', 'a.jpg')
+        run.file_queued('https://cdn/b.jpg', 'users/fakeuser/posts', 'b.jpg')
+        run.file_done('https://cdn/a.jpg', 'users/fakeuser/posts', 'a.jpg', True)
+        # The process dies here, the journal is not closed
+
+        resumed = Journal(str(tmp_path / 'journal.db'))
+        assert resumed.get_unfinished_owners() == [(journal.OWNER_USER, 'fakeuser', None),
+                                                   (journal.OWNER_USER, 'otheruser', None),
+                                                   (journal.OWNER_TAG, 'faketag', constants.TAG_TYPE_RECENT)]
+        assert resumed.get_pending_links(key) == [link.format('BBB')]
+        assert resumed.get_unfinished_files() == [('https://cdn/b.jpg', 'users/fakeuser/posts', 'b.jpg')]
+        resumed.close()
+
+    ################
+    # FINISH OWNER #
+    ################
+    def test_finish_owner(self, run):
+        run.plan(journal.OWNER_USER, ['fakeuser', 'otheruser'])
+        key = journal.owner_key(journal.OWNER_USER, 'fakeuser')
+        other_key = journal.owner_key(journal.OWNER_USER, 'otheruser')
+        run.add_links(key, [link.format('AAA')])
+        run.add_links(other_key, [link.format('BBB')])
+        run.set_link_state(key, link.format('AAA'), journal.STATE_RESOLVED)
+        run.set_link_state(other_key, link.format('BBB'), journal.STATE_FAILED)
+
+        run.finish_owner(key)
+        run.finish_owner(other_key)
+
+        # Only the user with a failed post is kept
+        assert run.get_unfinished_owners() == [(journal.OWNER_USER, 'otheruser', None)]
+        assert run.get_pending_links(other_key) == [link.format('BBB')]
+
+        run.clear()
+        assert run.get_unfinished_owners() == []
+
+    ###########
+    # FIXTURE #
+    ###########
+    @pytest.fixture
+    def run(self, tmp_path):
+        run = Journal(str(tmp_path / 'journal.db'))
+        yield run
+        run.close()
@@ -0,0 +1,81 @@
+import pytest
+
+from .. import governor
+from ..actions import GetUserId, GetVidSrcUrl
+
+
+class SwitchTo:
+    def window(self, handle):
+        pass
+
+
+class TabDriver:
+    """ Opens the JSON page in a second tab, page_source is what Instagram answers """
+
+    def __init__(self, page_source):
+        self.page_source = page_source
+        self.window_handles = ['first']
+        self.current_window_handle = 'first'
+        self.switch_to = SwitchTo()
+        self.opened = []
+
+    def execute_script(self, script, *args):
+        if script.startswith('window.open'):
+            self.opened.append(script)
+            self.window_handles = ['first', 'second']
+            return None
+        return 'complete'
+
+    def close(self):
+        self.window_handles = ['first']
+
+
+class ScraperStub:
+    def __init__(self, web_driver):
+        self.web_driver = web_driver
+
+
+class TestJsonTabs:
+
+    ##########################
+    # JSON PAGE TAKES A TURN #
+    ##########################
+    def test_json_page_takes_a_turn(self, monkeypatch):
+        turns = []
+        monkeypatch.setattr(governor, 'acquire', turns.append)
+        web_driver = TabDriver('<html><body>{"graphql": {"user": {"id": "1234"}}}</body></html>')
+
+        assert GetUserId(ScraperStub(web_driver), 'fakeuser').do() == '1234'
+        assert turns == [governor.JSON]
+        assert len(web_driver.opened) == 1
+
+    #######################
+    # HTML PAGE THROTTLES #
+    #######################
+    def test_html_page_throttles(self, monkeypatch):
+        throttled = []
+        monkeypatch.setattr(governor, 'acquire', lambda endpoint: None)
+        monkeypatch.setattr(governor, 'throttled', lambda endpoint, retry_after=None: throttled.append(endpoint))
+        web_driver = TabDriver('<html><body><h1>Please wait a few minutes</h1></body></html>')
+
+        assert GetVidSrcUrl(ScraperStub(web_driver), 'AAA', False).do() is None
+        assert throttled == [governor.JSON]
+
+    ###############
+    # MISSING KEY #
+    ###############
+    def test_missing_key_does_not_throttle(self, monkeypatch):
+        monkeypatch.setattr(governor, 'acquire', lambda endpoint: None)
+        monkeypatch.setattr(governor, 'throttled', pytest.fail)
+        web_driver = TabDriver('<html><body>{"graphql": {"shortcode_media": {}}}</body></html>')
+
+        assert GetVidSrcUrl(ScraperStub(web_driver), 'AAA', False).do() is None
+
+    ############
+    # GOVERNOR #
+    ############
+    @pytest.fixture(autouse=True)
+    def fresh_governor(self):
+        governor.reset()
+        yield
+        governor.reset()
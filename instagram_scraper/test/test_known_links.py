@@ -0,0 +1,96 @@
+import pytest
+
+from .. import known_links
+from ..known_links import KnownLinks, BloomFilter
+
+link = 'https://www.instagram.com/p/{}/'
+
+
+class TestKnownLinks:
+
+    ##############
+    # MEMBERSHIP #
+    ##############
+    def test_membership(self):
+        known = KnownLinks([link.format('AAA'), link.format('BBB')], 2)
+        assert link.format('AAA') in known
+        assert 'https://www.instagram.com/p/BBB' in known
+        assert link.format('CCC') not in known
+        assert not known.uses_bloom_filter
+
+    ##############
+    # FILTER NEW #
+    ##############
+    def test_filter_new(self):
+        known = KnownLinks([link.format('BBB')], 1)
+        links = [link.format('CCC'), link.format('BBB'), link.format('AAA')]
+        assert known.filter_new(links) == [link.format('CCC'), link.format('AAA')]
+
+    ##################
+    # KNOWN LINK RUN #
+    ##################
+    def test_ends_with_known_run(self, monkeypatch):
+        monkeypatch.setattr(known_links, 'KNOWN_RUN', 2)
+        known = KnownLinks([link.format('BBB'), link.format('CCC')], 2)
+        assert not known.ends_with_known_run([link.format('BBB')])
+        assert not known.ends_with_known_run([link.format('BBB'), link.format('AAA')])
+        assert known.ends_with_known_run([link.format('AAA'), link.format('BBB'), link.format('CCC')])
+
+    ##################################
+    # KNOWN LINK RUN STOPS WHEN DEEP #
+    ##################################
+    def test_known_run_stops_when_deep(self, monkeypatch):
+        monkeypatch.setattr(known_links, 'KNOWN_RUN', 2)
+        known = KnownLinks([link.format('AAA'), link.format('BBB')], 2)
+        links = [link.format('CCC'), link.format('AAA'), link.format('BBB')]
+
+        # Posts older than the known posts may never have been grabbed by a run with a lower maximum
+        assert not known.stop_grabbing(links)
+        assert not known.covers(3)
+        assert not known.covers(0)
+        assert known.covers(2)
+
+        known.stop_at_known_run = True
+        assert known.stop_grabbing(links)
+
+    #############
+    # WATERMARK #
+    #############
+    def test_watermark(self, monkeypatch):
+        monkeypatch.setattr(known_links, 'PINNED_POSTS', 1)
+        known = KnownLinks([], 0)
+        known.watermark = ['BBB', 'CCC']
+
+        # A pinned watermark post does not stop grabbing
+        assert not known.stop_grabbing([link.format('CCC'), link.format('AAA')])
+        assert known.stop_grabbing([link.format('CCC'), link.format('AAA'), link.format('BBB')])
+
+    ################
+    # BLOOM FILTER #
+    ################
+    def test_bloom_filter(self):
+        bloom_filter = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom_filter.add(str(i))
+
+        assert all(str(i) in bloom_filter for i in range(1000))
+        false_positives = sum(str(i) in bloom_filter for i in range(1000, 11000))
+        assert false_positives < 300
+        assert bloom_filter.size < 10000
+
+    ###############################
+    # BLOOM FILTER HITS CONFIRMED #
+    ###############################
+    def test_bloom_filter_confirmed(self, monkeypatch):
+        monkeypatch.setattr(known_links, 'BLOOM_THRESHOLD', 1)
+        confirmed = []
+
+        def confirm(checked_link):
+            confirmed.append(checked_link)
+            return checked_link == link.format('AAA')
+
+        known = KnownLinks([link.format('AAA'), link.format('BBB')], 2, confirm)
+        assert known.uses_bloom_filter
+        assert link.format('AAA') in known
+        assert link.format('BBB') not in known
+        assert confirmed == [link.format('AAA'), link.format('BBB')]
@@ -0,0 +1,69 @@
+import os
+import pytest
+
+from .fake_instagram import FakeInstagram
+from ..media_store import MediaStore
+from .. import media_store
+from ..database import Database
+from ..download_pool import DownloadPool
+
+
+class TestMediaStore:
+
+    #####################
+    # BLOB WRITTEN ONCE #
+    #####################
+    def test_blob_written_once(self, fake_instagram, store):
+        url = fake_instagram.url + 'media/111_a_n.jpg'
+        pool = DownloadPool(2, store=store)
+        pool.submit(url, 'users/fakeuser/posts', '2020-111_a_n.jpg')
+        pool.submit(url, 'tags/faketag/top', '2020-111_a_n.jpg')
+        pool.submit(url, 'tags/faketag/recent', '2020-111_a_n.jpg')
+        pool.shutdown()
+
+        assert fake_instagram.requests.count('/media/111_a_n.jpg') == 1
+        blob = os.stat(store.blob_path('111_a_n.jpg'))
+        assert blob.st_nlink == 4
+        for directory in ['users/fakeuser/posts', 'tags/faketag/top', 'tags/faketag/recent']:
+            with open(directory + '/2020-111_a_n.jpg', 'rb') as file:
+                assert file.read() == FakeInstagram.media_content('111_a_n.jpg')
+
+    ###########
+    # RELEASE #
+    ###########
+    def test_release(self, fake_instagram, store, database):
+        store.download(fake_instagram.url + 'media/111_a_n.jpg', 'users/fake_user/posts')
+        store.download(fake_instagram.url + 'media/111_a_n.jpg', 'users/fakeXuser/posts')
+        store.download(fake_instagram.url + 'media/222_b_n.jpg', 'users/fake_user/posts')
+
+        media_store.release(database, 'users/fake_user')
+        assert database.get_blob_ref_count('111_a_n.jpg') == 1
+        assert os.path.isfile(store.blob_path('111_a_n.jpg'))
+        assert not os.path.isfile(store.blob_path('222_b_n.jpg'))
+
+        media_store.release(database, 'users/fakeXuser')
+        assert not os.path.isfile(store.blob_path('111_a_n.jpg'))
+        assert database.get_unreferenced_blobs() == []
+
+    ###########
+    # FIXTURE #
+    ###########
+    @pytest.fixture
+    def fake_instagram(self):
+        fake_instagram = FakeInstagram().start()
+        yield fake_instagram
+        fake_instagram.stop()
+
+    @pytest.fixture
+    def database(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        database = Database()
+        database.create_tables()
+        yield database
+        database.close_connection()
+
+    @pytest.fixture
+    def store(self, database):
+        store = MediaStore()
+        yield store
+        store.close()
@@ -0,0 +1,72 @@
+import pytest
+import requests
+
+from .. import metrics
+from .. import governor
+from .. import instrumentation
+from ..metrics import MetricsExporter
+
+
+class TestMetrics:
+
+    ############
+    # ENDPOINT #
+    ############
+    def test_scrape_endpoint(self, exporter):
+        instrumentation.count(instrumentation.POSTS_COUNTER)
+        instrumentation.count(instrumentation.BYTES_COUNTER, 2048)
+        instrumentation.count('throttled.' + governor.JSON)
+        with instrumentation.span('database.write'):
+            pass
+
+        res = requests.get('http://127.0.0.1:' + str(exporter.port) + '/metrics')
+        assert res.status_code == 200
+        assert res.headers['Content-Type'].startswith('application/openmetrics-text')
+        lines = res.text.splitlines()
+        assert 'igscraper_posts_total 1' in lines
+        assert 'igscraper_download_bytes_total 2048' in lines
+        assert 'igscraper_throttled_json_total 1' in lines
+        assert 'igscraper_span_seconds_count{span="database.write"} 1' in lines
+        assert 'igscraper_span_seconds_bucket{span="database.write",le="+Inf"} 1' in lines
+        assert 'igscraper_queue_depth 3' in lines
+        assert 'igscraper_governor_rate{endpoint="json"} %s' % metrics.format_value(governor.rate(governor.JSON)) \
+               in lines
+        assert lines[-1] == '# EOF'
+
+    def test_unknown_path(self, exporter):
+        assert requests.get('http://127.0.0.1:' + str(exporter.port) + '/other').status_code == 404
+
+    #############
+    # HISTOGRAM #
+    #############
+    def test_buckets_are_cumulative(self):
+        exporter = MetricsExporter(0).start()
+        exporter.span_recorded('page_load', 0.2)
+        exporter.span_recorded('page_load', 3)
+        text = exporter.render()
+        exporter.shutdown()
+        assert 'igscraper_span_seconds_bucket{span="page_load",le="0.1"} 0' in text
+        assert 'igscraper_span_seconds_bucket{span="page_load",le="0.25"} 1' in text
+        assert 'igscraper_span_seconds_bucket{span="page_load",le="5.0"} 2' in text
+        assert 'igscraper_span_seconds_sum{span="page_load"} 3.2' in text
+
+    def test_failing_gauge_is_left_out(self):
+        exporter = MetricsExporter(0).start()
+        exporter.add_gauge('broken', lambda: 1 / 0)
+        text = exporter.render()
+        exporter.shutdown()
+        assert 'broken' not in text
+
+    ############
+    # EXPORTER #
+    ############
+    @pytest.fixture
+    def exporter(self):
+        instrumentation.disable()
+        exporter = MetricsExporter(0).start()
+        exporter.add_gauge('queue_depth', lambda: 3)
+        exporter.add_gauge('governor.rate', governor.rates, label='endpoint')
+        instrumentation.add_listener(exporter)
+        yield exporter
+        instrumentation.remove_listener(exporter)
+        exporter.shutdown()
@@ -0,0 +1,73 @@
+import json
+import base64
+
+from selenium.common.exceptions import WebDriverException
+
+from .. import network_capture
+from .. import helper
+
+media = {'shortcode': 'CCC333', 'taken_at_timestamp': 1600000300,
+         'edge_sidecar_to_children': {'edges': [
+             {'node': {'is_video': False, 'display_url': 'https://cdn/333_c1_n.jpg'}},
+             {'node': {'is_video': True, 'display_url': 'https://cdn/333_c2.jpg',
+                       'video_url': 'https://cdn/333_c2_n.mp4'}}]}}
+
+
+class RecordingDriver:
+    """ Returns the recorded network events and response bodies once, like Chrome does """
+
+    def __init__(self, responses):
+        self.__log = []
+        self.__bodies = {}
+        for request_id, (mime_type, body) in enumerate(responses):
+            message = {'message': {'method': 'Network.responseReceived',
+                                   'params': {'requestId': str(request_id),
+                                              'response': {'mimeType': mime_type}}}}
+            self.__log.append({'message': json.dumps(message)})
+            self.__bodies[str(request_id)] = body
+
+    def get_log(self, log_type):
+        assert log_type == 'performance'
+        log = self.__log
+        self.__log = []
+        return log
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        assert cmd == 'Network.getResponseBody'
+        body = self.__bodies.get(cmd_args['requestId'])
+        if body is None:
+            raise WebDriverException('No resource with given identifier found')
+        return body
+
+
+class TestNetworkCapture:
+
+    ##################
+    # GET POST MEDIA #
+    ##################
+    def test_get_post_media(self):
+        graphql = json.dumps({'data': {'shortcode_media': media}})
+        web_driver = RecordingDriver([
+            ('text/html', {'body': '<html></html>'}),
+            ('application/json', None),
+            ('application/json', {'body': json.dumps({'graphql': {'shortcode_media': {'shortcode': 'OTHER'}}})}),
+            ('application/json', {'body': base64.b64encode(graphql.encode()).decode(), 'base64Encoded': True})])
+
+        assert network_capture.get_post_media(web_driver, 'CCC333') == media
+        # The log is read once
+        assert network_capture.get_post_media(web_driver, 'CCC333') is None
+
+    #########
+    # CLEAR #
+    #########
+    def test_clear(self):
+        web_driver = RecordingDriver([('application/json', {'body': json.dumps({'shortcode_media': media})})])
+        network_capture.clear(web_driver)
+        assert network_capture.get_post_media(web_driver, 'CCC333') is None
+
+    ##############
+    # MEDIA URLS #
+    ##############
+    def test_media_urls(self):
+        assert helper.get_media_urls(media) == ['https://cdn/333_c1_n.jpg', 'https://cdn/333_c2_n.mp4']
+        assert helper.get_media_urls({'is_video': False, 'display_url': 'https://cdn/a.jpg'}) == ['https://cdn/a.jpg']
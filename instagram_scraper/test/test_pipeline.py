@@ -0,0 +1,83 @@
+import time
+import threading
+import pytest
+
+from .. import pipeline
+
+
+def add(amount):
+    def stage(stream):
+        for item in stream:
+            yield item + amount
+    return stage
+
+
+class TestPipeline:
+
+    ##########
+    # STAGES #
+    ##########
+    def test_items_keep_their_order(self):
+        stages = [(add(1), True), (add(10), False), (add(100), True)]
+        assert list(pipeline.run(range(20), stages)) == [i + 111 for i in range(20)]
+
+    def test_background_stage_runs_on_its_own_thread(self):
+        threads = []
+
+        def stage(stream):
+            for item in stream:
+                threads.append(threading.current_thread())
+                yield item
+
+        list(pipeline.run([1, 2], [(stage, True)]))
+        assert threading.current_thread() not in threads
+
+    def test_background_stage_is_bounded(self):
+        produced = []
+
+        def stage(stream):
+            for item in stream:
+                produced.append(item)
+                yield item
+
+        items = pipeline.run(range(100), [(stage, True)], queue_size=2)
+        assert next(items) == 0
+        time.sleep(0.2)
+        # One item taken, two waiting in the queue and one waiting to be put
+        assert len(produced) <= 4
+
+    def test_stages_overlap(self):
+        def slow(stream):
+            for item in stream:
+                time.sleep(0.05)
+                yield item
+
+        start = time.monotonic()
+        list(pipeline.run(range(6), [(slow, True), (slow, False)]))
+        # Serial would take 0.6 seconds
+        assert time.monotonic() - start < 0.5
+
+    ##########
+    # ERRORS #
+    ##########
+    def test_error_is_raised_on_the_consumer(self):
+        def failing(stream):
+            for item in stream:
+                if item == 2:
+                    raise ValueError('broken')
+                yield item
+
+        items = pipeline.run(range(5), [(failing, True)])
+        assert next(items) == 0
+        assert next(items) == 1
+        with pytest.raises(ValueError):
+            next(items)
+
+    def test_system_exit_is_raised_on_the_consumer(self):
+        def stopping(stream):
+            for _ in stream:
+                raise SystemExit(0)
+            yield
+
+        with pytest.raises(SystemExit):
+            list(pipeline.run([1], [(stopping, True)]))
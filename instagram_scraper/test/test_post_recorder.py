@@ -0,0 +1,87 @@
+import threading
+
+from ..download_pool import DownloadPool
+from ..post_recorder import PostRecorder
+
+link = 'https://www.instagram.com/p/{}/'
+
+
+class FailingStore:
+    """ Writes nothing, the urls that end with fail can not be downloaded """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+
+    def download(self, url, output_path='', file_name=''):
+        self.release.wait()
+        if url.endswith('fail'):
+            raise OSError('download failed')
+
+
+class TestPostRecorder:
+
+    ##########
+    # RECORD #
+    ##########
+    def test_post_is_recorded_after_its_files(self):
+        store = FailingStore()
+        store.release.clear()
+        pool, recorder = self.pool(store)
+
+        with recorder.post(link.format('AAA')):
+            pool.submit('https://cdn/a1', 'out', 'a1')
+            pool.submit('https://cdn/a2', 'out', 'a2')
+            recorder.record(link.format('AAA'), True, '1')
+        assert recorder.pop_recorded() == []
+
+        store.release.set()
+        pool.wait()
+        assert recorder.pop_recorded() == [(link.format('AAA'), True, '1')]
+        pool.shutdown()
+
+    def test_post_with_failed_file_is_not_recorded(self):
+        pool, recorder = self.pool(FailingStore())
+
+        with recorder.post(link.format('AAA')):
+            pool.submit('https://cdn/a1', 'out', 'a1')
+            pool.submit('https://cdn/a2-fail', 'out', 'a2')
+            recorder.record(link.format('AAA'), True, '1')
+        with recorder.post(link.format('BBB')):
+            pool.submit('https://cdn/b1', 'out', 'b1')
+            recorder.record(link.format('BBB'), False, '1')
+        pool.wait()
+
+        assert recorder.pop_recorded() == [(link.format('BBB'), False, '1')]
+        pool.shutdown()
+
+    def test_post_that_is_not_recorded_is_dropped(self):
+        pool, recorder = self.pool(FailingStore())
+
+        try:
+            with recorder.post(link.format('AAA')):
+                pool.submit('https://cdn/a1', 'out', 'a1')
+                raise SystemExit(0)
+        except SystemExit:
+            pass
+        pool.wait()
+
+        assert recorder.pop_recorded() == []
+        pool.shutdown()
+
+    def test_files_outside_a_post_are_ignored(self):
+        pool, recorder = self.pool(FailingStore())
+        pool.submit('https://cdn/story', 'out', 'story')
+        with recorder.post(link.format('AAA')):
+            recorder.record(link.format('AAA'), False)
+        pool.wait()
+
+        assert recorder.pop_recorded() == [(link.format('AAA'), False, None)]
+        pool.shutdown()
+
+    @staticmethod
+    def pool(store):
+        pool = DownloadPool(2, store=store)
+        recorder = PostRecorder()
+        pool.add_listener(recorder)
+        return pool, recorder
@@ -0,0 +1,154 @@
+import os
+import threading
+import pytest
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler, BaseHTTPRequestHandler
+from functools import partial
+
+from requests.exceptions import HTTPError
+
+from .. import retriever
+
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    """ Serves files with Last-Modified and answers If-Modified-Since with 304, every status code is recorded """
+
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+
+    def log_request(self, code='-', size='-'):
+        self.statuses.append((self.path, int(code)))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """ Serves one file with an ETag and Range support, the first response can be cut off after cut_at bytes """
+
+    protocol_version = 'HTTP/1.1'
+    content = bytes(range(256)) * 1000
+    cut_at = None
+    ranges = []
+
+    def do_GET(self):
+        start = 0
+        status = 200
+        if self.headers.get('Range') and self.headers.get('If-Range') == '"v1"':
+            start = int(self.headers['Range'].split('=')[1].split('-')[0])
+            status = 206
+        RangeHandler.ranges.append(self.headers.get('Range'))
+
+        self.send_response(status)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(self.content) - start))
+        if status == 206:
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, len(self.content) - 1, len(self.content)))
+        self.end_headers()
+
+        body = self.content[start:]
+        if RangeHandler.cut_at is not None:
+            body = body[:RangeHandler.cut_at]
+            RangeHandler.cut_at = None
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRetriever:
+
+    ############
+    # DOWNLOAD #
+    ############
+    def test_download(self, server, tmp_path):
+        output_path = str(tmp_path / 'out')
+        assert retriever.download(server + '/file.jpg', output_path) == (output_path + '/file.jpg', 'file.jpg')
+        with open(output_path + '/file.jpg', 'rb') as file:
+            assert file.read() == b'content' * 1000
+
+    #######################
+    # SKIP UNCHANGED FILE #
+    #######################
+    def test_skip_unchanged_file(self, server, tmp_path):
+        output_path = str(tmp_path / 'out')
+        retriever.download(server + '/file.jpg', output_path, 'a.jpg')
+        modified = os.path.getmtime(output_path + '/a.jpg')
+
+        retriever.download(server + '/file.jpg', output_path, 'a.jpg')
+        assert RecordingHandler.statuses == [('/file.jpg', 200), ('/file.jpg', 304)]
+        assert os.path.getmtime(output_path + '/a.jpg') == modified
+
+    ############################
+    # CHANGED FILE IS REPLACED #
+    ############################
+    def test_changed_file_replaced(self, server, tmp_path):
+        output_path = str(tmp_path / 'out')
+        retriever.download(server + '/file.jpg', output_path, 'a.jpg')
+
+        # A truncated file on disk does not match the cache
+        with open(output_path + '/a.jpg', 'wb') as file:
+            file.write(b'cont')
+        retriever.download(server + '/file.jpg', output_path, 'a.jpg')
+
+        assert RecordingHandler.statuses == [('/file.jpg', 200), ('/file.jpg', 200)]
+        with open(output_path + '/a.jpg', 'rb') as file:
+            assert file.read() == b'content' * 1000
+
+    ###############################
+    # RESUME INTERRUPTED DOWNLOAD #
+    ###############################
+    def test_resume_interrupted_download(self, range_server, tmp_path):
+        output_path = str(tmp_path / 'out')
+        RangeHandler.cut_at = 98304
+        retriever.download(range_server + '/video.mp4', output_path, chunk_size=4096)
+
+        assert RangeHandler.ranges == [None, 'bytes=98304-']
+        assert not os.path.exists(output_path + '/video.mp4.part')
+        with open(output_path + '/video.mp4', 'rb') as file:
+            assert file.read() == RangeHandler.content
+
+    ###############################
+    # INCOMPLETE DOWNLOAD IS KEPT #
+    ###############################
+    def test_incomplete_download_kept(self, range_server, tmp_path, monkeypatch):
+        output_path = str(tmp_path / 'out')
+        monkeypatch.setattr(retriever, 'RESUME_TRIES', 1)
+        RangeHandler.cut_at = 98304
+        with pytest.raises(HTTPError):
+            retriever.download(range_server + '/video.mp4', output_path, chunk_size=4096)
+
+        # The final name only exists for a complete file, a later download continues the .part file
+        assert not os.path.exists(output_path + '/video.mp4')
+        assert os.path.getsize(output_path + '/video.mp4.part') == 98304
+        retriever.download(range_server + '/video.mp4', output_path)
+        assert RangeHandler.ranges == [None, 'bytes=98304-']
+        assert os.path.getsize(output_path + '/video.mp4') == len(RangeHandler.content)
+
+    ###########
+    # FIXTURE #
+    ###########
+    @pytest.fixture
+    def server(self, tmp_path):
+        served_dir = tmp_path / 'served'
+        os.makedirs(served_dir)
+        with open(served_dir / 'file.jpg', 'wb') as file:
+            file.write(b'content' * 1000)
+
+        RecordingHandler.statuses = []
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), partial(RecordingHandler, directory=str(served_dir)))
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield 'http://127.0.0.1:' + str(httpd.server_address[1])
+        httpd.shutdown()
+        httpd.server_close()
+
+    @pytest.fixture
+    def range_server(self):
+        RangeHandler.ranges = []
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield 'http://127.0.0.1:' + str(httpd.server_address[1])
+        httpd.shutdown()
+        httpd.server_close()
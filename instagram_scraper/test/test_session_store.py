@@ -0,0 +1,66 @@
+import os
+import stat
+import pytest
+
+pytest.importorskip('cryptography')
+
+from .. import http_session
+from .. import session_store
+from ..session_store import SessionStore
+
+cookies = [{'name': 'sessionid', 'value': 'secret-session', 'domain': '.instagram.com', 'path': '/'},
+           {'name': 'csrftoken', 'value': 'token', 'domain': '.instagram.com', 'path': '/'}]
+
+
+class TestSessionStore:
+
+    #############
+    # ROUNDTRIP #
+    #############
+    def test_save_and_load(self, tmp_path):
+        store = SessionStore(str(tmp_path))
+        assert store.load('dummy') is None
+        store.save('dummy', cookies)
+        assert SessionStore(str(tmp_path)).load('Dummy') == cookies
+
+    def test_remove(self, tmp_path):
+        store = SessionStore(str(tmp_path))
+        store.save('dummy', cookies)
+        store.remove('dummy')
+        store.remove('dummy')
+        assert store.load('dummy') is None
+
+    ##############
+    # ENCRYPTION #
+    ##############
+    def test_session_is_encrypted(self, tmp_path):
+        SessionStore(str(tmp_path)).save('dummy', cookies)
+        with open(str(tmp_path / ('dummy' + session_store.SESSION_SUFFIX)), 'rb') as file:
+            assert b'secret-session' not in file.read()
+
+    def test_files_are_private(self, tmp_path):
+        SessionStore(str(tmp_path)).save('dummy', cookies)
+        for name in (session_store.KEY_FILE_NAME, 'dummy' + session_store.SESSION_SUFFIX):
+            assert stat.S_IMODE(os.stat(str(tmp_path / name)).st_mode) == 0o600
+
+    def test_other_key_can_not_read(self, tmp_path):
+        SessionStore(str(tmp_path)).save('dummy', cookies)
+        os.remove(str(tmp_path / session_store.KEY_FILE_NAME))
+        assert SessionStore(str(tmp_path)).load('dummy') is None
+
+    ##################
+    # SESSION COOKIE #
+    ##################
+    def test_has_session_cookie(self):
+        assert session_store.has_session_cookie(cookies)
+        assert not session_store.has_session_cookie(cookies[1:])
+
+    ################
+    # HTTP SESSION #
+    ################
+    def test_cookies_are_set_on_http_session(self):
+        http_session.close()
+        http_session.set_cookies(cookies)
+        assert http_session.get_session().cookies.get('sessionid', domain='.instagram.com') == 'secret-session'
+        http_session.set_cookies([])
+        http_session.close()
@@ -0,0 +1,77 @@
+import time
+import threading
+import pytest
+
+from ..database import Database
+from .. import user_resolver
+
+
+class TestUserResolver:
+
+    ############
+    # USER IDS #
+    ############
+    def test_misses_are_looked_up_at_the_same_time(self, database):
+        running = []
+        most_running = []
+        lock = threading.Lock()
+
+        def lookup(username):
+            with lock:
+                running.append(username)
+                most_running.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(username)
+            return None if username == 'nobody' else 'id-' + username
+
+        user_ids = user_resolver.resolve_user_ids(database, ['one', 'two', 'three', 'nobody'], lookup)
+        assert user_ids == {'one': 'id-one', 'two': 'id-two', 'three': 'id-three'}
+        assert max(most_running) > 1
+
+    def test_cached_ids_are_not_looked_up(self, database):
+        database.set_cached_user_id('one', 1)
+        looked_up = []
+
+        def lookup(username):
+            looked_up.append(username)
+            return 'id-' + username
+
+        assert user_resolver.resolve_user_ids(database, ['one', 'two'], lookup) == {'one': '1', 'two': 'id-two'}
+        assert looked_up == ['two']
+        assert user_resolver.resolve_user_ids(database, ['two'], lookup) == {'two': 'id-two'}
+        assert looked_up == ['two']
+
+    def test_expired_ids_are_looked_up_again(self, database, monkeypatch):
+        database.set_cached_user_id('one', 1)
+        monkeypatch.setattr(user_resolver, 'USER_ID_TTL', -1)
+        assert user_resolver.resolve_user_ids(database, ['one'], lambda username: '2') == {'one': '2'}
+
+    def test_failed_lookup_is_not_cached(self, database):
+        def lookup(username):
+            raise ValueError('no profile')
+
+        assert user_resolver.resolve_user_ids(database, ['one'], lookup) == {}
+        assert database.get_cached_user_ids(user_resolver.USER_ID_TTL) == {}
+
+    #############
+    # USERNAMES #
+    #############
+    def test_changed_username_replaces_the_old_one(self, database):
+        database.set_cached_user_id('old', 1)
+        assert user_resolver.resolve_usernames(database, [1], lambda user_id: 'unused') == {'1': 'old'}
+
+        database.set_cached_user_id('new', 1)
+        assert database.get_cached_user_ids(user_resolver.USER_ID_TTL) == {'new': '1'}
+        assert user_resolver.resolve_usernames(database, [1, 2], lambda user_id: 'two') == {'1': 'new', '2': 'two'}
+
+    ############
+    # DATABASE #
+    ############
+    @pytest.fixture
+    def database(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        database = Database()
+        database.create_tables()
+        yield database
+        database.close_connection()
@@ -0,0 +1,43 @@
+import time
+
+from .. import wait
+
+
+class TestWait:
+
+    ####################
+    # ADAPTIVE TIMEOUT #
+    ####################
+    def test_adaptive_timeout(self):
+        name = 'test adaptive timeout'
+        assert wait.timeout_for(name) == wait.MAX_TIMEOUT
+
+        assert wait.until(None, lambda d: True, name) is True
+        assert wait.timeout_for(name) == wait.MIN_TIMEOUT
+
+    ##################
+    # RETURNED VALUE #
+    ##################
+    def test_returned_value(self):
+        values = iter([False, False, 'element'])
+        assert wait.until(None, lambda d: next(values), 'test returned value') == 'element'
+
+    ###########
+    # TIMEOUT #
+    ###########
+    def test_timeout(self):
+        start = time.monotonic()
+        assert wait.until(None, lambda d: False, 'test timeout', timeout=0.3) is None
+        assert time.monotonic() - start < wait.MIN_TIMEOUT
+        assert wait.timeout_for('test timeout') == wait.MAX_TIMEOUT
+
+    def test_timeout_doubles_after_timeout(self, monkeypatch):
+        name = 'test timeout doubles'
+        monkeypatch.setattr(wait, 'MIN_TIMEOUT', 0.1)
+        assert wait.until(None, lambda d: True, name) is True
+        assert wait.timeout_for(name) == 0.1
+
+        assert wait.until(None, lambda d: False, name) is None
+        assert wait.timeout_for(name) == 0.2
+        assert wait.until(None, lambda d: False, name) is None
+        assert wait.timeout_for(name) == 0.4
@@ -0,0 +1,61 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('__name__')
+
+# A username and id pair is trusted this many seconds after Instagram confirmed it
+USER_ID_TTL = 7 * 24 * 3600
+
+# Lookups that are sent at the same time, the governor still paces them
+RESOLVE_WORKERS = 8
+
+
+def resolve_user_ids(database, usernames, lookup, workers=RESOLVE_WORKERS):
+    """
+    Return username: id of every username that could be resolved
+    Usernames that are not in the cache are looked up at the same time with lookup(username) and cached
+    """
+
+    cached = database.get_cached_user_ids(USER_ID_TTL)
+    user_ids = {username: cached[username] for username in usernames if username in cached}
+
+    misses = [username for username in dict.fromkeys(usernames) if username not in user_ids]
+    for username, user_id in zip(misses, lookup_all(lookup, misses, workers)):
+        if user_id is not None:
+            user_ids[username] = str(user_id)
+            database.set_cached_user_id(username, user_id)
+    return user_ids
+
+
+def resolve_usernames(database, user_ids, lookup, workers=RESOLVE_WORKERS):
+    """
+    Return id: current username of every id that could be resolved
+    Ids that are not in the cache are looked up at the same time with lookup(user_id) and cached
+    """
+
+    cached = {user_id: username for username, user_id in database.get_cached_user_ids(USER_ID_TTL).items()}
+    user_ids = [str(user_id) for user_id in user_ids]
+    usernames = {user_id: cached[user_id] for user_id in user_ids if user_id in cached}
+
+    misses = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in usernames]
+    for user_id, username in zip(misses, lookup_all(lookup, misses, workers)):
+        if username is not None:
+            usernames[user_id] = username
+            database.set_cached_user_id(username, user_id)
+    return usernames
+
+
+def lookup_all(lookup, keys, workers=RESOLVE_WORKERS):
+    """ Return lookup(key) of every key in the same order, None for a key whose lookup failed """
+
+    def safe_lookup(key):
+        try:
+            return lookup(key)
+        except Exception as err:
+            logger.error('lookup of %s failed: %s' % (key, err))
+            return None
+
+    if len(keys) == 0:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(keys))) as executor:
+        return list(executor.map(safe_lookup, keys))
@@ -0,0 +1,143 @@
+import time
+import logging
+import threading
+
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import StaleElementReferenceException
+
+from . import constants
+from . import instrumentation
+
+logger = logging.getLogger('__name__')
+
+MIN_TIMEOUT = 2
+MAX_TIMEOUT = 20
+POLL_FREQUENCY = 0.1
+
+# The timeout of a wait is this factor times its average duration
+TIMEOUT_FACTOR = 4
+
+# Weight of the newest duration in the moving average
+SMOOTHING = 0.2
+
+_average_durations = {}
+_lock = threading.Lock()
+
+
+def timeout_for(name):
+    """
+    Return the timeout for a wait based on how long the same wait took before
+    A wait that was never done gets the maximum timeout
+    """
+
+    with _lock:
+        average = _average_durations.get(name)
+    if average is None:
+        return MAX_TIMEOUT
+    return min(MAX_TIMEOUT, max(MIN_TIMEOUT, average * TIMEOUT_FACTOR))
+
+
+def until(web_driver, condition, name, timeout=None):
+    """
+    Wait until condition returns a truthy value and return that value
+    Returns None if the timeout is reached, the next wait with the same name then gets twice the timeout
+    """
+
+    adaptive = timeout is None
+    if adaptive:
+        timeout = timeout_for(name)
+
+    start = time.monotonic()
+    try:
+        with instrumentation.span('wait'):
+            result = WebDriverWait(web_driver, timeout, poll_frequency=POLL_FREQUENCY,
+                                   ignored_exceptions=[StaleElementReferenceException]).until(condition)
+    except TimeoutException:
+        instrumentation.count('wait.timeouts')
+        logger.debug('wait for %s timed out after %.2fs' % (name, time.monotonic() - start))
+        if adaptive:
+            __record_timeout(name, timeout)
+        return None
+
+    duration = time.monotonic() - start
+    __record(name, duration)
+    logger.debug('waited %.2fs for %s' % (duration, name))
+    return result
+
+
+def page_loaded(web_driver):
+    """ Wait until the document is ready """
+
+    return until(web_driver, lambda d: d.execute_script('return document.readyState') == 'complete', 'page loaded')
+
+
+def css(web_driver, css_selector):
+    """ Wait until an element matching the css selector is present and return it """
+
+    def condition(d):
+        elements = d.find_elements_by_css_selector(css_selector)
+        return elements[0] if elements else False
+
+    return until(web_driver, condition, css_selector)
+
+
+def any_css(web_driver, css_selectors):
+    """ Wait until one of the css selectors matches an element and return that css selector """
+
+    def condition(d):
+        for css_selector in css_selectors:
+            if d.find_elements_by_css_selector(css_selector):
+                return css_selector
+        return False
+
+    return until(web_driver, condition, ' | '.join(css_selectors))
+
+
+def number_of_windows(web_driver, number):
+    """ Wait until the amount of open windows is number """
+
+    return until(web_driver, lambda d: len(d.window_handles) == number, 'number of windows')
+
+
+def staleness(web_driver, element, name):
+    """ Wait until the element is removed from the page """
+
+    def condition(_):
+        try:
+            element.is_enabled()
+            return False
+        except StaleElementReferenceException:
+            return True
+
+    return until(web_driver, condition, name)
+
+
+def active_indicator(web_driver, index):
+    """ Wait until the indicator at index is the active one in a post with multiple content """
+
+    script = ('var indicators = document.querySelectorAll(arguments[0]);'
+              'for (var i = 0; i < indicators.length; i++) {'
+              '    if (indicators[i].matches(arguments[1])) { return i; }'
+              '}'
+              'return -1;')
+
+    return until(web_driver,
+                 lambda d: d.execute_script(script, constants.INDICATOR, constants.INDICATOR_ACTIVE_CSS) == index,
+                 constants.INDICATOR_ACTIVE_CSS)
+
+
+def __record_timeout(name, timeout):
+    """ A few fast waits must not make a slow page fail every time, the timeout doubles after a timeout """
+
+    with _lock:
+        _average_durations[name] = min(MAX_TIMEOUT, timeout * 2) / TIMEOUT_FACTOR
+
+
+def __record(name, duration):
+    with _lock:
+        average = _average_durations.get(name)
+        if average is None:
+            _average_durations[name] = duration
+        else:
+            _average_durations[name] = (1 - SMOOTHING) * average + SMOOTHING * duration
@@ -32,6 +32,10 @@ setup(
         'console_scripts': [name + '=instagram_scraper.app:main'],
     },
     install_requires=requires,
+    extras_require={
+        'async': ['aiohttp>=3.7.0'],
+        'session': ['cryptography>=3.1'],
+    },
     license='MIT',
     classifiers=[
         'Development Status :: 5 - Production/Stable',